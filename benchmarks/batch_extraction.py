@@ -0,0 +1,94 @@
+""" Benchmark comparing per-cell feature extraction with batch extraction
+over a MorphologyBatch.
+
+The same swc files are featurized with FeatureExtractor (one Data at a time)
+and with BatchFeatureExtractor (once for the whole batch), computing only the
+features which have batch counterparts. The best time of each is reported,
+alongside the batch speedup.
+
+Usage:
+    python benchmarks/batch_extraction.py [SWC_PATH ...] [--copies N]
+        [--repeats N]
+
+"""
+
+import argparse
+import glob
+import logging
+import os
+import time
+import warnings
+
+from neuron_morphology.swc_io import morphology_from_swc
+from neuron_morphology.morphology_batch import MorphologyBatch
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor.batch_feature_extractor import (
+    BatchFeatureExtractor)
+from neuron_morphology.features import batch as batch_features
+from neuron_morphology.features.default_features import default_features
+
+
+DEFAULT_SWC_PATHS = sorted(glob.glob(os.path.join(
+    os.path.dirname(__file__), "..", "tests", "data", "*.swc")))
+
+
+def time_call(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("swc_paths", nargs="*", default=DEFAULT_SWC_PATHS)
+    parser.add_argument("--copies", type=int, default=20,
+                        help="featurize this many copies of each swc")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore")
+
+    batch_extractor = BatchFeatureExtractor(
+        batch_features.default_batch_features)
+    names = {feature.name for feature in batch_extractor.features}
+    single_extractor = FeatureExtractor([
+        feature for feature in FeatureExtractor(default_features).features
+        if feature.name in names
+    ])
+
+    morphologies = [
+        morphology_from_swc(path) for path in args.swc_paths
+    ] * args.copies
+
+    def run_single():
+        for morphology in morphologies:
+            # a fresh Data per cell, as extract_multiple would construct
+            morphology.clear_cache()
+            single_extractor.extract(Data(morphology))
+
+    def run_batch():
+        for morphology in morphologies:
+            morphology.clear_cache()
+        batch = MorphologyBatch.from_morphologies(morphologies)
+        batch_extractor.extract(batch)
+
+    single = time_call(run_single, args.repeats)
+    batched = time_call(run_batch, args.repeats)
+
+    print(f"{'mode':<8} {'cells':>7} {'seconds':>9} {'cells/s':>9} "
+          f"{'speedup':>8}")
+    for mode, elapsed in (("single", single), ("batch", batched)):
+        print(
+            f"{mode:<8} {len(morphologies):>7} {elapsed:>9.3f} "
+            f"{len(morphologies) / elapsed:>9.1f} {single / elapsed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
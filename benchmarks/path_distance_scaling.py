@@ -0,0 +1,84 @@
+""" Benchmark showing how max_path_distance scales with reconstruction size.
+
+Connected sub-reconstructions of increasing size are cut from a single swc
+(the first n nodes, in breadth-first order from the root) and
+max_path_distance is timed on each. A fitted log-log slope near 1 indicates
+linear scaling.
+
+Usage:
+    python benchmarks/path_distance_scaling.py [--swc_path PATH] [--repeats N]
+
+"""
+
+import argparse
+import logging
+import os
+import time
+from typing import List, Dict, Any
+
+import numpy as np
+
+from neuron_morphology.swc_io import morphology_from_swc
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.features.path import max_path_distance
+
+
+DEFAULT_SWC_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "data", "test_swc.swc")
+
+
+def breadth_first_prefix(
+    morphology: Morphology, num_nodes: int
+) -> List[Dict[str, Any]]:
+    """ Copy the first num_nodes nodes visited in a breadth-first traversal
+    from the root. These always form a connected tree.
+    """
+
+    visited: List[Dict[str, Any]] = []
+
+    def visit(node):
+        if len(visited) < num_nodes:
+            visited.append(dict(node))
+
+    morphology.breadth_first_traversal(visit)
+    return visited
+
+
+def time_call(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--swc_path", default=DEFAULT_SWC_PATH)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    full = morphology_from_swc(args.swc_path)
+
+    sizes = [len(full) // 2 ** power for power in range(4, -1, -1)]
+    timings = []
+
+    print(f"{'nodes':>8} {'seconds':>10} {'us / node':>10}")
+    for size in sizes:
+        morphology = Morphology(
+            breadth_first_prefix(full, size),
+            node_id_cb=lambda node: node["id"],
+            parent_id_cb=lambda node: node["parent"]
+        )
+        elapsed = time_call(lambda: max_path_distance(morphology), args.repeats)
+        timings.append(elapsed)
+        print(f"{size:>8} {elapsed:>10.4f} {1e6 * elapsed / size:>10.2f}")
+
+    slope = np.polyfit(np.log(sizes), np.log(timings), 1)[0]
+    print(f"fitted scaling exponent: {slope:.2f} (1.0 is linear)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+""" Benchmark comparing swc parsing throughput of the pandas and native
+engines of morphology_from_swc.
+
+Each swc is loaded repeatedly with each engine and the best time is reported
+as megabytes per second and nodes per second, alongside the native engine's
+speedup.
+
+Usage:
+    python benchmarks/swc_read_throughput.py [SWC_PATH ...] [--repeats N]
+
+"""
+
+import argparse
+import glob
+import logging
+import os
+import time
+import warnings
+
+from neuron_morphology.swc_io import morphology_from_swc
+
+
+DEFAULT_SWC_PATHS = sorted(glob.glob(os.path.join(
+    os.path.dirname(__file__), "..", "tests", "data", "*.swc")))
+ENGINES = ("pandas", "native")
+
+
+def time_call(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("swc_paths", nargs="*", default=DEFAULT_SWC_PATHS)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore")
+
+    print(
+        f"{'file':<40} {'engine':>7} {'nodes':>8} {'MB/s':>8} "
+        f"{'nodes/s':>11} {'speedup':>8}"
+    )
+    for path in args.swc_paths:
+        megabytes = os.path.getsize(path) / 1e6
+        num_nodes = len(morphology_from_swc(path, engine="native"))
+
+        baseline = None
+        for engine in ENGINES:
+            elapsed = time_call(
+                lambda: morphology_from_swc(path, engine=engine),
+                args.repeats
+            )
+            baseline = baseline or elapsed
+            print(
+                f"{os.path.basename(path)[:40]:<40} {engine:>7} "
+                f"{num_nodes:>8} {megabytes / elapsed:>8.2f} "
+                f"{num_nodes / elapsed:>11.0f} {baseline / elapsed:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,842 @@
+""" An array-backed implementation of the Morphology interface. Node data are
+stored as contiguous numpy columns and parent/child relationships as integer
+index arrays. Node dictionaries are only materialized (as lightweight views
+onto those columns) when a caller asks for them.
+"""
+
+from typing import (
+    Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Sequence)
+from operator import itemgetter
+
+import numpy as np
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.constants import SOMA
+
+
+# these columns always have these dtypes, regardless of input
+FLOAT_COLUMNS = ("x", "y", "z", "radius")
+INT_COLUMNS = ("id", "type", "parent")
+
+
+class _Missing:
+    """ Marks a node which lacks a value for some (ragged) column
+    """
+
+    def __repr__(self):
+        return "<missing>"
+
+    def __reduce__(self):
+        return "_MISSING"
+
+
+_MISSING = _Missing()
+
+
+class NodeView(MutableMapping):
+
+    __slots__ = ["_morphology", "_index"]
+
+    def __init__(self, morphology: "ArrayMorphology", index: int):
+        """ A dict-like view onto a single node (row) of an ArrayMorphology.
+        Reads and writes go directly to the morphology's column arrays.
+
+        Parameters
+        ----------
+        morphology : the morphology which owns this node
+        index : the row of this node in the morphology's arrays
+
+        """
+
+        self._morphology = morphology
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            value = self._morphology.columns[key][self._index]
+        except KeyError:
+            raise KeyError(key)
+
+        if value is _MISSING:
+            raise KeyError(key)
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self._morphology._set_value(self._index, key, value)
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        self._morphology._set_value(self._index, key, _MISSING)
+
+    def __iter__(self) -> Iterator[str]:
+        columns = self._morphology.columns
+        for key, column in columns.items():
+            if column.dtype != object or column[self._index] is not _MISSING:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key: object) -> bool:
+        column = self._morphology.columns.get(key)  # type: ignore[arg-type]
+        if column is None:
+            return False
+        return column.dtype != object or column[self._index] is not _MISSING
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, NodeView) \
+                and other._morphology is self._morphology:
+            return other._index == self._index
+        return super().__eq__(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def copy(self) -> Dict[str, Any]:
+        """ Detach this node from its morphology as a plain dictionary
+        """
+        return dict(self)
+
+    def __copy__(self) -> Dict[str, Any]:
+        return self.copy()
+
+    def __deepcopy__(self, memo) -> Dict[str, Any]:
+        return self.copy()
+
+    def __reduce__(self):
+        # pickle (e.g. for multiprocessing) as a plain dictionary, rather than
+        # dragging the whole morphology along
+        return (dict, (self.copy(),))
+
+
+class ArrayMorphology(Morphology):
+
+    def __init__(
+        self,
+        nodes: Sequence[Dict[str, Any]],
+        node_id_cb: Callable[[Dict[str, Any]], int],
+        parent_id_cb: Callable[[Dict[str, Any]], Optional[int]]
+    ):
+        """ A Morphology whose node data are stored in contiguous numpy arrays
+        rather than per-node dictionaries. Supports the same interface as
+        Morphology. Nodes returned from this object are NodeViews: dict-like
+        objects which read from and write to this morphology's arrays.
+
+        Parameters
+        ----------
+        nodes : Each is a node dictionary, as for Morphology
+        node_id_cb : obtain an (integer) id from a node
+        parent_id_cb : obtain a node's parent's id from that node
+
+        Notes
+        -----
+        Use ArrayMorphology.from_arrays to construct directly from columns
+        without building intermediate dictionaries.
+
+        """
+
+        # as with Morphology, the last of several nodes sharing an id wins
+        by_id = {node_id_cb(node): node for node in nodes}
+        nodes = list(by_id.values())
+        node_ids = list(by_id.keys())
+        parent_ids = [parent_id_cb(node) for node in nodes]
+
+        keys: Dict[str, None] = {}
+        for node in nodes:
+            keys.update(dict.fromkeys(node))
+
+        columns = {
+            key: _build_column(key, [node.get(key, _MISSING) for node in nodes])
+            for key in keys
+        }
+
+        index_of = {node_id: index for index, node_id in enumerate(node_ids)}
+        parent_index = np.fromiter(
+            (index_of.get(parent_id, -1) for parent_id in parent_ids),
+            dtype=np.int64,
+            count=len(parent_ids)
+        )
+
+        self._setup(
+            np.asarray(node_ids, dtype=np.int64),
+            parent_index,
+            columns
+        )
+        self.node_id_cb = node_id_cb
+        self._parent_id_cb = parent_id_cb
+
+    @classmethod
+    def from_arrays(
+        cls,
+        id: Sequence[int],
+        type: Sequence[int],
+        x: Sequence[float],
+        y: Sequence[float],
+        z: Sequence[float],
+        radius: Sequence[float],
+        parent: Sequence[int],
+        **extra_columns: Sequence[Any]
+    ) -> "ArrayMorphology":
+        """ Build an ArrayMorphology directly from SWC-like columns. No
+        per-node Python objects are created.
+
+        Parameters
+        ----------
+        id : unique integer identifier of each node
+        type : the (SWC) structure type of each node
+        x, y, z : node positions
+        radius : node radii
+        parent : the id of each node's parent. Ids which do not identify a
+            node in this morphology (e.g. -1) mark roots.
+        **extra_columns : additional per-node data (e.g. "layer")
+
+        Returns
+        -------
+        A new ArrayMorphology. Its nodes have keys "id", "type", "x", "y", "z",
+            "radius", "parent" and any extra column names.
+
+        """
+
+        columns = {
+            "id": _build_column("id", id),
+            "type": _build_column("type", type),
+            "x": _build_column("x", x),
+            "y": _build_column("y", y),
+            "z": _build_column("z", z),
+            "radius": _build_column("radius", radius),
+            "parent": _build_column("parent", parent),
+        }
+        for key, values in extra_columns.items():
+            columns[key] = _build_column(key, values)
+
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(
+                f"columns must all have the same length (found {lengths})")
+
+        morphology = cls.__new__(cls)
+        node_ids = columns["id"]
+        morphology._setup(
+            node_ids,
+            _locate(node_ids, columns["parent"]),
+            columns
+        )
+        morphology.node_id_cb = itemgetter("id")
+        morphology._parent_id_cb = itemgetter("parent")
+        return morphology
+
+    @classmethod
+    def from_morphology(cls, morphology: Morphology) -> "ArrayMorphology":
+        """ Convert a (dictionary-backed) Morphology to an ArrayMorphology.
+        """
+
+        if isinstance(morphology, ArrayMorphology):
+            return morphology.clone()
+
+        return cls(
+            morphology.nodes(),
+            node_id_cb=morphology.node_id_cb,
+            parent_id_cb=morphology.parent_id_cb
+        )
+
+    def _setup(
+        self,
+        node_ids: np.ndarray,
+        parent_index: np.ndarray,
+        columns: Dict[str, np.ndarray]
+    ):
+        """ Build the index structures for this morphology.
+        """
+
+        self.columns: Dict[str, np.ndarray] = columns
+        self._ids = node_ids
+        self._id_sorter = np.argsort(node_ids, kind="stable")
+        self._sorted_ids = node_ids[self._id_sorter]
+
+        if np.any(self._sorted_ids[1:] == self._sorted_ids[:-1]):
+            raise ValueError("node ids must be unique")
+
+        self._parent_index = parent_index
+        self.child_offsets, self.child_index = _build_child_csr(parent_index)
+
+        self._views: List[Optional[NodeView]] = [None] * len(node_ids)
+        self.nodes_by_types: Dict[int, List[NodeView]] = {}
+        self._cache: Dict[str, Any] = {}
+
+    def _node_columns(self):
+        return {
+            "parent_index": self._parent_index,
+            "types": self.types,
+            "x": self.x,
+            "y": self.y,
+            "z": self.z,
+            "radius": self.columns.get(
+                "radius", np.full(len(self), np.nan)),
+        }
+
+    def _type_counts(self):
+        types, counts = np.unique(self.types, return_counts=True)
+        return dict(zip(types.tolist(), counts.tolist()))
+
+    def _count_roots(self):
+        return int(np.count_nonzero(self._parent_index < 0))
+
+    def _key_counts(self):
+        return {
+            key: (
+                sum(value is not _MISSING for value in column)
+                if column.dtype == object else len(column)
+            )
+            for key, column in self.columns.items()
+        }
+
+    # ---------------------------------------------------------------------
+    # array accessors
+
+    @property
+    def ids(self) -> np.ndarray:
+        """ The integer id of each node
+        """
+        return self._ids
+
+    @property
+    def parent_index(self) -> np.ndarray:
+        """ For each node, the index of its parent (or -1 for roots)
+        """
+        return self._parent_index
+
+    @property
+    def types(self) -> np.ndarray:
+        """ The (SWC) structure type of each node
+        """
+        return self.columns["type"]
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.columns["x"]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.columns["y"]
+
+    @property
+    def z(self) -> np.ndarray:
+        return self.columns["z"]
+
+    @property
+    def radius(self) -> np.ndarray:
+        return self.columns["radius"]
+
+    @property
+    def num_children(self) -> np.ndarray:
+        """ The number of children of each node
+        """
+        return np.diff(self.child_offsets)
+
+    def positions(self, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        """ Obtain an (N, 3) array of node positions.
+
+        Parameters
+        ----------
+        indices : if provided, only return positions for these (array) indices
+
+        """
+
+        if indices is None:
+            return np.stack([self.x, self.y, self.z], axis=1)
+        return np.stack(
+            [self.x[indices], self.y[indices], self.z[indices]], axis=1)
+
+    def get_positions(self) -> np.ndarray:
+        return self.positions()
+
+    def set_positions(self, positions, radius_scale=None):
+        positions = np.asarray(positions, dtype=float)
+        if positions.shape != (len(self), 3):
+            raise ValueError(
+                f"expected positions of shape {(len(self), 3)}, "
+                f"found {positions.shape}"
+            )
+
+        # replace, rather than write into, the coordinate columns, which
+        # may be held by callers (see get_node_columns) or be integer-typed
+        for axis, key in enumerate(("x", "y", "z")):
+            self.columns[key] = positions[:, axis].copy()
+
+        radius = self.columns.get("radius")
+        if radius_scale is not None and radius is not None:
+            if radius.dtype == object:
+                radius = radius.copy()
+                present = np.fromiter(
+                    (value is not _MISSING for value in radius),
+                    dtype=bool, count=len(radius)
+                )
+                radius[present] = radius[present] * radius_scale
+            else:
+                radius = radius * radius_scale
+            self.columns["radius"] = radius
+
+        self.clear_cache()
+
+    def children_indices(self, index: int) -> np.ndarray:
+        """ The array indices of a node's children, in input order
+        """
+        return self.child_index[
+            self.child_offsets[index]: self.child_offsets[index + 1]]
+
+    def indices_of(self, node_ids: Sequence[int]) -> np.ndarray:
+        """ Convert node ids to array indices. Unknown ids map to -1.
+        """
+        return _locate(self._ids, node_ids, self._id_sorter, self._sorted_ids)
+
+    def index_of(self, node: Dict[str, Any]) -> int:
+        """ Find the array index of a node (or -1 if it is not present)
+        """
+
+        if isinstance(node, NodeView) and node._morphology is self:
+            return node._index
+        return self._index_of_id(self.node_id_cb(node))
+
+    def type_mask(self, node_types: Optional[Sequence[int]] = None) -> np.ndarray:
+        """ A boolean mask selecting nodes of the argued types (or all nodes,
+        if node_types is falsy).
+        """
+
+        if not node_types:
+            return np.ones(len(self), dtype=bool)
+        return np.isin(self.types, list(node_types))
+
+    def indices_by_types(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ Array indices of nodes of the argued types, ordered as the nodes
+        of Morphology.get_node_by_types would be.
+        """
+
+        if not node_types:
+            return np.arange(len(self))
+        types = self.types
+        return np.concatenate(
+            [np.flatnonzero(types == node_type) for node_type in node_types]
+            + [np.empty(0, dtype=np.int64)]
+        )
+
+    def view(self, index: int) -> NodeView:
+        """ Obtain a (cached) dict-like view of the node at this index
+        """
+
+        view = self._views[index]
+        if view is None:
+            view = NodeView(self, int(index))
+            self._views[index] = view
+        return view
+
+    def views(self, indices: Sequence[int]) -> List[NodeView]:
+        return [self.view(index) for index in indices]
+
+    def _index_of_id(self, node_id: Any) -> int:
+        if node_id is None:
+            return -1
+        try:
+            node_id = int(node_id)
+        except (TypeError, ValueError):
+            return -1
+        position = np.searchsorted(self._sorted_ids, node_id)
+        if position < len(self._sorted_ids) \
+                and self._sorted_ids[position] == node_id:
+            return int(self._id_sorter[position])
+        return -1
+
+    def _set_value(self, index: int, key: str, value: Any):
+        self.clear_cache()
+        column = self.columns.get(key)
+
+        if column is None:
+            if value is _MISSING:
+                return
+            column = np.empty(len(self), dtype=object)
+            column[:] = _MISSING
+            self.columns[key] = column
+
+        elif column.dtype != object:
+            if value is _MISSING:
+                column = column.astype(object)
+                self.columns[key] = column
+            else:
+                required = np.result_type(column.dtype, np.asarray(value))
+                if required != column.dtype:
+                    column = column.astype(required)
+                    self.columns[key] = column
+
+        column[index] = value
+
+    # ---------------------------------------------------------------------
+    # SimpleTree interface
+
+    def __len__(self):
+        return len(self._ids)
+
+    def node_ids(self):
+        return self._ids.tolist()
+
+    def nodes(self, node_ids=None):
+        if node_ids is None:
+            return self.views(range(len(self)))
+        return [
+            self.view(index) if index >= 0 else None
+            for index in map(self._index_of_id, node_ids)
+        ]
+
+    def filter_nodes(self, criterion):
+        return list(filter(criterion, self.nodes()))
+
+    def value_map(self, from_fn, to_fn):
+        vm = {}
+        for node in self.nodes():
+            key = from_fn(node)
+            value = to_fn(node)
+
+            if key in vm:
+                raise RuntimeError(
+                    'from_fn is not unique across nodes. '
+                    'Collision between {0} and {1}.'.format(value, vm[key]))
+            vm[key] = value
+
+        return vm
+
+    def parent_ids(self, node_ids):
+        parent_ids = []
+        for index in map(self._index_of_id, node_ids):
+            parent = self._parent_index[index]
+            parent_ids.append(int(self._ids[parent]) if parent >= 0 else None)
+        return parent_ids
+
+    def child_ids(self, node_ids):
+        return [
+            self._ids[self.children_indices(index)].tolist()
+            for index in map(self._index_of_id, node_ids)
+        ]
+
+    def parents(self, node_ids):
+        return self.nodes(self.parent_ids(node_ids))
+
+    def children(self, node_ids):
+        return [
+            self.views(self.children_indices(index))
+            for index in map(self._index_of_id, node_ids)
+        ]
+
+    # ---------------------------------------------------------------------
+    # Morphology interface
+
+    def parent_id_cb(self, node):
+        index = self.index_of(node)
+        if index < 0:
+            parent_id = self._parent_id_cb(node)
+            return parent_id if self._index_of_id(parent_id) >= 0 else None
+
+        parent = self._parent_index[index]
+        return int(self._ids[parent]) if parent >= 0 else None
+
+    def children_of(self, node):
+        if node:
+            index = self.index_of(node)
+            if index >= 0:
+                return self.views(self.children_indices(index))
+        return None
+
+    def parent_of(self, node):
+        if node:
+            index = self.index_of(node)
+            if index >= 0:
+                parent = self._parent_index[index]
+                if parent >= 0:
+                    return self.view(parent)
+        return None
+
+    def node_by_id(self, node_id):
+        index = self._index_of_id(node_id)
+        if index < 0:
+            raise KeyError(node_id)
+        return self.view(index)
+
+    def get_root(self):
+        roots = np.flatnonzero(self._parent_index < 0)
+        if len(roots):
+            return self.view(roots[0])
+        return None
+
+    def get_roots(self):
+        return self.views(np.flatnonzero(self._parent_index < 0))
+
+    def get_roots_for_nodes(self, nodes):
+        indices = np.fromiter(
+            (self.index_of(node) for node in nodes),
+            dtype=np.int64,
+            count=len(nodes)
+        )
+        if len(indices) == 0:
+            return []
+        parents = self._parent_index[indices]
+        is_root = (parents < 0) | ~np.isin(parents, indices)
+        return [node for node, root in zip(nodes, is_root) if root]
+
+    def get_node_by_types(self, node_types=None):
+        return self.views(self.indices_by_types(node_types))
+
+    def get_non_soma_nodes(self):
+        return self.views(np.flatnonzero(self.types != SOMA))
+
+    def get_max_id(self):
+        return int(self._ids.max())
+
+    def get_leaf_nodes(self, node_types=None):
+        return self.views(self._select_by_children(
+            node_types, lambda counts: counts == 0))
+
+    def get_branching_nodes(self, node_types=None):
+        return self.views(self._select_by_children(
+            node_types, lambda counts: counts > 1))
+
+    def _select_by_children(self, node_types, criterion):
+        if not node_types:
+            indices = np.flatnonzero(self.types != SOMA)
+        else:
+            indices = self.indices_by_types(node_types)
+        return indices[criterion(self.num_children[indices])]
+
+    @property
+    def compartments(self):
+        return self.get_compartments()
+
+    @property
+    def compartments_for_nodes(self):
+        return {
+            int(self._ids[index]): [self.view(parent), self.view(index)]
+            for index, parent in enumerate(self._parent_index)
+            if parent >= 0
+        }
+
+    def _create_compartment_dictionary(self):
+        # compartments are derived on request from the parent index
+        pass
+
+    def get_compartments(self, nodes=None, node_types=None):
+        if not nodes:
+            indices = np.arange(len(self))
+        else:
+            indices = np.fromiter(
+                (self.index_of(node) for node in nodes),
+                dtype=np.int64,
+                count=len(nodes)
+            )
+            indices = indices[indices >= 0]
+
+        parents = self._parent_index[indices]
+        keep = parents >= 0
+        if node_types:
+            keep &= np.isin(
+                self.types[np.where(keep, parents, 0)], list(node_types))
+
+        return [
+            [self.view(parent), self.view(index)]
+            for parent, index in zip(parents[keep], indices[keep])
+        ]
+
+    def get_compartment_for_node(self, node, node_types=None):
+        index = self.index_of(node)
+        if index < 0:
+            return None
+        parent = self._parent_index[index]
+        if parent < 0:
+            return None
+
+        if node_types:
+            if self.types[parent] not in node_types \
+                    or self.types[index] not in node_types:
+                return None
+        return [self.view(parent), self.view(index)]
+
+    def get_dimensions(self, node_types=None):
+        if node_types:
+            indices = self.indices_by_types(node_types)
+            if len(indices) == 0:
+                return None
+        else:
+            indices = np.arange(len(self))
+
+        positions = self.positions(indices)
+        min_xyz = positions.min(axis=0).tolist()
+        max_xyz = positions.max(axis=0).tolist()
+        size = [high - low for low, high in zip(min_xyz, max_xyz)]
+
+        return size, min_xyz, max_xyz
+
+    def clone(self):
+        new = self.__class__.__new__(self.__class__)
+        new._setup(
+            self._ids.copy(),
+            self._parent_index.copy(),
+            {key: column.copy() for key, column in self.columns.items()}
+        )
+        new.node_id_cb = self.node_id_cb
+        new._parent_id_cb = self._parent_id_cb
+        return new
+
+    def build_intermediate_nodes(self, make_intermediates_cb, set_parent_id_cb):
+        # As in Morphology, nodes of the root's tree are visited breadth
+        # first. Each visited child's intermediates are chained between it
+        # and its parent. Inserted nodes are appended to the arrays, which
+        # are then rebuilt once.
+
+        order: List[int] = []
+        self.breadth_first_traversal(
+            lambda node: order.append(self.index_of(node)))
+
+        index_of_id = {
+            int(node_id): index for index, node_id in enumerate(self._ids)}
+        parent_index = self._parent_index.tolist()
+        new_nodes: List[Dict[str, Any]] = []
+        max_id = self.get_max_id()
+
+        for child_index in order:
+            child = self.view(child_index)
+            parent_id = self.parent_id_cb(child)
+            if parent_id is None:
+                continue
+
+            parent = self.node_by_id(parent_id)
+            intermediates = make_intermediates_cb(child, parent, max_id)
+
+            for new_node in intermediates:
+                new_id = self.node_id_cb(new_node)
+                new_index = len(parent_index)
+                index_of_id[new_id] = new_index
+                max_id = max(max_id, new_id)
+
+                parent_index.append(
+                    index_of_id.get(self._parent_id_cb(new_node), -1))
+                parent_index[child_index] = new_index
+                new_nodes.append(new_node)
+
+                set_parent_id_cb(child, new_id)
+
+        if not new_nodes:
+            return
+
+        keys: Dict[str, None] = dict.fromkeys(self.columns)
+        for node in new_nodes:
+            keys.update(dict.fromkeys(node))
+
+        columns = {}
+        for key in keys:
+            new_column = _build_column(
+                key, [node.get(key, _MISSING) for node in new_nodes])
+            column = self.columns.get(key)
+            if column is None:
+                column = np.empty(len(self), dtype=object)
+                column[:] = _MISSING
+            if new_column.dtype == object and column.dtype != object:
+                column = column.astype(object)
+            elif column.dtype == object and new_column.dtype != object:
+                new_column = new_column.astype(object)
+            columns[key] = np.concatenate([column, new_column])
+
+        node_ids = np.concatenate([
+            self._ids,
+            np.array([self.node_id_cb(node) for node in new_nodes],
+                     dtype=np.int64)
+        ])
+        self._setup(
+            node_ids, np.array(parent_index, dtype=np.int64), columns)
+        self.clear_cache()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_views"] = None
+        state["nodes_by_types"] = {}
+        state["_cache"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views = [None] * len(self._ids)
+
+
+def _build_column(key: str, values: Sequence[Any]) -> np.ndarray:
+    """ Convert a sequence of per-node values to a column array.
+    """
+
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        values_array = values
+    else:
+        values = list(values)
+        if any(value is _MISSING for value in values):
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+            return column
+        values_array = np.asarray(values) if values else np.empty(0)
+
+    if key in FLOAT_COLUMNS:
+        return np.ascontiguousarray(values_array, dtype=np.float64)
+    if key in INT_COLUMNS:
+        return np.ascontiguousarray(values_array, dtype=np.int64)
+    if values_array.dtype.kind not in "biuf" or values_array.ndim != 1:
+        column = np.empty(len(values_array), dtype=object)
+        column[:] = list(values_array) if values_array.ndim != 1 else values_array
+        return column
+    return values_array
+
+
+def _locate(
+    node_ids: np.ndarray,
+    query_ids: Sequence[int],
+    sorter: Optional[np.ndarray] = None,
+    sorted_ids: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """ Find the positions of query_ids within node_ids. Missing ids map to -1.
+    """
+
+    if sorter is None:
+        sorter = np.argsort(node_ids, kind="stable")
+    if sorted_ids is None:
+        sorted_ids = node_ids[sorter]
+
+    query_ids = np.asarray(query_ids, dtype=np.int64)
+    if len(sorted_ids) == 0:
+        return np.full(query_ids.shape, -1, dtype=np.int64)
+
+    positions = np.searchsorted(sorted_ids, query_ids)
+    positions = np.minimum(positions, len(sorted_ids) - 1)
+    found = sorted_ids[positions] == query_ids
+    return np.where(found, sorter[positions], -1).astype(np.int64)
+
+
+def _build_child_csr(parent_index: np.ndarray):
+    """ Build a compressed sparse row representation of child relationships.
+    Within each node's children, input order is preserved.
+
+    Returns
+    -------
+    offsets : the children of node i are child_index[offsets[i]:offsets[i+1]]
+    child_index : array indices of children, grouped by parent
+
+    """
+
+    num_nodes = len(parent_index)
+    has_parent = parent_index >= 0
+
+    counts = np.bincount(parent_index[has_parent], minlength=num_nodes)
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    order = np.argsort(parent_index, kind="stable")
+    child_index = order[num_nodes - np.count_nonzero(has_parent):]
+
+    return offsets, child_index.astype(np.int64)
@@ -0,0 +1,198 @@
+""" A compact binary container for morphologies. Each file holds a short JSON
+header followed by fixed-width, little-endian column arrays (one per node
+attribute). Columns are memory-mapped on load, so opening even a very large
+reconstruction is near-instant and processes which open the same file share
+its pages.
+
+Layout
+------
+    bytes 0-7     : MAGIC
+    bytes 8-15    : header length in bytes (little-endian uint64)
+    bytes 16-     : utf-8 JSON header
+    (padding)     : each column starts on an ALIGNMENT byte boundary
+
+The header records:
+    schema_version : the version of this layout (SCHEMA_VERSION)
+    units : the spatial units of x, y, z and radius
+    transforms : a list of json-serializable descriptions of the transforms
+        which have been applied to this morphology, oldest first
+    num_nodes : the number of nodes (and length of each column)
+    columns : for each column, its name, dtype and byte offset
+
+"""
+
+import json
+import struct
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.array_morphology import ArrayMorphology
+
+
+MAGIC = b"NMORPHB\x00"
+SCHEMA_VERSION = 1
+ALIGNMENT = 64
+DEFAULT_UNITS = "micrometer"
+
+_LENGTH_FORMAT = "<Q"
+_PREAMBLE_SIZE = len(MAGIC) + struct.calcsize(_LENGTH_FORMAT)
+
+
+def write_binary(
+    morphology: Morphology,
+    path: str,
+    units: str = DEFAULT_UNITS,
+    transforms: Optional[List[Dict[str, Any]]] = None
+):
+    """ Write a morphology to a binary morphology file.
+
+    Parameters
+    ----------
+    morphology : the morphology to write. All node attributes must be numeric
+        and present on every node.
+    path : the file to write
+    units : the spatial units of this morphology
+    transforms : json-serializable descriptions of the transforms already
+        applied to this morphology, oldest first
+
+    """
+
+    if not isinstance(morphology, ArrayMorphology):
+        morphology = ArrayMorphology.from_morphology(morphology)
+
+    columns = {}
+    for name, column in morphology.columns.items():
+        if column.dtype.kind not in "biuf":
+            raise ValueError(
+                f"cannot write non-numeric (or ragged) column: {name}")
+        columns[name] = np.ascontiguousarray(
+            column, dtype=column.dtype.newbyteorder("<"))
+
+    header: Dict[str, Any] = {
+        "schema_version": SCHEMA_VERSION,
+        "units": units,
+        "transforms": list(transforms or []),
+        "num_nodes": len(morphology),
+        "columns": [],
+    }
+
+    # column offsets depend on the header's size, which depends on the
+    # offsets. Offsets only grow, so this settles after a pass or two.
+    data_start = 0
+    while True:
+        offset = data_start
+        header["columns"] = []
+        for name, column in columns.items():
+            header["columns"].append({
+                "name": name,
+                "dtype": column.dtype.str,
+                "offset": offset,
+            })
+            offset = _align(offset + column.nbytes)
+
+        encoded = json.dumps(header).encode("utf-8")
+        required_start = _align(_PREAMBLE_SIZE + len(encoded))
+        if required_start <= data_start:
+            break
+        data_start = required_start
+
+    with open(path, "wb") as binary_file:
+        binary_file.write(MAGIC)
+        binary_file.write(struct.pack(_LENGTH_FORMAT, len(encoded)))
+        binary_file.write(encoded)
+
+        for spec, column in zip(header["columns"], columns.values()):
+            binary_file.write(b"\x00" * (spec["offset"] - binary_file.tell()))
+            binary_file.write(column.tobytes())
+
+
+def read_binary_header(path: str) -> Dict[str, Any]:
+    """ Read the header of a binary morphology file, without loading any
+    node data.
+
+    Parameters
+    ----------
+    path : the file to read
+
+    Returns
+    -------
+    The header dictionary (see this module's docstring)
+
+    """
+
+    with open(path, "rb") as binary_file:
+        magic = binary_file.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary morphology file")
+
+        header_length, = struct.unpack(
+            _LENGTH_FORMAT,
+            binary_file.read(struct.calcsize(_LENGTH_FORMAT))
+        )
+        header = json.loads(binary_file.read(header_length).decode("utf-8"))
+
+    if header["schema_version"] > SCHEMA_VERSION:
+        raise ValueError(
+            f"{path} has schema version {header['schema_version']}, but only "
+            f"versions up to {SCHEMA_VERSION} are supported"
+        )
+    return header
+
+
+def read_binary_columns(path: str, mode: str = "c") -> Dict[str, np.ndarray]:
+    """ Memory-map the column arrays of a binary morphology file.
+
+    Parameters
+    ----------
+    path : the file to read
+    mode : passed to np.memmap. The default, "c" (copy-on-write), allows the
+        returned arrays to be modified without altering the file. Use "r" to
+        forbid modification or "r+" to write changes back to the file.
+
+    Returns
+    -------
+    A dictionary mapping column names to memory-mapped arrays
+
+    """
+
+    header = read_binary_header(path)
+    num_nodes = header["num_nodes"]
+
+    columns = {}
+    for spec in header["columns"]:
+        dtype = np.dtype(spec["dtype"])
+        if num_nodes == 0:
+            columns[spec["name"]] = np.empty(0, dtype=dtype)
+            continue
+        columns[spec["name"]] = np.memmap(
+            path,
+            dtype=dtype,
+            mode=mode,
+            offset=spec["offset"],
+            shape=(num_nodes,)
+        )
+    return columns
+
+
+def morphology_from_binary(path: str, mode: str = "c") -> ArrayMorphology:
+    """ Load a morphology from a binary morphology file. Node data are
+    memory-mapped rather than read into memory.
+
+    Parameters
+    ----------
+    path : the file to read
+    mode : see read_binary_columns
+
+    Returns
+    -------
+    An ArrayMorphology backed by the file's columns
+
+    """
+
+    return ArrayMorphology.from_arrays(**read_binary_columns(path, mode=mode))
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,152 @@
+""" Vectorized per-compartment geometry. A compartment is a (parent, child)
+pair of connected nodes. Rather than looping over compartments in Python,
+the CompartmentTable computes lengths, lateral surface areas, volumes and
+midpoints for every compartment of a morphology at once.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from neuron_morphology.constants import SOMA
+
+
+class CompartmentTable:
+
+    def __init__(
+        self,
+        parent: np.ndarray,
+        child: np.ndarray,
+        parent_type: np.ndarray,
+        child_type: np.ndarray,
+        parent_is_root: np.ndarray,
+        parent_radius: np.ndarray,
+        child_radius: np.ndarray,
+        length: np.ndarray,
+        surface_area: np.ndarray,
+        volume: np.ndarray,
+        midpoint: np.ndarray
+    ):
+        """ Geometry of each compartment in a morphology, stored as parallel
+        arrays. Compartments are ordered by their child node.
+
+        Parameters
+        ----------
+        parent : the (array) index of each compartment's parent node
+        child : the (array) index of each compartment's child node
+        parent_type : the structure type of each parent node
+        child_type : the structure type of each child node
+        parent_is_root : whether each parent node is a root of the morphology
+        parent_radius : the radius of each parent node
+        child_radius : the radius of each child node
+        length : the euclidean distance between parent and child
+        surface_area : the lateral surface area of each compartment, treated
+            as a circular conic frustum. See
+            Morphology.get_compartment_surface_area
+        volume : the volume of each compartment, treated as a circular conic
+            frustum. See Morphology.get_compartment_volume
+        midpoint : (N, 3) array of compartment midpoints
+
+        """
+
+        self.parent = parent
+        self.child = child
+        self.parent_type = parent_type
+        self.child_type = child_type
+        self.parent_is_root = parent_is_root
+        self.parent_radius = parent_radius
+        self.child_radius = child_radius
+        self.length = length
+        self.surface_area = surface_area
+        self.volume = volume
+        self.midpoint = midpoint
+
+    def __len__(self):
+        return len(self.child)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        parent_index: np.ndarray,
+        types: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray,
+        radius: np.ndarray
+    ) -> "CompartmentTable":
+        """ Build a compartment table from per-node arrays.
+
+        Parameters
+        ----------
+        parent_index : for each node, the index of its parent (-1 for roots)
+        types : the structure type of each node
+        x, y, z : node positions
+        radius : node radii. Nan radii produce nan areas and volumes.
+
+        Returns
+        -------
+        A CompartmentTable with one entry per non-root node
+
+        """
+
+        child = np.flatnonzero(parent_index >= 0)
+        parent = parent_index[child]
+
+        positions = np.stack([x, y, z], axis=1).astype(np.float64)
+        parent_positions = positions[parent]
+        child_positions = positions[child]
+
+        length = np.sqrt(
+            np.sum((child_positions - parent_positions) ** 2, axis=1))
+
+        parent_radius = np.asarray(radius, dtype=np.float64)[parent]
+        child_radius = np.asarray(radius, dtype=np.float64)[child]
+        radius_sum = parent_radius + child_radius
+
+        slant_height = np.sqrt((child_radius - parent_radius) ** 2 + length ** 2)
+        surface_area = np.pi * radius_sum * slant_height
+        volume = (np.pi * length / 3) * (
+            parent_radius ** 2 + parent_radius * child_radius + child_radius ** 2
+        )
+
+        return cls(
+            parent=parent,
+            child=child,
+            parent_type=types[parent],
+            child_type=types[child],
+            parent_is_root=parent_index[parent] < 0,
+            parent_radius=parent_radius,
+            child_radius=child_radius,
+            length=length,
+            surface_area=surface_area,
+            volume=volume,
+            midpoint=(parent_positions + child_positions) * 0.5
+        )
+
+    def type_mask(self, node_types: Optional[Sequence[int]] = None) -> np.ndarray:
+        """ Select compartments whose parent and child are both of the argued
+        types. This matches the compartments obtained from:
+            morphology.get_compartments(
+                morphology.get_node_by_types(node_types), node_types)
+
+        Parameters
+        ----------
+        node_types : if falsy, all compartments are selected
+
+        Returns
+        -------
+        A boolean mask over this table's compartments
+
+        """
+
+        if not node_types:
+            return np.ones(len(self), dtype=bool)
+
+        node_types = list(node_types)
+        return np.isin(self.parent_type, node_types) \
+            & np.isin(self.child_type, node_types)
+
+    def soma_root_mask(self) -> np.ndarray:
+        """ Select compartments whose parent is a root soma node.
+        """
+        return self.parent_is_root & (self.parent_type == SOMA)
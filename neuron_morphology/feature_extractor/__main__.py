@@ -1,7 +1,8 @@
 import copy as cp
 import logging
 import multiprocessing as mp
-import functools
+from multiprocessing import resource_tracker
+import os
 from typing import Dict, Any, Tuple, List, Set, Optional, Type
 
 from argschema import ArgSchemaParser
@@ -9,11 +10,13 @@ from argschema import ArgSchemaParser
 from neuron_morphology.feature_extractor._schemas import (
     InputParameters, OutputParameters)
 
-from neuron_morphology.feature_extractor.run_feature_extraction import \
-    run_feature_extraction
+from neuron_morphology.feature_extractor.parallel import (
+    initialize_worker, extract_in_worker, receive_result,
+    DEFAULT_SHARED_MEMORY_THRESHOLD)
 
+from neuron_morphology.feature_extractor.result_cache import ResultCache
 from neuron_morphology.feature_extractor.feature_writer import (
-    FeatureWriter, DEFAULT_FEATURE_FORMATTERS)
+    FeatureWriter, StreamingFeatureWriter, DEFAULT_FEATURE_FORMATTERS)
 
 
 def extract_multiple(
@@ -24,13 +27,22 @@ def extract_multiple(
     only_marks: Optional[List[str]] = None,
     num_processes: Optional[int] = None,
     global_parameters: Optional[Dict[str, Any]] = None,
-    output_table_path: Optional[str] = None
+    output_table_path: Optional[str] = None,
+    profile_output_path: Optional[str] = None,
+    flush_every: Optional[int] = None,
+    resume: bool = False,
+    array_features_as_lists: bool = False,
+    chunksize: Optional[int] = None,
+    fail_fast: bool = False,
+    shared_memory_threshold: Optional[int] = DEFAULT_SHARED_MEMORY_THRESHOLD,
+    result_cache_path: Optional[str] = None,
+    result_cache_max_bytes: Optional[int] = None
 ):
     """ For each path in swc_paths, load the file into a morphology and (attempt 
     to) extract each feature in the set specified by feature_set.
 
-    Because of how Windows handles multiprocessing, run_feature_extraction
-    must be in another py file.
+    Because of how Windows handles multiprocessing, the worker functions
+    must be in another py file (see parallel.py).
 
     Parameters
     ----------
@@ -44,41 +56,118 @@ def extract_multiple(
     global_parameters : a dictionary specifying cross-reconstruction
         parameters
     output_table_path : if not none, write a flattened table of features here
+        (.csv, .parquet or .feather)
+    profile_output_path : if not none, profile each feature's timing and
+        memory use and write a summary across reconstructions here (.csv or
+        .json)
+    flush_every : if provided, stream results to output_table_path (which
+        must be provided), holding at most this many runs in memory. See
+        StreamingFeatureWriter.
+    resume : when streaming, skip reconstructions whose identifiers are
+        already in the output table
+    array_features_as_lists : when writing a .parquet or .feather table,
+        store array-valued features as fixed-size list columns rather than
+        one column per element
+    chunksize : send reconstructions to pool workers in batches of this size.
+        Defaults to about 4 batches per worker.
+    fail_fast : if True, the first failing reconstruction raises. Otherwise,
+        failures are recorded per reconstruction (under an "error" key) and
+        extraction continues.
+    shared_memory_threshold : pool workers return arrays of at least this
+        many bytes through shared memory rather than pickling them. None to
+        disable.
+    result_cache_path : if provided, feature values are stored in a
+        persistent cache in this directory, keyed on the swc's contents, the
+        feature and the parameters. Values already in the cache are reused
+        rather than recalculated.
+    result_cache_max_bytes : once extraction is complete, evict the least
+        recently used entries from the result cache until it is at most this
+        large
 
     Returns
     -------
     a dictionary whose keys are reconstruction identifers and whose values are
-        the outputs of run_feature_extraction for those reconstructions.
+        the outputs of run_feature_extraction for those reconstructions. When
+        streaming, a summary of the written outputs instead.
 
     """
 
+    if flush_every is not None:
+        writer: FeatureWriter = StreamingFeatureWriter(
+            heavy_output_path,
+            output_table_path,
+            formatters=DEFAULT_FEATURE_FORMATTERS,
+            profile_path=profile_output_path,
+            flush_every=flush_every,
+            resume=resume
+        )
+        reconstructions = [
+            reconstruction for reconstruction in reconstructions
+            if not writer.has_run(reconstruction.get(
+                "identifier", reconstruction.get("swc_path")))
+        ]
+    else:
+        writer = FeatureWriter(
+            heavy_output_path,
+            output_table_path,
+            formatters=DEFAULT_FEATURE_FORMATTERS,
+            profile_path=profile_output_path,
+            array_features_as_lists=array_features_as_lists
+        )
+
     num_processes = num_processes if num_processes else mp.cpu_count()
-    num_processes = min(num_processes, len(reconstructions))
+    num_processes = max(min(num_processes, len(reconstructions)), 1)
 
     global_parameters = {} if global_parameters is None else global_parameters
 
-    extract = functools.partial(
-        run_feature_extraction,
-        feature_set=feature_set,
-        only_marks=only_marks,
-        required_marks=required_marks,
-        global_parameter_spec=global_parameters
+    worker_args = (
+        feature_set,
+        only_marks,
+        required_marks,
+        global_parameters,
+        profile_output_path is not None,
+        not fail_fast
     )
 
     if num_processes > 1:
-        pool = mp.Pool(num_processes)
-        mapper = pool.imap_unordered(extract, reconstructions)
+        if chunksize is None:
+            chunksize = max(len(reconstructions) // (4 * num_processes), 1)
+
+        if shared_memory_threshold is not None and os.name != "nt":
+            # workers should share the parent's tracker, so that shared
+            # memory they create is forgotten once the parent frees it
+            resource_tracker.ensure_running()
+
+        pool = mp.Pool(
+            num_processes,
+            initializer=initialize_worker,
+            initargs=worker_args + (shared_memory_threshold, result_cache_path)
+        )
+        mapper = pool.imap_unordered(
+            extract_in_worker, reconstructions, chunksize=chunksize)
     else:
-        mapper = (extract(morph) for morph in reconstructions) # type: ignore[assignment]
-
-    writer = FeatureWriter(
-        heavy_output_path,
-        output_table_path,
-        formatters=DEFAULT_FEATURE_FORMATTERS
-    )
-
-    for identifier, run in mapper:
-        writer.add_run(identifier, run)
+        pool = None
+        initialize_worker(*worker_args, result_cache_path=result_cache_path)
+        mapper = (extract_in_worker(morph) for morph in reconstructions) # type: ignore[assignment]
+
+    try:
+        for identifier, run in mapper:
+            run = receive_result(run)
+            if "error" in run:
+                writer.add_failure(identifier, run["error"])
+            else:
+                writer.add_run(identifier, run)
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    if result_cache_path is not None:
+        ResultCache(result_cache_path, result_cache_max_bytes).evict()
 
     return writer.write()
 
@@ -93,8 +182,7 @@ def main():
     logging.getLogger().setLevel(inputs_record.pop("log_level"))
     inputs_record.pop("input_json", None)
     inputs_record.pop("output_json", None)
-    output_table_path = inputs_record.pop("output_table_path", None)
-    
+
     output = {}
     output.update({"inputs": parser.args})
     output.update({"results": extract_multiple(**inputs_record)})
@@ -1,6 +1,7 @@
 from argschema.schemas import ArgSchema, DefaultSchema
 from argschema.fields import (
-    InputFile, OutputFile, String, Nested, Dict, List, Int, Field, Float)
+    InputFile, OutputFile, String, Nested, Dict, List, Int, Field, Float,
+    Boolean)
 from marshmallow import ValidationError
 
 from neuron_morphology.features.layer.layered_point_depths import \
@@ -149,10 +150,97 @@ class InputParameters(ArgSchema):
         description=(
             "this module writes outputs to a json specified as --output_json. "
             "If you want to store outputs in a different format "
-            "(.csv is supported currently), specify this parameter"
+            "(.csv, .parquet or .feather / .arrow are supported), specify "
+            "this parameter. Parquet and feather outputs require pyarrow."
         ),
         required=False
     )
+    array_features_as_lists = Boolean(
+        description=(
+            "When writing a .parquet or .feather output table, store "
+            "array-valued features (e.g. moments) as fixed-size list columns "
+            "rather than exploding them into one column per element"
+        ),
+        required=False,
+        default=False
+    )
+    profile_output_path = OutputFile(
+        description=(
+            "If provided, record the wall time, cpu time and peak memory use "
+            "of each feature and write a summary (per feature and per mark, "
+            "across reconstructions) to this .csv or .json file"
+        ),
+        required=False
+    )
+    flush_every = Int(
+        description=(
+            "If provided, stream results to output_table_path (required in "
+            "this case) and heavy_output_path, holding at most this many "
+            "reconstructions' results in memory. The output json will then "
+            "contain a summary rather than the results themselves."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    resume = Boolean(
+        description=(
+            "When streaming (see flush_every), skip reconstructions whose "
+            "identifiers are already present in output_table_path, rather "
+            "than overwriting it"
+        ),
+        required=False,
+        default=False
+    )
+    chunksize = Int(
+        description=(
+            "Send reconstructions to pool workers in batches of this size. "
+            "Default is about 4 batches per worker."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    fail_fast = Boolean(
+        description=(
+            "Stop at the first reconstruction whose feature extraction fails. "
+            "By default, failures are recorded per reconstruction and "
+            "extraction continues."
+        ),
+        required=False,
+        default=False
+    )
+    shared_memory_threshold = Int(
+        description=(
+            "Pool workers return array results of at least this many bytes "
+            "through shared memory rather than by pickling them"
+        ),
+        required=False,
+        default=2 ** 20,
+        allow_none=True
+    )
+    result_cache_path = String(
+        description=(
+            "If provided, store each calculated feature value in a persistent "
+            "cache in this directory, keyed on the contents of the swc file, "
+            "the feature and its parameters and the package version. Values "
+            "already present are reused, so that rerunning with changed "
+            "parameters or features only recalculates what has changed."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    result_cache_max_bytes = Int(
+        description=(
+            "After extraction, evict the least recently used entries from the "
+            "result cache until it is at most this many bytes. By default the "
+            "cache is unbounded."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
     num_processes = Int(
         description=(
             "Run a multiprocessing pool with this many processes. "
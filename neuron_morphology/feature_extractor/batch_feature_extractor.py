@@ -0,0 +1,161 @@
+""" Extract features from many cells at once. Rather than running each
+feature once per cell, batch features (see neuron_morphology.features.batch)
+are run once per MorphologyBatch and their results are split by cell.
+"""
+
+from typing import (
+    AbstractSet, Any, Callable, Dict, Hashable, Optional, Type)
+import logging
+
+import numpy as np
+
+from neuron_morphology.constants import (
+    SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE)
+from neuron_morphology.morphology_batch import MorphologyBatch
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor.mark import (
+    Mark, RequiresSoma, RequiresAxon, RequiresApical, RequiresBasal,
+    RequiresDendrite, RequiresRoot)
+
+
+# Per-cell counterparts of Mark.validate. Marks which do not override
+# validate are valid for every cell.
+BATCH_MARK_VALIDATORS: Dict[
+    Type[Mark], Callable[[MorphologyBatch], np.ndarray]
+] = {
+    RequiresSoma: lambda batch: batch.has_type(SOMA),
+    RequiresAxon: lambda batch: batch.has_type(AXON),
+    RequiresApical: lambda batch: batch.has_type(APICAL_DENDRITE),
+    RequiresBasal: lambda batch: batch.has_type(BASAL_DENDRITE),
+    RequiresDendrite: lambda batch: (
+        batch.has_type(APICAL_DENDRITE) | batch.has_type(BASAL_DENDRITE)),
+    RequiresRoot: lambda batch: batch.get_roots() >= 0,
+}
+
+
+def validate_mark(mark: Type[Mark], batch: MorphologyBatch) -> np.ndarray:
+    """ Determine for each cell of a batch whether a mark validates
+
+    Parameters
+    ----------
+    mark : to be validated
+    batch : the cells against which to validate
+
+    Returns
+    -------
+    A (num_cells,) boolean array
+
+    Raises
+    ------
+    ValueError : if this mark's validation has no batch counterpart
+
+    """
+
+    if mark in BATCH_MARK_VALIDATORS:
+        return BATCH_MARK_VALIDATORS[mark](batch)
+    if getattr(mark.validate, "__func__", None) is Mark.validate.__func__:
+        return np.ones(batch.num_cells, dtype=bool)
+    raise ValueError(f"unable to validate {mark.__name__} on a batch")
+
+
+class BatchFeatureExtractor(FeatureExtractor):
+    """ Extracts features from every cell of a MorphologyBatch. Registered
+    features must be batch features: each is called once with the batch and
+    returns arrays (or dictionaries of arrays) whose first axis indexes
+    cells.
+    """
+
+    def extract(  # type: ignore[override]
+        self,
+        batch: MorphologyBatch,
+        only_marks: Optional[AbstractSet[Type[Mark]]] = None,
+        required_marks: AbstractSet[Type[Mark]] = frozenset(),
+        profile: bool = False
+    ) -> Dict[Hashable, Dict[str, Any]]:
+        """ Run the feature extractor for a batch of cells. Marks are
+        validated, and features selected, per cell just as in
+        FeatureExtractor.extract.
+
+        Parameters
+        ----------
+        batch : the cells from which features will be calculated
+        only_marks : if provided, reject features not marked with marks in
+            this set
+        required_marks : if provided, raise an exception if any of these
+            marks do not validate successfully for any cell
+        profile : not supported for batches
+
+        Returns
+        -------
+        A dictionary mapping each cell's identifier to a serialized run (see
+            FeatureExtractionRun.serialize), suitable for
+            FeatureWriter.add_run
+
+        """
+
+        if profile:
+            raise ValueError("profiling is not supported for batches")
+
+        if only_marks is None:
+            only_marks = set()
+
+        valid = {mark: validate_mark(mark, batch) for mark in self.marks}
+
+        for mark in required_marks:
+            is_valid = valid[mark] if mark in valid \
+                else validate_mark(mark, batch)
+            failed = np.flatnonzero(~is_valid)
+            if len(failed):
+                raise ValueError(
+                    f"required mark: {mark.__name__} failed validation for "
+                    f"{[batch.identifiers[index] for index in failed]}"
+                )
+
+        selected = np.ones((len(self.features), batch.num_cells), dtype=bool)
+        for ii, feature in enumerate(self.features):
+            for mark in feature.marks:
+                selected[ii] &= valid[mark]
+            if only_marks - feature.marks:
+                selected[ii] = False
+
+        runs: Dict[Hashable, Dict[str, Any]] = {
+            identifier: {
+                "results": {},
+                "selected_marks": [
+                    mark.__name__ for mark, is_valid in valid.items()
+                    if is_valid[index]
+                ],
+                "selected_features": [
+                    feature.name
+                    for ii, feature in enumerate(self.features)
+                    if selected[ii, index]
+                ],
+            }
+            for index, identifier in enumerate(batch.identifiers)
+        }
+
+        for ii, feature in enumerate(self.features):
+            if not selected[ii].any():
+                logging.info(f"skipping feature: {feature.name} (no cells)")
+                continue
+
+            values = feature(batch)
+            for index in np.flatnonzero(selected[ii]):
+                runs[batch.identifiers[index]]["results"][feature.name] = \
+                    _cell_value(values, index)
+
+        return runs
+
+
+def _cell_value(values: Any, index: int) -> Any:
+    """ Select one cell's entry from a batch feature's output
+    """
+
+    if isinstance(values, dict):
+        return {key: _cell_value(value, index) for key, value in values.items()}
+
+    value = values[index]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -2,10 +2,15 @@ from typing import (
     AbstractSet, Set, Collection, Optional, Dict, Type, FrozenSet, List)
 import logging
 import warnings
+import time
+import tracemalloc
 
 from neuron_morphology.feature_extractor.data import Data
 from neuron_morphology.feature_extractor.marked_feature import MarkedFeature
 from neuron_morphology.feature_extractor.mark import Mark
+from neuron_morphology.feature_extractor.provider import (
+    IntermediateCache, CACHE_ATTRIBUTE)
+from neuron_morphology.feature_extractor.result_cache import ResultCache
 
 
 class FeatureExtractionRun:
@@ -24,6 +29,9 @@ class FeatureExtractionRun:
         self.selected_marks: Set[Type[Mark]] = set()
         self.selected_features: List[MarkedFeature] = []
         self.results: Optional[Dict] = None
+        self.intermediate_cache: Optional[IntermediateCache] = None
+        self.profile: Optional[Dict[str, Dict]] = None
+        self.result_cache_report: Optional[Dict[str, int]] = None
 
     def select_marks(
         self, 
@@ -96,23 +104,86 @@ class FeatureExtractionRun:
         logging.info(f"selected features: {[feature.name for feature in self.selected_features]}")
         return self
 
-    def extract(self):
+    def extract(
+        self,
+        profile: bool = False,
+        result_cache: Optional[ResultCache] = None,
+        data_key: Optional[str] = None
+    ):
         """ For each selected feature, carry out calculation on this run's 
-        dataset.
+        dataset. Intermediates declared as providers (see
+        feature_extractor.provider) are computed once and shared among
+        features.
+
+        Parameters
+        ----------
+        profile : if True, record the wall time, cpu time and peak allocated
+            memory of each feature (and summed across the features carrying
+            each mark) in this run's profile. Memory is tracked using
+            tracemalloc, which slows calculation. Features read from
+            result_cache are not profiled.
+        result_cache : if provided, look up each feature's value in this
+            persistent cache before calculating it, and store calculated
+            values there (see feature_extractor.result_cache)
+        data_key : required along with result_cache. Identifies this run's
+            inputs (see ResultCache.data_key)
 
         Returns
         -------
-        self : This FeatureExtractionRun, with results updated
+        self : This FeatureExtractionRun, with results and intermediate_cache
+            updated
         """
 
+        if result_cache is not None and data_key is None:
+            raise ValueError("a data_key is required to use a result cache")
+
         self.results = {}
+        if result_cache is not None:
+            self.result_cache_report = {"hits": 0, "misses": 0}
+        self.intermediate_cache = IntermediateCache()
+        setattr(self.data, CACHE_ATTRIBUTE, self.intermediate_cache)
 
-        for feature in self.selected_features:
-            try:
-                self.results[feature.name] = feature(self.data)
-            except:
-                logging.warning(f"feature extraction failed for {feature.name}")
-                raise
+        feature_profiles: Dict[str, Dict[str, float]] = {}
+        started_tracing = profile and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+
+        try:
+            for feature in self.selected_features:
+                if result_cache is not None:
+                    key = result_cache.feature_key(data_key, feature)
+                    hit, value = result_cache.get(key)
+                    if hit:
+                        self.result_cache_report["hits"] += 1
+                        self.results[feature.name] = value
+                        continue
+                    self.result_cache_report["misses"] += 1
+
+                try:
+                    if profile:
+                        value, feature_profiles[feature.name] = \
+                            _profile_call(feature, self.data)
+                    else:
+                        value = feature(self.data)
+                    self.results[feature.name] = value
+                    if result_cache is not None:
+                        result_cache.put(key, value)
+                except:
+                    logging.warning(
+                        f"feature extraction failed for {feature.name}")
+                    raise
+        finally:
+            # cached intermediates are only valid for the duration of a run
+            delattr(self.data, CACHE_ATTRIBUTE)
+            if started_tracing:
+                tracemalloc.stop()
+
+        if profile:
+            self.profile = {
+                "features": feature_profiles,
+                "marks": _profiles_by_mark(
+                    self.selected_features, feature_profiles)
+            }
 
         return self
 
@@ -124,5 +195,78 @@ class FeatureExtractionRun:
             "results": self.results,
             "selected_marks": [mark.__name__ for mark in self.selected_marks],
             "selected_features": [
-                feature.name for feature in self.selected_features]
+                feature.name for feature in self.selected_features],
+            "intermediate_cache": (
+                self.intermediate_cache.report()
+                if self.intermediate_cache is not None else {}
+            ),
+            **({"profile": self.profile} if self.profile is not None else {}),
+            **(
+                {"result_cache": self.result_cache_report}
+                if self.result_cache_report is not None else {}
+            )
         }
+
+
+def _reset_peak_memory():
+    """ Restart tracemalloc's peak measurement from the current allocation.
+    tracemalloc.reset_peak is only available from Python 3.9. On older
+    interpreters, tracing is restarted instead, so that the peak is measured
+    from zero (this discards existing traces).
+    """
+
+    reset_peak = getattr(tracemalloc, "reset_peak", None)
+    if reset_peak is not None:
+        reset_peak()
+        return
+
+    frames = tracemalloc.get_traceback_limit()
+    tracemalloc.stop()
+    tracemalloc.start(frames)
+
+
+def _profile_call(feature: MarkedFeature, data: Data):
+    """ Calculate a feature, measuring its wall time, cpu time and peak
+    allocated memory (tracemalloc must be tracing).
+    """
+
+    _reset_peak_memory()
+    start_memory, _ = tracemalloc.get_traced_memory()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+
+    value = feature(data)
+
+    record = {
+        "wall_time": time.perf_counter() - start_wall,
+        "cpu_time": time.process_time() - start_cpu,
+        "peak_memory": max(
+            tracemalloc.get_traced_memory()[1] - start_memory, 0)
+    }
+    return value, record
+
+
+def _profiles_by_mark(
+    features: List[MarkedFeature],
+    feature_profiles: Dict[str, Dict[str, float]]
+) -> Dict[str, Dict[str, float]]:
+    """ Sum feature times (and take the max of peak memory) across the
+    features carrying each mark.
+    """
+
+    mark_profiles: Dict[str, Dict[str, float]] = {}
+    for feature in features:
+        if feature.name not in feature_profiles:
+            # e.g. read from a result cache
+            continue
+        record = feature_profiles[feature.name]
+        for mark in feature.marks:
+            current = mark_profiles.setdefault(
+                mark.__name__,
+                {"wall_time": 0.0, "cpu_time": 0.0, "peak_memory": 0}
+            )
+            current["wall_time"] += record["wall_time"]
+            current["cpu_time"] += record["cpu_time"]
+            current["peak_memory"] = max(
+                current["peak_memory"], record["peak_memory"])
+    return mark_profiles
@@ -11,6 +11,7 @@ from neuron_morphology.feature_extractor.marked_feature import (
 from neuron_morphology.feature_extractor.feature_extraction_run import \
     FeatureExtractionRun
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.result_cache import ResultCache
 
 
 # The register_features method on FeatureExtractor supports one level of 
@@ -68,7 +69,10 @@ class FeatureExtractor:
         self,
         data: Data,
         only_marks: Optional[AbstractSet[Type[Mark]]] = None,
-        required_marks: AbstractSet[Type[Mark]] = frozenset()
+        required_marks: AbstractSet[Type[Mark]] = frozenset(),
+        profile: bool = False,
+        result_cache: Optional[ResultCache] = None,
+        data_key: Optional[str] = None
     ) -> FeatureExtractionRun:
         """ Run the feature extractor for a single dataset
 
@@ -78,6 +82,12 @@ class FeatureExtractor:
         only_marks : if provided, reject marks not in this set
         required_marks : if provided, raise an exception if any of these marks
             do not validate successfully
+        profile : if True, record per-feature timing and memory use (see
+            FeatureExtractionRun.extract)
+        result_cache : if provided, reuse feature values stored in this
+            persistent cache, and store newly calculated ones
+        data_key : required along with result_cache. Identifies the inputs
+            to this run (see ResultCache.data_key)
 
         Returns
         -------
@@ -96,5 +106,9 @@ class FeatureExtractor:
                     self.features,
                     only_marks=only_marks
                 )
-                .extract()
+                .extract(
+                    profile=profile,
+                    result_cache=result_cache,
+                    data_key=data_key
+                )
         )
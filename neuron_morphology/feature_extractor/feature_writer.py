@@ -4,11 +4,12 @@ executable to format and write outputs.
 
 import os
 import copy as cp
+import json
 import logging
 import warnings
 
 from typing import (
-    Optional, Any, Dict, List, Iterable, Callable, NamedTuple, Union
+    Optional, Any, Dict, List, Iterable, Callable, NamedTuple, Union, Set
 )
 
 import h5py
@@ -27,7 +28,9 @@ class FeatureWriter:
         self, 
         heavy_path: str, 
         table_path: Optional[str] = None, 
-        formatters: Optional[Iterable["FeatureFormatter"]] = None
+        formatters: Optional[Iterable["FeatureFormatter"]] = None,
+        profile_path: Optional[str] = None,
+        array_features_as_lists: bool = False
     ):
         """ Formats and writes feature extraction outputs
 
@@ -35,12 +38,21 @@ class FeatureWriter:
         ----------
         heavy_path : if "heavy" features (e.g. with array outputs) are 
             calculated, write them here.
-        table_path : if an output table is requested, write it here
+        table_path : if an output table is requested, write it here. May be
+            .csv or a columnar format (.parquet, or .feather / .arrow for
+            Arrow IPC). Columnar formats require pyarrow.
+        profile_path : if runs were profiled, write a summary of feature
+            timing and memory use across runs here (.csv or .json)
+        array_features_as_lists : when writing a columnar table, store
+            array-valued features (e.g. moments) as fixed-size list columns.
+            By default, these are exploded into one column per element.
 
         """
 
         self.heavy_path = heavy_path
         self.table_path = table_path
+        self.profile_path = profile_path
+        self.array_features_as_lists = array_features_as_lists
 
         if formatters is None:
             formatters = []
@@ -49,9 +61,19 @@ class FeatureWriter:
         self.formatters: List["FeatureFormatter"] = list(formatters)
         self.has_heavy = False
         self.output: Dict[str, Any] = {}
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self.failures: Dict[str, Dict[str, Any]] = {}
 
         self.validate_table_extension()
-        self.heavy_file = h5py.File(self.heavy_path, driver="core")
+        self.validate_profile_extension()
+        self.heavy_file = self.open_heavy_file()
+
+    def open_heavy_file(self) -> h5py.File:
+        """ Open this writer's heavy data store. Heavy data are written to
+        disk as they are added, rather than accumulated in memory.
+        """
+
+        return h5py.File(self.heavy_path, "a")
 
 
     def add_run(self, identifier: str, run: Dict[str, Any]):
@@ -65,6 +87,12 @@ class FeatureWriter:
         """
 
         run = cp.deepcopy(run)
+
+        # profiles are summarized separately from results
+        profile = run.pop("profile", None)
+        if profile is not None:
+            self.profiles[identifier] = profile
+
         features = unnest(run["results"])
 
         for key in list(features.keys()):
@@ -74,6 +102,24 @@ class FeatureWriter:
 
         self.output[identifier] = run 
 
+    def add_failure(self, identifier: str, error: Dict[str, Any]):
+        """ Record a reconstruction for which feature extraction failed.
+        Failed reconstructions are omitted from the output table, but their
+        errors are included in this writer's output.
+
+        Parameters
+        ----------
+        identifier : the unique identifier for the failed run
+        error : describes the failure (e.g. type, message and traceback)
+
+        """
+
+        logging.warning(
+            f"feature extraction failed for {identifier}: "
+            f"{error.get('type')}: {error.get('message')}"
+        )
+        self.failures[identifier] = error
+
     def process_feature(self, owner: str, key: str, value: Any):
         """ Processes a feature for writing. This may involve:
             1. changing its type to something json serializable
@@ -120,12 +166,17 @@ class FeatureWriter:
 
         """
 
-        if self.has_heavy:
-            self.heavy_file.close()
+        self.heavy_file.close()
 
         if self.table_path is not None:
             self.write_table()
 
+        if self.profile_path is not None:
+            self.write_profile()
+
+        for identifier, error in self.failures.items():
+            self.output[identifier] = {"error": error}
+
         return self.output
 
     def validate_table_extension(self):
@@ -137,9 +188,83 @@ class FeatureWriter:
             return
 
         self.table_extension = os.path.splitext(self.table_path)[1]
-        if self.table_extension not in {".csv"}:
+        if self.table_extension not in {".csv"} | COLUMNAR_TABLE_EXTENSIONS:
             raise ValueError(f"unsupported extension: {self.table_extension}")
 
+    def validate_profile_extension(self):
+        """ If a profile summary was requested, check that the path has a
+        supported extension.
+        """
+
+        if self.profile_path is None:
+            return
+
+        self.profile_extension = os.path.splitext(self.profile_path)[1]
+        if self.profile_extension not in {".csv", ".json"}:
+            raise ValueError(
+                f"unsupported profile extension: {self.profile_extension}")
+
+    def build_profile_table(self) -> pd.DataFrame:
+        """ Summarize the profiles of this writer's runs as a table with one
+        row per feature and one per mark.
+
+        Returns
+        -------
+        A table indexed by (kind, name), where kind is "feature" or "mark".
+            Columns are num_runs, the total, mean and max of wall_time and
+            cpu_time (seconds) and the max of peak_memory (bytes).
+
+        """
+
+        records = []
+        for profile in self.profiles.values():
+            for kind, key in (("feature", "features"), ("mark", "marks")):
+                for name, record in profile[key].items():
+                    records.append({"kind": kind, "name": name, **record})
+
+        columns = ["kind", "name", "wall_time", "cpu_time", "peak_memory"]
+        profiles = pd.DataFrame(records, columns=columns)
+
+        grouped = profiles.groupby(["kind", "name"])
+        table = grouped.agg(
+            num_runs=("wall_time", "size"),
+            wall_time_total=("wall_time", "sum"),
+            wall_time_mean=("wall_time", "mean"),
+            wall_time_max=("wall_time", "max"),
+            cpu_time_total=("cpu_time", "sum"),
+            cpu_time_mean=("cpu_time", "mean"),
+            cpu_time_max=("cpu_time", "max"),
+            peak_memory_max=("peak_memory", "max"),
+        )
+        return table.sort_values("wall_time_total", ascending=False)
+
+    def write_profile(self):
+        """ Summarize and write profiles of this writer's runs
+        """
+
+        table = self.build_profile_table()
+
+        if self.profile_extension == ".csv":
+            table.to_csv(self.profile_path)
+
+        elif self.profile_extension == ".json":
+            summary: Dict[str, Dict[str, Any]] = {"feature": {}, "mark": {}}
+            for (kind, name), row in table.iterrows():
+                record = row.to_dict()
+                for key in ("num_runs", "peak_memory_max"):
+                    record[key] = int(record[key])
+                summary[kind][name] = record
+
+            with open(self.profile_path, "w") as profile_file:
+                json.dump(
+                    {"features": summary["feature"], "marks": summary["mark"]},
+                    profile_file,
+                    indent=2
+                )
+
+        else:
+            raise ValueError(f"invalid extension: {self.profile_extension}")
+
     def build_output_table(self) -> pd.DataFrame:
         """ Convert this writer's output to a reconstruction X feature table
 
@@ -151,7 +276,7 @@ class FeatureWriter:
 
         _table = []
         for reconstruction_id, data in self.output.items():
-            current = cp.deepcopy(data["results"])
+            current = dict(data["results"])
             current["reconstruction_id"] = reconstruction_id
 
             # this catches dicts that might have been produced during feature
@@ -176,6 +301,13 @@ class FeatureWriter:
             )
             table.to_csv(self.table_path)
 
+        elif self.table_extension in COLUMNAR_TABLE_EXTENSIONS:
+            write_columnar_table(
+                table,
+                self.table_path,
+                array_features_as_lists=self.array_features_as_lists
+            )
+
         else:
             # just being defensive here - we validate on construction
             raise ValueError(f"invalid extension: {self.table_extension}")
@@ -192,6 +324,288 @@ class FeatureWriter:
         self.formatters.extend(list(formatters))
 
 
+class StreamingFeatureWriter(FeatureWriter):
+
+    def __init__(
+        self,
+        heavy_path: str,
+        table_path: str,
+        formatters: Optional[Iterable["FeatureFormatter"]] = None,
+        profile_path: Optional[str] = None,
+        flush_every: int = 100,
+        resume: bool = False
+    ):
+        """ A FeatureWriter which holds at most flush_every runs in memory.
+        Rows are appended to the output table (and heavy data to the heavy
+        file) as runs are added.
+
+        Parameters
+        ----------
+        heavy_path : heavy data (e.g. array outputs) are written here
+        table_path : rows are appended to this reconstructions X features
+            table. Required.
+        formatters : see FeatureWriter
+        profile_path : see FeatureWriter. Profiles are small and are kept in
+            memory until write is called.
+        flush_every : append buffered rows to the table after this many runs
+        resume : if True, keep the rows of an existing table (and the
+            corresponding heavy data) and skip runs whose identifiers it
+            already contains. Otherwise existing outputs are overwritten.
+
+        """
+
+        if table_path is None \
+                or os.path.splitext(table_path)[1] != ".csv":
+            raise ValueError("streaming output requires a .csv table_path")
+        if flush_every < 1:
+            raise ValueError(f"flush_every must be positive ({flush_every})")
+
+        self.flush_every = flush_every
+        self.resume = resume
+        self.written: Set[str] = set()
+        self.skipped: List[str] = []
+        self.table_columns: List[str] = []
+        self.pending: List[Dict[str, Any]] = []
+
+        super(StreamingFeatureWriter, self).__init__(
+            heavy_path, table_path, formatters, profile_path)
+
+        if resume:
+            self.load_written()
+        elif os.path.exists(self.table_path):
+            os.remove(self.table_path)
+
+    def open_heavy_file(self) -> h5py.File:
+        """ Open this writer's heavy data store, keeping existing data if
+        resuming.
+        """
+
+        return h5py.File(self.heavy_path, "a" if self.resume else "w")
+
+    def load_written(self):
+        """ Find the identifiers and columns of an existing output table.
+        """
+
+        if os.path.exists(self.table_path):
+            self.table_columns = list(pd.read_csv(
+                self.table_path, nrows=0, index_col="reconstruction_id"
+            ).columns)
+            self.written = set(pd.read_csv(
+                self.table_path, usecols=["reconstruction_id"], dtype=str
+            )["reconstruction_id"])
+
+    def has_run(self, identifier: str) -> bool:
+        """ Whether a run with this identifier has already been written
+        """
+
+        return identifier in self.written
+
+    def add_run(self, identifier: str, run: Dict[str, Any]):
+        """ Buffer the results of a feature extraction run, appending
+        buffered runs to the output table every flush_every runs. Runs which
+        have already been written are skipped.
+
+        Parameters
+        ----------
+        identifier : the unique identifier for this run
+        run : will be added. Not copied - the caller should not reuse it.
+
+        """
+
+        if self.has_run(identifier):
+            logging.info(f"skipping already written run: {identifier}")
+            self.skipped.append(identifier)
+            return
+
+        # discard heavy data left by a previous attempt which never made it
+        # into the table (e.g. because of a crash before a flush)
+        if identifier in self.heavy_file:
+            del self.heavy_file[identifier]
+
+        profile = run.pop("profile", None)
+        if profile is not None:
+            self.profiles[identifier] = profile
+
+        row = unnest(run["results"])
+        for key in list(row.keys()):
+            row[key] = self.process_feature(identifier, key, row[key])
+
+        # results are unnested again in case formatting produced dicts
+        row = unnest(row)
+        row["reconstruction_id"] = identifier
+        self.pending.append(row)
+
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """ Append buffered runs to the output table. Heavy data are flushed
+        first, so that every run in the table has its heavy data on disk.
+        """
+
+        if not self.pending:
+            return
+
+        self.heavy_file.flush()
+
+        chunk = pd.DataFrame(self.pending)
+        chunk.set_index("reconstruction_id", inplace=True)
+
+        new_columns = [
+            column for column in chunk.columns
+            if column not in self.table_columns
+        ]
+        if new_columns:
+            self.extend_table_columns(new_columns)
+
+        chunk = chunk.reindex(columns=self.table_columns)
+        write_header = not os.path.exists(self.table_path)
+        chunk.to_csv(self.table_path, mode="a", header=write_header)
+
+        self.written.update(chunk.index)
+        self.pending = []
+
+    def extend_table_columns(
+        self, new_columns: List[str], chunksize: int = 10000):
+        """ Add columns to the output table. Rows already written are
+        rewritten (in chunks) with empty values in the new columns.
+        """
+
+        self.table_columns.extend(new_columns)
+
+        if not os.path.exists(self.table_path):
+            return
+
+        tmp_path = self.table_path + ".tmp"
+        reader = pd.read_csv(
+            self.table_path, index_col="reconstruction_id",
+            chunksize=chunksize
+        )
+        for ii, chunk in enumerate(reader):
+            chunk.reindex(columns=self.table_columns).to_csv(
+                tmp_path, mode="w" if ii == 0 else "a", header=ii == 0)
+        os.replace(tmp_path, self.table_path)
+
+    def write(self):
+        """ Flush any buffered runs and close this writer's outputs
+
+        Returns
+        -------
+        A summary of this writer's outputs (the results themselves are not
+            held in memory)
+
+        """
+
+        self.flush()
+        self.heavy_file.close()
+
+        if self.profile_path is not None:
+            self.write_profile()
+
+        return {
+            "table_path": self.table_path,
+            "heavy_path": self.heavy_path,
+            "num_written": len(self.written),
+            "skipped": self.skipped,
+            "failures": self.failures,
+        }
+
+
+COLUMNAR_TABLE_EXTENSIONS = {".parquet", ".feather", ".arrow"}
+
+
+def write_columnar_table(
+    table: pd.DataFrame,
+    path: str,
+    array_features_as_lists: bool = False
+):
+    """ Write a reconstructions X features table as Parquet or Arrow IPC
+    (Feather v2), depending on path's extension. Requires pyarrow.
+
+    Parameters
+    ----------
+    table : as produced by FeatureWriter.build_output_table
+    path : write the table here
+    array_features_as_lists : store columns whose values are equal-length
+        numeric sequences (e.g. moments) as fixed-size list columns. If False,
+        each such column is exploded into one column per element, suffixed
+        ".0", ".1", ...
+
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError as err:
+        raise ImportError(
+            "writing .parquet or .feather tables requires pyarrow "
+            "(see optional_requirements.txt)"
+        ) from err
+
+    table = table.reset_index()
+    columns: Dict[str, Any] = {}
+
+    for name, values in table.items():
+        size = _fixed_array_size(values)
+
+        if size is None:
+            columns[name] = pa.array(values, from_pandas=True)
+            continue
+
+        rows = [
+            None if _is_missing(value) else np.asarray(value, dtype=float)
+            for value in values
+        ]
+        if array_features_as_lists:
+            columns[name] = pa.array(
+                [None if row is None else row.tolist() for row in rows],
+                type=pa.list_(pa.float64(), size)
+            )
+        else:
+            for ii in range(size):
+                columns[f"{name}.{ii}"] = pa.array(
+                    [np.nan if row is None else row[ii] for row in rows],
+                    type=pa.float64()
+                )
+
+    arrow_table = pa.table(columns)
+    if os.path.splitext(path)[1] == ".parquet":
+        pyarrow.parquet.write_table(arrow_table, path)
+    else:
+        pyarrow.feather.write_feather(arrow_table, path)
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _fixed_array_size(values: pd.Series) -> Optional[int]:
+    """ If every present value in this column is a numeric sequence of the
+    same length, return that length.
+    """
+
+    if values.dtype != object:
+        return None
+
+    size = None
+    for value in values:
+        if _is_missing(value):
+            continue
+        if not isinstance(value, (list, tuple, np.ndarray)):
+            return None
+
+        array = np.asarray(value)
+        if array.ndim != 1 or array.dtype.kind not in "biuf":
+            return None
+        if size is None:
+            size = len(array)
+        elif size != len(array):
+            return None
+
+    return size
+
+
 # owner, key, value, heavy data store -> transformed value for json
 FeatureOutputHandler = Callable[[FeatureWriter, str, str, Any], Any]
 
@@ -111,7 +111,7 @@ class RequiresRoot(Mark):
 
     @classmethod
     def validate(cls, data: Data) -> bool:
-        num_roots = len(data.morphology.get_roots())
+        num_roots = data.morphology.count_roots()
 
         if num_roots > 1:
             warnings.warn(
@@ -191,12 +191,8 @@ class RequiresRegularPointSpacing(Mark):
 
 def check_nodes_have_key(data: Data, key: str) -> bool:
     """ Checks whether each node in a morphology is annotated with some key.
+    Uses the morphology's cached per-key node counts, so that repeated checks
+    do not revisit every node.
     """
 
-    has_key = True
-    for node in data.morphology.nodes():
-        has_key = has_key and key in node
-        if not has_key:
-            break
-
-    return has_key
+    return data.morphology.nodes_have_key(key)
@@ -0,0 +1,195 @@
+""" Worker-side helpers for extracting features from many reconstructions in
+a multiprocessing pool. Each worker builds its FeatureExtractor once (in
+initialize_worker) rather than once per reconstruction. Large array results
+are returned through shared memory rather than being pickled, and failures
+are captured per reconstruction rather than bringing down the pool.
+
+Like run_feature_extraction, these must live outside of __main__ due to how
+Windows handles multiprocessing.
+"""
+
+import os
+import traceback
+from multiprocessing import shared_memory
+from typing import Any, Dict, NamedTuple, Optional, Tuple, List
+
+import numpy as np
+
+from neuron_morphology.feature_extractor.run_feature_extraction import (
+    build_extractor, resolve_marks, setup_data, reconstruction_identifier)
+from neuron_morphology.feature_extractor.result_cache import (
+    ResultCache, hash_file)
+
+
+# arrays at least this large (in bytes) are returned via shared memory
+DEFAULT_SHARED_MEMORY_THRESHOLD = 2 ** 20
+
+# per-process state, populated by initialize_worker
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+class SharedArray(NamedTuple):
+    """ A handle to a numpy array stored in a named shared memory block
+    """
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def initialize_worker(
+    feature_set: str,
+    only_marks: Optional[List[str]],
+    required_marks: Optional[List[str]],
+    global_parameter_spec: Dict[str, Any],
+    profile: bool = False,
+    capture_failures: bool = True,
+    shared_memory_threshold: Optional[int] = None,
+    result_cache_path: Optional[str] = None
+):
+    """ Prepare this process to extract features. Intended for use as a
+    multiprocessing pool initializer.
+
+    Parameters
+    ----------
+    feature_set : names the set of features for which calculation will be
+        attempted
+    only_marks : names marks to which calculation will be restricted
+    required_marks : raise an exception if these named marks fail validation
+    global_parameter_spec : a dictionary specifying cross-reconstruction
+        parameters
+    profile : if True, record per-feature timing and memory use
+    capture_failures : if True, exceptions raised while processing a
+        reconstruction are recorded in its result rather than raised
+    shared_memory_threshold : if provided, return arrays of at least this
+        many bytes through shared memory. Ignored on Windows.
+    result_cache_path : if provided, reuse (and store) feature values in a
+        persistent cache under this directory. See ResultCache.
+
+    """
+
+    only_mark_set, required_mark_set = resolve_marks(
+        only_marks, required_marks)
+
+    if os.name == "nt":
+        # windows frees shared memory once no process holds a handle, so the
+        # block would vanish before the parent could attach
+        shared_memory_threshold = None
+
+    _WORKER_STATE.clear()
+    _WORKER_STATE.update({
+        "extractor": build_extractor(feature_set),
+        "only_marks": only_mark_set,
+        "required_marks": required_mark_set,
+        "global_parameter_spec": global_parameter_spec,
+        "profile": profile,
+        "capture_failures": capture_failures,
+        "shared_memory_threshold": shared_memory_threshold,
+        "result_cache": (
+            ResultCache(result_cache_path)
+            if result_cache_path is not None else None
+        ),
+    })
+
+
+def extract_in_worker(
+    reconstruction_spec: Dict[str, Any]
+) -> Tuple[str, Dict[str, Any]]:
+    """ Run feature extraction for a single reconstruction, using the state
+    set up by initialize_worker.
+
+    Parameters
+    ----------
+    reconstruction_spec : a dictionary specifying a reconstruction. Must
+        have an swc_path.
+
+    Returns
+    -------
+    identifier : a label for this reconstruction
+    The serialized run (see run_feature_extraction). If the run failed and
+        failures are being captured, instead a dict whose "error" key has the
+        type, message and traceback of the exception. Large arrays are
+        replaced by SharedArray handles; see receive_result.
+
+    """
+
+    identifier = reconstruction_identifier(reconstruction_spec)
+
+    try:
+        identifier, data = setup_data(
+            dict(reconstruction_spec), _WORKER_STATE["global_parameter_spec"])
+
+        result_cache = _WORKER_STATE["result_cache"]
+        data_key = None
+        if result_cache is not None:
+            data_key = result_cache.data_key(
+                hash_file(reconstruction_spec["swc_path"]), data)
+
+        run = _WORKER_STATE["extractor"].extract(
+            data,
+            only_marks=_WORKER_STATE["only_marks"],
+            required_marks=_WORKER_STATE["required_marks"],
+            profile=_WORKER_STATE["profile"],
+            result_cache=result_cache,
+            data_key=data_key
+        ).serialize()
+    except Exception as err:
+        if not _WORKER_STATE["capture_failures"]:
+            raise
+        return identifier, {"error": {
+            "type": type(err).__name__,
+            "message": str(err),
+            "traceback": traceback.format_exc()
+        }}
+
+    threshold = _WORKER_STATE["shared_memory_threshold"]
+    if threshold is not None:
+        run = share_arrays(run, threshold)
+    return identifier, run
+
+
+def share_arrays(value: Any, threshold: int) -> Any:
+    """ Recursively replace numpy arrays of at least threshold bytes with
+    SharedArray handles. The caller is responsible for calling
+    receive_result (which frees the shared memory) on the output.
+    """
+
+    if isinstance(value, np.ndarray):
+        if value.dtype == object or value.nbytes < threshold:
+            return value
+
+        block = shared_memory.SharedMemory(create=True, size=value.nbytes)
+        np.ndarray(value.shape, dtype=value.dtype, buffer=block.buf)[...] = \
+            value
+        handle = SharedArray(block.name, value.shape, value.dtype.str)
+        block.close()
+        return handle
+
+    return _map_containers(value, lambda item: share_arrays(item, threshold))
+
+
+def receive_result(value: Any) -> Any:
+    """ Recursively replace SharedArray handles with (process-local) numpy
+    arrays, freeing the shared memory.
+    """
+
+    if isinstance(value, SharedArray):
+        block = shared_memory.SharedMemory(name=value.name)
+        try:
+            return np.ndarray(
+                value.shape, dtype=np.dtype(value.dtype), buffer=block.buf
+            ).copy()
+        finally:
+            block.close()
+            block.unlink()
+
+    return _map_containers(value, receive_result)
+
+
+def _map_containers(value: Any, fn):
+    if isinstance(value, dict):
+        return {key: fn(item) for key, item in value.items()}
+    if isinstance(value, tuple) and hasattr(value, "_fields"):
+        return type(value)(*(fn(item) for item in value))
+    if isinstance(value, (list, tuple)):
+        return type(value)(fn(item) for item in value)
+    return value
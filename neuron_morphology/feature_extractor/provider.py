@@ -0,0 +1,103 @@
+""" Providers are shared intermediates (e.g. lists of tip coordinates) which
+several features depend on. Within a FeatureExtractionRun each provider is
+computed at most once per set of node types, no matter how many features
+request it.
+"""
+
+from typing import (
+    Any, Callable, Dict, Hashable, Optional, Sequence, Tuple, TypeVar)
+from collections import Counter
+from functools import wraps
+
+from neuron_morphology.feature_extractor.data import MorphologyLike
+
+
+# name of the Data attribute holding a run's IntermediateCache
+CACHE_ATTRIBUTE = "intermediate_cache"
+
+ProviderFn = TypeVar("ProviderFn", bound=Callable[..., Any])
+
+
+class IntermediateCache:
+
+    def __init__(self):
+        """ Memoizes provider results for a single feature extraction run and
+        counts cache hits and misses per provider.
+        """
+
+        self.values: Dict[Tuple[str, Hashable], Any] = {}
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+
+    def get(
+        self,
+        name: str,
+        node_types: Optional[Sequence[int]],
+        compute: Callable[[], Any]
+    ) -> Any:
+        """ Look up a provider's result, computing it on a miss.
+
+        Parameters
+        ----------
+        name : identifies the provider
+        node_types : the node types for which the result was requested. None
+            and empty are equivalent.
+        compute : called with no arguments to obtain the result on a miss
+
+        Returns
+        -------
+        The (possibly shared) result. Callers must not modify it.
+
+        """
+
+        key = (name, _node_types_key(node_types))
+        if key in self.values:
+            self.hits[name] += 1
+            return self.values[key]
+
+        self.misses[name] += 1
+        value = compute()
+        self.values[key] = value
+        return value
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """ Summarize cache use as {provider name: {"hits": h, "misses": m}}
+        """
+
+        return {
+            name: {"hits": self.hits[name], "misses": self.misses[name]}
+            for name in sorted(set(self.hits) | set(self.misses))
+        }
+
+
+def provider(fn: ProviderFn) -> ProviderFn:
+    """ Declare a function as a provider of a shared intermediate. The
+    function must have the signature fn(data, node_types=None). When called
+    with a Data carrying an IntermediateCache (as during
+    FeatureExtractionRun.extract) the result is memoized on that cache.
+    Otherwise the function is simply called.
+
+    Results of providers are shared between features, so must be treated as
+    read-only.
+    """
+
+    name = fn.__name__
+
+    @wraps(fn)
+    def wrapper(data: MorphologyLike, node_types=None):
+        cache = getattr(data, CACHE_ATTRIBUTE, None)
+        if cache is None:
+            return fn(data, node_types=node_types)
+        return cache.get(
+            name, node_types, lambda: fn(data, node_types=node_types))
+
+    wrapper.provider_name = name  # type: ignore[attr-defined]
+    return wrapper  # type: ignore[return-value]
+
+
+def _node_types_key(
+    node_types: Optional[Sequence[int]]
+) -> Optional[Tuple[int, ...]]:
+    if not node_types:
+        return None
+    return tuple(node_types)
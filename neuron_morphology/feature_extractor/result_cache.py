@@ -0,0 +1,317 @@
+""" A persistent, content-addressed store of feature values. Each entry is
+keyed on everything the value depends on: the content of the swc file, the
+feature (its function and specialization arguments), the hydrated
+parameters of the Data (e.g. layered point depths and reference layer
+depths) and the version of this package. Rerunning feature extraction with a
+cache therefore only recomputes features whose inputs have changed.
+
+Features are fingerprinted by qualified name, not by their code. After
+editing a feature's implementation, bump the package version (or clear the
+cache); otherwise the stale cached values will continue to be served.
+
+Entries are pickled files in a directory, so the cache may be shared by the
+processes of a multiprocessing pool. Their modification times record when
+they were last used, and ResultCache.evict removes the least recently used
+entries until the cache fits within a size bound.
+"""
+
+from typing import Any, Optional, Tuple
+from enum import Enum
+from functools import partial
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import neuron_morphology
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.marked_feature import MarkedFeature
+from neuron_morphology.feature_extractor.provider import CACHE_ATTRIBUTE
+
+
+ENTRY_EXTENSION = ".pkl"
+
+
+def hash_file(path: str, block_size: int = 2 ** 20) -> str:
+    """ Calculate the sha256 digest of a file's contents
+    """
+
+    hasher = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def fingerprint(value: Any) -> str:
+    """ Calculate a digest of a value's contents. Equal values (e.g. arrays
+    with the same dtype, shape and elements, or dicts with the same items in
+    any order) have equal fingerprints, even across processes.
+
+    Parameters
+    ----------
+    value : to be fingerprinted. Supports builtin scalars and containers,
+        numpy arrays and scalars, pandas objects, enums, functions (by
+        qualified name only, so editing a function's body does not change
+        its fingerprint), functools.partial and plain objects (by class and
+        attributes).
+
+    Returns
+    -------
+    a hexadecimal sha256 digest
+
+    """
+
+    hasher = hashlib.sha256()
+    _update_fingerprint(hasher, value)
+    return hasher.hexdigest()
+
+
+def _update_fingerprint(hasher, value: Any):
+    kind = type(value)
+    hasher.update(f"<{kind.__module__}.{kind.__qualname__}>".encode())
+
+    if value is None or isinstance(
+        value, (bool, int, float, complex, str, bytes, np.generic, Enum)
+    ):
+        hasher.update(repr(value).encode())
+
+    elif isinstance(value, np.ndarray):
+        hasher.update(f"{value.dtype.str}{value.shape}".encode())
+        if value.dtype == object:
+            for item in value.flat:
+                _update_fingerprint(hasher, item)
+        else:
+            hasher.update(np.ascontiguousarray(value).tobytes())
+
+    elif isinstance(value, pd.DataFrame):
+        _update_fingerprint(hasher, list(value.columns))
+        _update_fingerprint(hasher, [str(dtype) for dtype in value.dtypes])
+        _update_fingerprint(
+            hasher, pd.util.hash_pandas_object(value, index=True).values)
+
+    elif isinstance(value, pd.Series):
+        _update_fingerprint(hasher, (value.name, str(value.dtype)))
+        _update_fingerprint(
+            hasher, pd.util.hash_pandas_object(value, index=True).values)
+
+    elif isinstance(value, dict):
+        items = sorted(
+            (fingerprint(key), item) for key, item in value.items())
+        for key, item in items:
+            hasher.update(key.encode())
+            _update_fingerprint(hasher, item)
+
+    elif isinstance(value, (set, frozenset)):
+        for item in sorted(fingerprint(item) for item in value):
+            hasher.update(item.encode())
+
+    elif isinstance(value, (list, tuple)):
+        hasher.update(str(len(value)).encode())
+        for item in value:
+            _update_fingerprint(hasher, item)
+
+    elif isinstance(value, partial):
+        _update_fingerprint(
+            hasher, (value.func, value.args, value.keywords or {}))
+
+    elif isinstance(value, MarkedFeature):
+        _update_fingerprint(hasher, (value.name, value.feature))
+
+    elif isinstance(value, type) or (
+        callable(value) and hasattr(value, "__qualname__")
+    ):
+        hasher.update(
+            f"{value.__module__}.{value.__qualname__}".encode())
+
+    elif hasattr(value, "__dict__"):
+        _update_fingerprint(hasher, vars(value))
+
+    else:
+        hasher.update(repr(value).encode())
+
+
+class ResultCache:
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None):
+        """ A persistent cache of feature values, stored under a directory.
+
+        Parameters
+        ----------
+        path : the directory in which entries are stored. Created if it does
+            not exist.
+        max_bytes : if provided, evict bounds the total size of stored
+            entries to this many bytes
+
+        """
+
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def data_key(swc_hash: str, data: Data) -> str:
+        """ Identify the inputs to feature extraction from some Data.
+
+        Parameters
+        ----------
+        swc_hash : digest of the contents of the swc file from which data's
+            morphology was read (see hash_file)
+        data : whose (hydrated) parameters - every attribute except the
+            morphology - are to be fingerprinted
+
+        Returns
+        -------
+        a key to be passed to feature_key
+
+        """
+
+        parameters = {
+            name: value for name, value in vars(data).items()
+            if name not in ("morphology", CACHE_ATTRIBUTE)
+        }
+        return fingerprint(
+            (neuron_morphology.__version__, swc_hash, parameters))
+
+    @staticmethod
+    def feature_key(data_key: str, feature: MarkedFeature) -> str:
+        """ Identify a feature's value on some inputs.
+
+        Parameters
+        ----------
+        data_key : identifies the inputs (see data_key)
+        feature : to be calculated. Its name, function and specialization
+            arguments are fingerprinted.
+
+        Returns
+        -------
+        a key under which the value may be stored
+
+        """
+
+        return fingerprint((data_key, feature))
+
+    def entry_path(self, key: str) -> str:
+        """ The file in which the value under a key is stored
+        """
+
+        return os.path.join(self.path, key[:2], key + ENTRY_EXTENSION)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """ Look up a value, marking it as recently used.
+
+        Parameters
+        ----------
+        key : the value's key
+
+        Returns
+        -------
+        hit : whether the value was found
+        value : the value, or None on a miss
+
+        """
+
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as entry:
+                value = pickle.load(entry)
+            os.utime(path)
+        except FileNotFoundError:
+            return False, None
+        except Exception as err:
+            # e.g. truncated entries, or values of since-changed classes
+            logging.warning(f"ignoring unreadable cache entry {path}: {err}")
+            return False, None
+
+        return True, value
+
+    def put(self, key: str, value: Any):
+        """ Store a value under a key. Values which cannot be pickled are
+        not stored.
+        """
+
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        handle, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as entry:
+                pickle.dump(value, entry, protocol=pickle.HIGHEST_PROTOCOL)
+            # entries are replaced atomically, so concurrent readers see
+            # either the old or the new value
+            os.replace(temp_path, path)
+        except Exception as err:
+            logging.warning(f"unable to cache value under {key}: {err}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def entries(self):
+        """ List the entries in this cache
+
+        Returns
+        -------
+        a list of (last used time, size in bytes, path) tuples
+
+        """
+
+        found = []
+        for shard in os.scandir(self.path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(ENTRY_EXTENSION):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def size(self) -> int:
+        """ The total size, in bytes, of this cache's entries
+        """
+
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """ Remove the least recently used entries until the total size of
+        this cache is at most max_bytes.
+
+        Parameters
+        ----------
+        max_bytes : defaults to this cache's max_bytes. If neither is
+            provided, nothing is evicted.
+
+        Returns
+        -------
+        The number of entries removed
+
+        """
+
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return 0
+
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        if removed:
+            logging.info(f"evicted {removed} entries from {self.path}")
+        return removed
@@ -90,6 +90,57 @@ def hydrate_parameters(parameters: Dict[str, Any]) -> Dict[str, Any]:
     return output
 
 
+def reconstruction_identifier(reconstruction: Dict[str, Any]) -> str:
+    """ The label for a reconstruction: its identifier if specified,
+    otherwise its swc path.
+    """
+
+    return reconstruction.get("identifier", reconstruction.get("swc_path"))
+
+
+def build_extractor(feature_set: str) -> FeatureExtractor:
+    """ Construct a FeatureExtractor for a named set of features
+
+    Parameters
+    ----------
+    feature_set : names the set of features. See known_feature_sets
+
+    Returns
+    -------
+    A FeatureExtractor with those features registered
+
+    """
+
+    try:
+        features = known_feature_sets[feature_set]
+    except KeyError:
+        print(
+            f"known feature sets: {list(known_feature_sets.keys())}\n"
+            f"you provided: {feature_set}"
+        )
+        raise
+
+    return FeatureExtractor(features)
+
+
+def resolve_marks(
+    only_marks: Optional[List[str]],
+    required_marks: Optional[List[str]]
+) -> Tuple[Optional[Set[Type[Mark]]], Set[Type[Mark]]]:
+    """ Look up the well-known marks named by only_marks and
+    required_marks.
+    """
+
+    only_mark_set: Optional[Set[Type[Mark]]] = {
+        well_known_marks[name] for name in only_marks
+        } if only_marks is not None else None
+    required_mark_set: Set[Type[Mark]] = {
+        well_known_marks[name] for name in required_marks
+        } if required_marks is not None else set()
+
+    return only_mark_set, required_mark_set
+
+
 def setup_data(
     reconstruction: Dict[str, Any], 
     global_parameters: Dict[str, Any]
@@ -109,7 +160,7 @@ def setup_data(
     """
 
     parameters: Dict[str, Any] = {}
-    identifier = reconstruction.get("identifier", reconstruction.get("swc_path"))
+    identifier = reconstruction_identifier(reconstruction)
     swc_path = reconstruction.pop("swc_path")
     morphology = morphology_from_swc(swc_path)
 
@@ -123,7 +174,8 @@ def run_feature_extraction(
     feature_set: str,
     only_marks: List[str], 
     required_marks: List[str],
-    global_parameter_spec: Dict[str, Any]
+    global_parameter_spec: Dict[str, Any],
+    profile: bool = False
 ) -> Tuple[str, Dict]:
     """ Run feature extraction for a single reconstruction.
 
@@ -137,6 +189,7 @@ def run_feature_extraction(
     required_marks : raise an exception if these named marks fail validation
     global_parameter_spec : a dictionary specifying cross-reconstruction 
         parameters
+    profile : if True, record per-feature timing and memory use
 
     Returns
     -------
@@ -146,32 +199,23 @@ def run_feature_extraction(
         selected_marks - the set of marks that passed validation
         selected features - the set of features for which calculation was 
             attempted
+        intermediate_cache - hits and misses of shared intermediates
+        profile - (only if profile is True) per-feature and per-mark timing
+            and memory use
 
     """
 
-    try:
-        features = known_feature_sets[feature_set]
-    except KeyError:
-        print(
-            f"known feature sets: {list(known_feature_sets.keys())}\n"
-            f"you provided: {feature_set}"
-        )
-        raise
-
-    only_mark_set: Set[Type[Mark]] = {
-        well_known_marks[name] for name in only_marks
-        } if only_marks is not None else None
-    required_mark_set: Set[Type[Mark]] = {
-        well_known_marks[name] for name in required_marks
-        } if required_marks is not None else set()
+    extractor = build_extractor(feature_set)
+    only_mark_set, required_mark_set = resolve_marks(
+        only_marks, required_marks)
 
     identifier, data = setup_data(reconstruction_spec, global_parameter_spec)
 
-    extractor = FeatureExtractor(features)
     run = extractor.extract(
         data,
         only_marks=only_mark_set,
-        required_marks=required_mark_set
+        required_marks=required_mark_set,
+        profile=profile
     )
 
     return identifier, run.serialize()
\ No newline at end of file
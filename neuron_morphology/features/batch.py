@@ -0,0 +1,213 @@
+""" Batch counterparts of single-cell features. Each takes a MorphologyBatch
+and returns its results for every cell at once, as arrays whose first axis
+indexes cells. They carry the same names and marks as the features they
+mirror, and accept the same specializations, so that (e.g.)
+"axon.tip.moments" means the same thing for a batch as for a single cell.
+See neuron_morphology.feature_extractor.batch_feature_extractor.
+"""
+
+from typing import Optional, List, Dict, Tuple
+
+import numpy as np
+
+from neuron_morphology.constants import SOMA
+from neuron_morphology.morphology_batch import MorphologyBatch
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, specialize, nested_specialize)
+from neuron_morphology.feature_extractor.mark import (
+    Intrinsic, Geometric, RequiresRoot)
+from neuron_morphology.feature_extractor.feature_specialization import (
+    NEURITE_SPECIALIZATIONS)
+from neuron_morphology.features.statistics.coordinates import (
+    COORD_TYPE, COORD_TYPE_SPECIALIZATIONS)
+
+
+def get_coordinates(
+    batch: MorphologyBatch,
+    coord_type: COORD_TYPE = COORD_TYPE.NODE,
+    node_types: Optional[List[int]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Find the coordinates of a given type for every cell in a batch. These
+    match COORD_TYPE.get_coordinates for each cell.
+
+    Parameters
+    ----------
+    batch : the cells whose coordinates will be found
+    coord_type : which coordinates (nodes, tips, bifurcations or compartment
+        midpoints) to find
+    node_types : restrict to nodes of these types. Compartment midpoints are
+        not restricted.
+
+    Returns
+    -------
+    cell : (M,) the cell of each coordinate
+    coordinates : (M, 3) the coordinates
+
+    """
+
+    if coord_type is COORD_TYPE.COMPARTMENT:
+        table = batch.get_compartment_table()
+        return batch.cell[table.child], table.midpoint
+
+    if coord_type is COORD_TYPE.NODE:
+        mask = batch.type_mask(node_types)
+    else:
+        # tips and bifurcations exclude soma nodes by default
+        mask = batch.type_mask(node_types) if node_types \
+            else batch.types != SOMA
+        if coord_type is COORD_TYPE.TIP:
+            mask &= batch.num_children == 0
+        else:
+            mask &= batch.num_children > 1
+
+    return batch.cell[mask], batch.positions()[mask]
+
+
+@marked(Intrinsic)
+def num_nodes(
+    batch: MorphologyBatch,
+    node_types: Optional[List[int]] = None
+) -> np.ndarray:
+    """ Count the nodes of the argued types in each cell. See
+    intrinsic.num_nodes
+    """
+
+    return batch.count(batch.type_mask(node_types))
+
+
+@marked(Intrinsic)
+def num_tips(
+    batch: MorphologyBatch,
+    node_types: Optional[List[int]] = None
+) -> np.ndarray:
+    """ Count the tips of the argued types in each cell. See
+    intrinsic.num_tips
+    """
+
+    cell, _ = get_coordinates(batch, COORD_TYPE.TIP, node_types)
+    return np.bincount(cell, minlength=batch.num_cells)
+
+
+@marked(Geometric)
+def total_length(
+    batch: MorphologyBatch,
+    node_types: Optional[List[int]] = None
+) -> np.ndarray:
+    """ Sum compartment lengths in each cell, excluding compartments whose
+    parent is a soma root. See size.total_length
+    """
+
+    table = batch.get_compartment_table()
+    mask = table.type_mask(node_types) & ~table.soma_root_mask()
+    return batch.sum(table.length[mask], batch.cell[table.child[mask]])
+
+
+@marked(Geometric)
+def moments(
+    batch: MorphologyBatch,
+    node_types: Optional[List[int]] = None,
+    coord_type: COORD_TYPE = COORD_TYPE.NODE
+) -> Dict[str, np.ndarray]:
+    """ Calculate the mean, standard deviation, variance, skewness and
+    (excess) kurtosis of each cell's coordinates along each axis. See
+    statistics.moments.moments
+
+    Returns
+    -------
+    A dictionary of (num_cells, 3) arrays. Cells without coordinates have
+        nan moments.
+
+    """
+
+    cell, coordinates = get_coordinates(batch, coord_type, node_types)
+    count = np.bincount(cell, minlength=batch.num_cells)[:, np.newaxis]
+
+    def cell_mean(values):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.stack([
+                np.bincount(cell, weights=values[:, axis],
+                            minlength=batch.num_cells)
+                for axis in range(3)
+            ], axis=1) / count
+
+    mean = cell_mean(coordinates)
+    centered = coordinates - mean[cell]
+    m2 = cell_mean(centered ** 2)
+    m3 = cell_mean(centered ** 3)
+    m4 = cell_mean(centered ** 4)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = np.where(count > 1, m2 * count / (count - 1), np.nan)
+
+        # as scipy.stats, higher moments are undefined for (numerically)
+        # constant coordinates
+        constant = m2 <= (np.finfo(float).resolution * mean) ** 2
+        skew = np.where(constant, np.nan, m3 / m2 ** 1.5)
+        kurt = np.where(constant, np.nan, m4 / m2 ** 2) - 3
+
+    return {
+        'mean': mean,
+        'std': np.sqrt(variance),
+        'var': variance,
+        'skew': skew,
+        'kurt': kurt
+    }
+
+
+@marked(RequiresRoot)
+@marked(Geometric)
+def dimension(
+    batch: MorphologyBatch,
+    node_types: Optional[List[int]] = None,
+    coord_type: COORD_TYPE = COORD_TYPE.NODE
+) -> Dict[str, np.ndarray]:
+    """ Get the height, width, depth, minimum, and maximum values of each
+    cell's coordinates, centered about its root. See dimension.dimension
+
+    Returns
+    -------
+    A dictionary whose values have one entry (or row) per cell. Cells
+        without coordinates have nan dimensions.
+
+    """
+
+    cell, coordinates = get_coordinates(batch, coord_type, node_types)
+
+    roots = batch.get_roots()
+    has_root = roots >= 0
+    root_xyz = np.full((batch.num_cells, 3), np.nan)
+    root_xyz[has_root] = batch.positions()[roots[has_root]]
+    coordinates = coordinates - root_xyz[cell]
+
+    min_xyz = np.full((batch.num_cells, 3), np.inf)
+    max_xyz = np.full((batch.num_cells, 3), -np.inf)
+    np.minimum.at(min_xyz, cell, coordinates)
+    np.maximum.at(max_xyz, cell, coordinates)
+
+    empty = np.bincount(cell, minlength=batch.num_cells) == 0
+    min_xyz[empty] = np.nan
+    max_xyz[empty] = np.nan
+
+    bias_xyz = np.absolute(np.absolute(max_xyz) - np.absolute(min_xyz))
+    size = max_xyz - min_xyz
+    return {
+        'width': size[:, 0],
+        'height': size[:, 1],
+        'depth': size[:, 2],
+        'min_xyz': min_xyz,
+        'max_xyz': max_xyz,
+        'bias_xyz': bias_xyz
+    }
+
+
+default_batch_features = [
+    nested_specialize(
+        dimension,
+        [COORD_TYPE_SPECIALIZATIONS, NEURITE_SPECIALIZATIONS]),
+    specialize(num_nodes, NEURITE_SPECIALIZATIONS),
+    specialize(num_tips, NEURITE_SPECIALIZATIONS),
+    specialize(total_length, NEURITE_SPECIALIZATIONS),
+    nested_specialize(
+        moments,
+        [COORD_TYPE_SPECIALIZATIONS, NEURITE_SPECIALIZATIONS]),
+]
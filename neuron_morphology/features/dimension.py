@@ -10,6 +10,7 @@ from neuron_morphology.feature_extractor.mark import (
 
 from neuron_morphology.feature_extractor.data import Data
 from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features.intermediates import root_node
 
 
 @marked(RequiresRoot)
@@ -35,8 +36,8 @@ def dimension(
 
     """
     coordinates = coord_type.get_coordinates(
-                    data.morphology, node_types=node_types)
-    if not coordinates:
+                    data, node_types=node_types)
+    if len(coordinates) == 0:
         nan_array = np.empty((3,))
         nan_array[:] = np.nan
 
@@ -51,8 +52,8 @@ def dimension(
         return dimension_features
     else:
         coordinates = np.asarray(coordinates)
-        root_node = data.morphology.get_root()
-        root_xyz = np.asarray([root_node['x'], root_node['y'], root_node['z']])
+        root = root_node(data)
+        root_xyz = np.asarray([root['x'], root['y'], root['z']])
         coordinates = coordinates - root_xyz
 
         min_xyz = coordinates.min(axis=0)
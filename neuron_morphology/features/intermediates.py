@@ -0,0 +1,45 @@
+""" Providers of node lists which are shared by many features. See
+neuron_morphology.feature_extractor.provider.
+"""
+
+from typing import Optional, List, Dict, Any
+
+from neuron_morphology.feature_extractor.data import (
+    MorphologyLike, get_morphology)
+from neuron_morphology.feature_extractor.provider import provider
+
+
+@provider
+def root_node(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> Optional[Dict[str, Any]]:
+    """ The first root of the morphology (see Morphology.get_root).
+    node_types is ignored.
+    """
+
+    return get_morphology(data).get_root()
+
+
+@provider
+def leaf_nodes(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> List[Dict[str, Any]]:
+    """ Nodes of the argued types which have no children (see
+    Morphology.get_leaf_nodes)
+    """
+
+    return get_morphology(data).get_leaf_nodes(node_types=node_types)
+
+
+@provider
+def branching_nodes(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> List[Dict[str, Any]]:
+    """ Nodes of the argued types which have more than one child (see
+    Morphology.get_branching_nodes)
+    """
+
+    return get_morphology(data).get_branching_nodes(node_types=node_types)
@@ -1,5 +1,6 @@
 from typing import Optional, List
-from functools import partial
+
+import numpy as np
 
 from neuron_morphology.feature_extractor.data import Data
 from neuron_morphology.features.statistics.coordinates import COORD_TYPE
@@ -25,7 +26,7 @@ def num_tips(
 
     """
     # Alternative method:
-    num_tips = len(COORD_TYPE.TIP.get_coordinates(data.morphology,
+    num_tips = len(COORD_TYPE.TIP.get_coordinates(data,
                                                   node_types=node_types))
     return num_tips
 
@@ -50,12 +51,50 @@ def num_nodes(
     return num_nodes
 
 
-def child_ids_by_type(node_id, morphology, node_types=None):
-    """ Helper function for the traversal functions"""
-    node = morphology.node_by_id(node_id)
-    children = morphology.get_children(
-                    node, node_types=node_types)
-    return [child['id'] for child in children]
+def child_type_mask(morphology, node_types=None):
+    """
+        Helper function for the topology-based features. Selects the nodes
+        which would be returned by morphology.get_children(parent, node_types)
+
+        Parameters
+        ----------
+
+        morphology: a morphology object
+
+        node_types: a list of node types (see neuron_morphology constants).
+            If falsy, all nodes are selected.
+
+        Returns
+        -------
+
+        None (if all nodes are selected) or a boolean mask over node indices
+    """
+    if not node_types:
+        return None
+    return np.isin(morphology.get_node_columns()["types"], list(node_types))
+
+
+def count_branches(num_children, reached, root_index):
+    """
+        Helper function for counting branches among reached nodes. Nodes with
+        k > 1 children contribute 2k - 2 branches (successive bifurcations).
+        A root with fewer than two children contributes one branch.
+
+        Parameters
+        ----------
+
+        num_children: for each node, the number of (considered) children
+
+        reached: indices of the nodes to consider
+
+        root_index: index of the node from which the nodes were reached
+    """
+    forks = num_children[reached]
+    forks = forks[forks > 1]
+    num_branches = int(np.sum(2 * forks - 2))
+    if num_children[root_index] <= 1:
+        num_branches += 1
+    return num_branches
 
 
 def calculate_branches_from_root(morphology,
@@ -78,27 +117,15 @@ def calculate_branches_from_root(morphology,
 
         node_types: a list of node types (see neuron_morphology constants)
     """
-    counter = {'num_branches': 0}
-
-    def branch_visitor(node, counter, node_types):
-        num_children = len(morphology.get_children(node,
-                                                   node_types=node_types))
-        if num_children > 1:
-            # branches + (implicit branches from successive bifurcations)
-            counter['num_branches'] += num_children + (num_children - 2)
-        elif counter['num_branches'] == 0:  # still count root with one child
-            counter['num_branches'] += 1
-
-    visitor = partial(branch_visitor,
-                      counter=counter,
-                      node_types=node_types)
-    neighbor_cb = partial(child_ids_by_type,
-                          morphology=morphology,
-                          node_types=node_types)
-    morphology.breadth_first_traversal(visitor,
-                                       start_id=morphology.node_id_cb(root),
-                                       neighbor_cb=neighbor_cb)
-    return counter['num_branches']
+    topology = morphology.get_topology()
+    edge_mask = child_type_mask(morphology, node_types)
+    root_index = topology.index_of[morphology.node_id_cb(root)]
+
+    return count_branches(
+        topology.count_children(edge_mask),
+        topology.reachable(root_index, edge_mask),
+        root_index
+    )
 
 
 @marked(Intrinsic)
@@ -118,14 +145,26 @@ def num_branches(
 
     """
     morphology = data.morphology
-    nodes = morphology.get_node_by_types(node_types)
-    roots = morphology.get_roots_for_nodes(nodes)
+    topology = morphology.get_topology()
+    edge_mask = child_type_mask(morphology, node_types)
+    num_children = topology.count_children(edge_mask)
+
+    # roots of the subforest formed by nodes of these types
+    in_types = np.ones(len(topology), dtype=bool) \
+        if edge_mask is None else edge_mask
+    has_parent = topology.parent >= 0
+    parent_in_types = np.zeros(len(topology), dtype=bool)
+    parent_in_types[has_parent] = in_types[topology.parent[has_parent]]
+    roots = np.flatnonzero(in_types & ~parent_in_types)
+
     num_branches = 0
-    for root in roots:
-        num_branches += calculate_branches_from_root(
-            morphology, root, node_types=node_types)
-        if (morphology.parent_of(root) is not None and
-            len(morphology.get_children_of_node_by_types(root, node_types)) > 1):
+    for root_index in roots:
+        num_branches += count_branches(
+            num_children,
+            topology.reachable(root_index, edge_mask),
+            root_index
+        )
+        if has_parent[root_index] and num_children[root_index] > 1:
              # if root is a branching node, include the branch that connects root to tree
             num_branches += 1
     return num_branches
@@ -152,35 +191,32 @@ def calculate_mean_fragmentation_from_root(morphology,
 
         node_types: a list of node types (see neuron_morphology constants)
     """
-    counter = {'num_branches': 0,
-               'num_compartments': 0}
-
-    def branch_visitor(node, counter, node_types):
-        num_children = len(morphology.get_children(node,
-                                                   node_types=node_types))
-        if num_children > 1:
-            # branches + (implicit branches from successive bifurcations)
-            counter['num_branches'] += num_children + (num_children - 2)
-            counter['num_compartments'] += num_children + (num_children - 2)
-        elif num_children == 1:
-            counter['num_compartments'] += 1
-            if counter['num_branches'] == 0:  # still count root with one child
-                counter['num_branches'] += 1
-
-    visitor = partial(branch_visitor,
-                      counter=counter,
-                      node_types=node_types)
-    neighbor_cb = partial(child_ids_by_type,
-                          morphology=morphology,
-                          node_types=node_types)
-    morphology.breadth_first_traversal(visitor,
-                                       start_id=morphology.node_id_cb(root),
-                                       neighbor_cb=neighbor_cb)
-
-    mean_fragmentation = counter['num_compartments'] / counter['num_branches']
+    topology = morphology.get_topology()
+    edge_mask = child_type_mask(morphology, node_types)
+    root_index = topology.index_of[morphology.node_id_cb(root)]
+    num_children = topology.count_children(edge_mask)
+
+    return fragmentation_from_root(
+        num_children,
+        topology.reachable(root_index, edge_mask),
+        root_index
+    )
+
+
+def fragmentation_from_root(num_children, reached, root_index):
+    """
+        Helper function for calculating mean fragmentation among reached
+        nodes. See calculate_mean_fragmentation_from_root.
+    """
+    forks = num_children[reached]
+    fork_branches = int(np.sum(2 * forks[forks > 1] - 2))
+    num_compartments = fork_branches + int(np.count_nonzero(forks == 1))
+    num_branches = fork_branches + int(num_children[root_index] == 1)
+
+    mean_fragmentation = num_compartments / num_branches
     return (mean_fragmentation,
-            counter['num_branches'],
-            counter['num_compartments'])
+            num_branches,
+            num_compartments)
 
 
 @marked(Intrinsic)
@@ -200,13 +236,19 @@ def mean_fragmentation(
 
     """
     morphology = data.morphology
-    roots = morphology.get_roots()
+    topology = morphology.get_topology()
+    edge_mask = child_type_mask(morphology, node_types)
+    num_children = topology.count_children(edge_mask)
+
     num_branches = 0
     num_compartments = 0
-    for root in roots:
+    for root_index in topology.roots:
         (_, local_branches, local_compartments) = \
-            calculate_mean_fragmentation_from_root(
-                morphology, root, node_types=node_types)
+            fragmentation_from_root(
+                num_children,
+                topology.reachable(root_index, edge_mask),
+                root_index
+            )
 
         num_branches += local_branches
         num_compartments += local_compartments
@@ -244,37 +286,45 @@ def calculate_max_branch_order_from_root(morphology,
 
     """
 
-    root_id = morphology.node_id_cb(root)
-    counter = {'branches_to_node': {root_id: 0},
-               'max_branches': 0}
+    topology = morphology.get_topology()
+    root_index = topology.index_of[morphology.node_id_cb(root)]
+    subtree = topology.subtree(root_index)
+
+    branches_to_node = branches_to_nodes(topology)[subtree]
+    return max_leaf_branches(
+        morphology, topology, subtree, branches_to_node, node_types)
+
 
-    def branch_visitor(node, counter, node_types):
-        cur_branches = counter['branches_to_node'][node['id']]
-        children = morphology.get_children(node)
-        num_children = len(children)
+def branches_to_nodes(topology):
+    """
+        Helper function for calculating branch order. For each node, count
+        the branches encountered on the path from its root to that node. Each
+        child of a bifurcation starts a new branch, as does the first
+        child of a root.
+    """
+    num_children = topology.num_children
+    has_parent = topology.parent >= 0
+
+    starts_branch = np.zeros(len(topology), dtype=np.int64)
+    parents = topology.parent[has_parent]
+    starts_branch[has_parent] = (num_children[parents] > 1) \
+        | (topology.parent[parents] < 0)
 
-        if num_children > 1:
-            for child in children:
-                counter['branches_to_node'][child['id']] = \
-                    cur_branches + 1
-        elif num_children == 1:
-            if cur_branches == 0:
-                # create a branch even if its just the root + one node
-                counter['branches_to_node'][children[0]['id']] = 1
-            else:
-                counter['branches_to_node'][children[0]['id']] = cur_branches
-        elif num_children == 0 and (node_types is None or node['type'] in node_types):
-            if cur_branches > counter['max_branches']:
-                counter['max_branches'] = cur_branches
+    return topology.down_sweep(starts_branch, np.add)
 
-    visitor = partial(branch_visitor,
-                      counter=counter,
-                      node_types=node_types)
-    morphology.depth_first_traversal(visitor,
-                                     start_id=root_id)
 
+def max_leaf_branches(morphology, topology, indices, branches_to_node,
+                      node_types=None):
+    """
+        Helper function for calculating branch order. Find the greatest
+        branch count among leaves of the argued types
+    """
+    is_leaf = topology.num_children[indices] == 0
+    if node_types is not None:
+        is_leaf &= np.isin(
+            morphology.get_node_columns()["types"][indices], list(node_types))
 
-    return counter['max_branches']
+    return int(np.max(branches_to_node[is_leaf], initial=0))
 
 
 @marked(Intrinsic)
@@ -294,12 +344,12 @@ def max_branch_order(
 
     """
     morphology = data.morphology
-    roots = morphology.get_roots()
-    max_branch_order = 0
-    for root in roots:
-        local_max = calculate_max_branch_order_from_root(
-                morphology, root, node_types=node_types)
-        if local_max > max_branch_order:
-            max_branch_order = local_max
-
-    return max_branch_order
+    topology = morphology.get_topology()
+
+    return max_leaf_branches(
+        morphology,
+        topology,
+        np.arange(len(topology)),
+        branches_to_nodes(topology),
+        node_types
+    )
@@ -1,5 +1,7 @@
 from typing import Optional, List, Dict
 
+import numpy as np
+
 from neuron_morphology.constants import (
     SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE)
 
@@ -9,75 +11,82 @@ from neuron_morphology.feature_extractor.data import (
     MorphologyLike, get_morphology)
 
 
-# TODO: There is a breadth_first_traversal method defined on Morphology. We
-# should use that here
-def _calculate_max_path_distance(morphology, root, node_types):
-    # if root not specified, grab the soma root if it exists, and the
-    #   root of the first disconnected tree if not
+def calculate_max_path_lengths(morphology, node_types=None):
+    """ For every node, find the length of the longest path from that node's
+    compartment down to a tip. This is computed in a single post-order pass
+    over the morphology.
+
+    Parameters
+    ----------
+    morphology : the reconstruction to measure
+    node_types : at a bifurcation, only continue along paths ending at tips
+        of these types. Defaults to all neurite and soma types.
+
+    Returns
+    -------
+    lengths : for each node (indexed as morphology.nodes()), the length of
+        its compartment (unless it is a soma node) plus the longest
+        permissible downstream path. Where a node bifurcates, a child's path
+        is permissible if it has positive length and ends at a tip of one of
+        node_types. Ties go to the earlier child.
+    tip_types : for each node, the type of the tip ending that path (or of
+        the node itself, if no downstream path is permissible)
+
+    """
 
     if node_types is None:
         node_types = [SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE]
+    permissible = set(node_types)
+
+    topology = morphology.get_topology()
+    types = morphology.get_node_columns()["types"]
+    table = morphology.get_compartment_table()
+
+    own_length = np.zeros(len(topology))
+    own_length[table.child] = table.length
+    own_length[types == SOMA] = 0.0
+
+    own_length = own_length.tolist()
+    children = topology.child_index.tolist()
+    offsets = topology.child_offsets.tolist()
+    lengths = [0.0] * len(topology)
+    tip_types = types.tolist()
+
+    for node in topology.postorder.tolist():
+        node_children = children[offsets[node]: offsets[node + 1]]
+
+        if len(node_children) == 1:
+            child = node_children[0]
+            lengths[node] = own_length[node] + lengths[child]
+            tip_types[node] = tip_types[child]
 
-    if root is None:
-        root = morphology.get_root()
-    total_length = 0.0
-    # sum up length for all child compartments
-    max_tip_type = None
-    while len(morphology.get_children(root)) > 0:
-        # the next node is a continuation from this node (ie, no
-        #   bifurcation). update path length and evaluate the
-        #   next node
-        # path tracing is done using nodes. if a node is associated
-        #   with a compartment (all non-root nodes are) then add that
-        #   compartment's length to the accumulated distance
-        if len(morphology.get_children(root)) == 1:
-            # get length of associated compartment, if it exists, and if
-            #   it's not soma
-            if root['type'] != SOMA:
-                compartment = morphology.get_compartment_for_node(root)
-                if compartment:
-                    total_length += morphology.get_compartment_length(compartment)
-            root = morphology.get_children(root)[0]
         else:
-            # we reached a bifurcation point
-            # recurse to find length of each child branch and then
-            #   exit loop
             max_sub_dist = 0.0
-            children_of_root = morphology.get_children(root)
-            for child in children_of_root:
-                dist, tip_type = _calculate_max_path_distance(morphology, child, node_types)
-                if dist > max_sub_dist and tip_type in node_types:
-                    max_sub_dist = dist
-                    max_tip_type = tip_type
-            total_length += max_sub_dist
-            break
-    # the length of this compartment hasn't been included yet, and if it
-    #   isn't part of the soma
-    if max_tip_type is None:
-        max_tip_type = root["type"]
-    if root['type'] != SOMA:
-        compartment = morphology.get_compartment_for_node(root)
-        if compartment:
-            total_length += morphology.get_compartment_length(compartment)
-    return total_length, max_tip_type
+            for child in node_children:
+                if lengths[child] > max_sub_dist \
+                        and tip_types[child] in permissible:
+                    max_sub_dist = lengths[child]
+                    tip_types[node] = tip_types[child]
+            lengths[node] = own_length[node] + max_sub_dist
+
+    return np.array(lengths), np.array(tip_types)
 
 
 def calculate_max_path_distance(morphology, root, node_types=None):
     """ Helper for max_path_distance. See below for more information.
     """
 
-    max_path = 0.0
     root_children = morphology.get_children(root)
     if root_children is None:
         return float('nan')
+
+    lengths, _ = calculate_max_path_lengths(morphology, node_types)
+    index_of = morphology.get_topology().index_of
+
+    max_path = 0.0
     for node in root_children:
-        path, tip_type = _calculate_max_path_distance(morphology, node, node_types)
-        if path > max_path:
-            if node_types and tip_type in node_types:
-                max_path = path
-            else:
-                max_path = path
-    return max_path
+        max_path = max(max_path, lengths[index_of[morphology.node_id_cb(node)]])
+    return float(max_path)
 
 
 @marked(RequiresRoot)
@@ -142,101 +151,98 @@ def early_branch_path(
     morphology = get_morphology(data)
     soma = soma or morphology.get_root()
 
-    path_len = _calculate_max_path_distance(morphology, soma, node_types)[0]
+    topology = morphology.get_topology()
+    lengths, _ = calculate_max_path_lengths(morphology, node_types)
+
+    path_len = float(lengths[topology.index_of[morphology.node_id_cb(soma)]])
     if path_len == 0:
         return 0.0
 
-    nodes = morphology.get_node_by_types(node_types)
-    longest_short = 0.0
-
-    for node in nodes:
-        if len(morphology.get_children(node, node_types)) < 2:
-            continue
-
-        current_short = min(
-            _calculate_max_path_distance(morphology, child, node_types)[0]
-            for child in morphology.children_of(node)
-        )
-
-        longest_short = max(longest_short, current_short)
+    # bifurcations among the argued types. The shortest downstream path is
+    # taken across all children, regardless of type
+    in_types = np.ones(len(topology), dtype=bool) if not node_types \
+        else np.isin(morphology.get_node_columns()["types"], node_types)
+    num_typed_children = topology.count_children(in_types)
+    bifurcations = np.flatnonzero(in_types & (num_typed_children >= 2))
+
+    shortest = np.full(len(topology), np.inf)
+    np.minimum.at(
+        shortest,
+        topology.parent[topology.child_index],
+        lengths[topology.child_index]
+    )
 
+    longest_short = float(np.max(shortest[bifurcations], initial=0.0))
     return longest_short / path_len
 
 
-def _calculate_mean_contraction(morphology, reference, root, node_types):
-
-    """
-        Calculate the average contraction of all sections. In other words,
-        calculate the average ratio of euclidean distance to path distance
-        between all bifurcations in the morphology. Trifurcations are treated
-        as bifurcations.
-
-        Parameters
-        ----------
-
-        morphology: Morphology object
-
-        reference: dict
-        This is the node of the previous bifurcation
+def calculate_mean_contraction(morphology, root=None, node_types=None):
+    """ See mean_contraction. Each section runs from a bifurcation to the
+    next bifurcation or tip. Sections are found and measured in a single pass
+    over the morphology's topology, rather than by recursing at each
+    bifurcation.
 
-        root: dict
-        This is the node from which to measure branch contraction under
+    Parameters
+    ----------
+    morphology : the reconstruction to measure
+    root : if provided, analyze the trees beginning at this node's children.
+        Otherwise analyze every tree formed by nodes of node_types.
+    node_types : restrict the analysis to nodes of these types
 
-        node_types: list (AXON, BASAL_DENDRITE, APICAL_DENDRITE)
-        Type to restrict search to
+    Returns
+    -------
+    The ratio of total euclidean distance to total path distance across
+    sections, or nan if there are no sections
 
-        Returns
-        -------
+    """
 
-        Two scalars: euclidean distance, path distance
-        These are the total bif-bif and bif-tip distances under this root
+    topology = morphology.get_topology()
+    columns = morphology.get_node_columns()
 
-    """
-    # advance to next bifurcation or tip and measure distance to
-    #   reference location
-    # on bifurcation, recurse into this function again
-    # treat trifurcation as 2 successive bifs
-    euc_dist = 0
-    path_dist = morphology.euclidean_distance(reference, root)
-    tot_path = 0.0
-    tot_euc = 0.0
-    while len(morphology.get_children(root, node_types)) > 0:
-        # if the next compartment is a continuation (ie, no
-        #   bifurcation) then get the next node
-        if len(morphology.get_children(root, node_types)) == 1:
-            next_node = morphology.get_children(root, node_types)[0]
-            path_dist += morphology.euclidean_distance(root, next_node)
-            root = next_node
-        else:
-            # we reached a bifurcation point. recurse and analyze children
-            for child in morphology.get_children(root, node_types):
-                euc, path = _calculate_mean_contraction(morphology, root, child, node_types)
-                tot_euc += euc
-                tot_path += path
-            break
-    euc_dist += morphology.euclidean_distance(root, reference)
-    return tot_euc + euc_dist, tot_path + path_dist
+    in_types = np.ones(len(topology), dtype=bool) if not node_types \
+        else np.isin(columns["types"], node_types)
+    num_children = topology.count_children(in_types)
 
+    if root is None:
+        has_parent = topology.parent >= 0
+        parent_in_types = np.zeros(len(topology), dtype=bool)
+        parent_in_types[has_parent] = in_types[topology.parent[has_parent]]
+        starts = np.flatnonzero(in_types & ~parent_in_types)
+    else:
+        root_children = topology.children(
+            topology.index_of[morphology.node_id_cb(root)])
+        starts = root_children[in_types[root_children]]
+
+    is_start = np.zeros(len(topology), dtype=bool)
+    is_start[starts] = True
+    reached = np.zeros(len(topology), dtype=bool)
+    for start in starts:
+        reached[topology.reachable(start, in_types)] = True
+
+    # for each node, the nearest bifurcation (or start) at or above it
+    anchors = reached & (is_start | (num_children >= 2))
+    nearest_anchor = topology.down_sweep(
+        np.where(anchors, topology.position, -1), np.maximum)
+
+    ends = np.flatnonzero(reached & ~is_start & (num_children != 1))
+    references = topology.preorder[nearest_anchor[topology.parent[ends]]]
+
+    # the stretch from a start to its first bifurcation is not a section
+    is_section = num_children[references] >= 2
+    ends = ends[is_section]
+    references = references[is_section]
+
+    table = morphology.get_compartment_table()
+    edge_length = np.zeros(len(topology))
+    edge_length[table.child] = table.length
+    distance_from_root = topology.down_sweep(edge_length, np.add)
+
+    positions = np.stack([columns["x"], columns["y"], columns["z"]], axis=1)
+    euc_dist = float(np.sum(np.linalg.norm(
+        positions[ends] - positions[references], axis=1)))
+    path_dist = float(np.sum(
+        distance_from_root[ends] - distance_from_root[references]))
 
-def calculate_mean_contraction(morphology, root=None, node_types=None):
-    """ See mean_contraction
-    """
-    roots = morphology.get_roots_for_analysis(root, node_types)
-    if roots is None:
-        return float('nan')
-    euc_dist = 0.0
-    path_dist = 0.0
-    for ref in roots:
-        # advance to next bifurcation
-        while len(morphology.get_children(ref, node_types)) == 1:
-            ref = morphology.get_children(ref, node_types)[0]
-        if len(morphology.get_children(ref, node_types)) == 0:
-            continue
-        # analyze each branch from this bifurcation point
-        for child in morphology.get_children(ref, node_types):
-            euc, path = _calculate_mean_contraction(morphology, ref, child, node_types)
-            euc_dist += euc
-            path_dist += path
     if path_dist == 0.0:
         return float('nan')
     return 1.0 * euc_dist / path_dist
@@ -1,15 +1,15 @@
-from typing import Optional, List, Union, Dict, Any
+from typing import Optional, List
 from statistics import mean
-from collections import defaultdict
-from functools import partial
+
+import numpy as np
 
 from neuron_morphology.morphology import Morphology
-from neuron_morphology.constants import SOMA
 from neuron_morphology.feature_extractor.marked_feature import marked
 from neuron_morphology.feature_extractor.mark import (
     Geometric, RequiresRadii, RequiresRoot)
 from neuron_morphology.feature_extractor.data import (
     MorphologyLike, get_morphology)
+from neuron_morphology.features.intermediates import root_node
 
 @marked(Geometric)
 def total_length(
@@ -40,19 +40,10 @@ def total_length(
     """
 
     morphology = get_morphology(data)
+    table = morphology.get_compartment_table()
 
-    nodes = morphology.get_node_by_types(node_types)
-    compartment_list = morphology.get_compartments(nodes, node_types)
-
-    total = 0.0
-    for compartment in compartment_list:
-        first_node_in_compartment = compartment[0]
-        if first_node_in_compartment['type'] is SOMA \
-            and not morphology.parent_of(first_node_in_compartment):
-            continue
-        total += morphology.get_compartment_length(compartment)
-
-    return total
+    mask = table.type_mask(node_types) & ~table.soma_root_mask()
+    return float(table.length[mask].sum())
 
 
 @marked(RequiresRadii)
@@ -79,10 +70,9 @@ def total_surface_area(
     """
 
     morphology: Morphology = get_morphology(data)
-    nodes = morphology.get_node_by_types(node_types)
-    compartments = morphology.get_compartments(nodes, node_types)
+    table = morphology.get_compartment_table()
 
-    return sum(map(morphology.get_compartment_surface_area, compartments))
+    return float(table.surface_area[table.type_mask(node_types)].sum())
 
 
 @marked(RequiresRadii)
@@ -108,10 +98,9 @@ def total_volume(
     """
     
     morphology = get_morphology(data)
-    nodes = morphology.get_node_by_types(node_types)
-    compartments = morphology.get_compartments(nodes, node_types)
+    table = morphology.get_compartment_table()
 
-    return sum(map(morphology.get_compartment_volume, compartments))
+    return float(table.volume[table.type_mask(node_types)].sum())
 
 
 @marked(RequiresRadii)
@@ -141,41 +130,6 @@ def mean_diameter(
 
 
 
-def parent_daughter_ratio_visitor(
-    node: Dict[str, Any], 
-    morphology: Morphology, 
-    counters: Dict[str, Union[int, float]],
-    node_types: Optional[List[int]] = None
-):
-    """ Calculates for a single node the ratio of the node's parent's radius to 
-    the node's radius. Stores these values in a provided dictionary.
-
-    Parameters
-    ----------
-    node : The node under consideration
-    morphology : The reconstruction to which this node belongs
-    counters : a dictionary used for storing running ratio totals and counts.
-    node_types : skip nodes not of one of these types
-
-    Notes
-    -----
-    see mean_parent_daughter_ratio for usage
-
-    """
-
-    parent = morphology.parent_of(node)
-    
-    if parent is None:
-        return
-
-    if node_types is not None:
-        if node["type"] not in node_types or parent["type"] not in node_types:
-            return
-
-    counters["ratio_sum"] += parent["radius"] / node["radius"]
-    counters["ratio_count"] += 1
-    
-
 @marked(RequiresRadii)
 def mean_parent_daughter_ratio(
     data: MorphologyLike,
@@ -197,26 +151,29 @@ def mean_parent_daughter_ratio(
     that both the parent and child must be in node_types in order for a
     compartment to be included in the calculation
 
+    Raises a ZeroDivisionError if any included child node has zero radius, or
+    if no compartments are included.
+
     """
 
-    morphology = get_morphology(data)
-    roots = morphology.get_roots()
-    
-    counters: Dict[str, int] = defaultdict(lambda *a, **k: 0)
-    visitor = partial(
-        parent_daughter_ratio_visitor, 
-        morphology=morphology, 
-        counters=counters,
-        node_types=node_types
-    )
-    
-    for root in roots:
-        morphology.breadth_first_traversal(
-            visitor, 
-            start_id=morphology.node_id_cb(root)
+    table = get_morphology(data).get_compartment_table()
+
+    selected = np.ones(len(table), dtype=bool)
+    if node_types is not None:
+        selected = np.isin(table.parent_type, node_types) \
+            & np.isin(table.child_type, node_types)
+
+    # as with scalar division, a zero-radius child makes this feature fail
+    # (rather than producing inf or nan)
+    child_radius = table.child_radius[selected]
+    if np.any(child_radius == 0):
+        raise ZeroDivisionError(
+            "mean_parent_daughter_ratio: a selected child node has zero "
+            "radius"
         )
 
-    return counters["ratio_sum"] / counters["ratio_count"]
+    ratio_sum = float(np.sum(table.parent_radius[selected] / child_radius))
+    return ratio_sum / int(np.count_nonzero(selected))
 
 
 @marked(RequiresRoot)
@@ -242,7 +199,7 @@ def max_euclidean_distance(
     """
 
     morphology = get_morphology(data)
-    soma = morphology.get_root()
+    soma = root_node(data)
 
     return max(
         morphology.euclidean_distance(soma, node)
@@ -17,6 +17,7 @@ from neuron_morphology.feature_extractor.mark import (
     Geometric
 )
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.features.intermediates import root_node
 from neuron_morphology.constants import (
     SOMA, AXON, BASAL_DENDRITE, APICAL_DENDRITE
 )
@@ -227,7 +228,7 @@ def soma_percentile(data: Data,
         percentiles: array of x, y, and z percentiles
 
     """
-    soma_node = data.morphology.get_root()
+    soma_node = root_node(data)
     soma_coord = np.asarray([soma_node['x'], soma_node['y'], soma_node['z']])
 
     nodes = data.morphology.get_node_by_types(node_types=node_types)
@@ -2,6 +2,11 @@ from typing import Optional, List
 from enum import Enum
 
 from neuron_morphology.morphology import Morphology
+from neuron_morphology.feature_extractor.data import (
+    MorphologyLike, get_morphology)
+from neuron_morphology.feature_extractor.provider import provider
+from neuron_morphology.features.intermediates import (
+    leaf_nodes, branching_nodes)
 from neuron_morphology.feature_extractor.marked_feature import marked
 from neuron_morphology.feature_extractor.feature_specialization import FeatureSpecialization
 from neuron_morphology.feature_extractor.mark import (
@@ -17,13 +22,13 @@ class COORD_TYPE(Enum):
     BIFURCATION = 2
     TIP = 3
 
-    def get_coordinates(self, morphology,
+    def get_coordinates(self, data: MorphologyLike,
                         node_types: Optional[List[int]] = None):
         fn = {COORD_TYPE.NODE: get_node_coordinates,
               COORD_TYPE.BIFURCATION: get_bifurcation_coordinates,
               COORD_TYPE.COMPARTMENT: get_compartment_coordinates,
               COORD_TYPE.TIP: get_tip_coordinates}.get(self)
-        return fn(morphology, node_types=node_types)
+        return fn(data, node_types=node_types)
 
 
 class NodeSpec(FeatureSpecialization):
@@ -60,7 +65,8 @@ COORD_TYPE_SPECIALIZATIONS = {
 
 @marked(Geometric)
 @marked(CompartmentFeatures)
-def get_compartment_coordinates(morphology,
+@provider
+def get_compartment_coordinates(data: MorphologyLike,
                                 node_types: Optional[List[int]] = None):
     """
         Return the coordinates of the midpoint of each compartment
@@ -69,24 +75,24 @@ def get_compartment_coordinates(morphology,
         Parameters
         ----------
 
-        morphology: Morphology object
+        data: Morphology or Data object
 
         node_types: list (AXON, BASAL_DENDRITE, APICAL_DENDRITE)
 
         Returns
         -------
 
-        list: list of coordinates [x, y, z]
+        np.ndarray: (N, 3) array of coordinates [x, y, z]
 
 
     """
-    comps = morphology.get_compartments()
-    return [morphology.get_compartment_midpoint(comp) for comp in comps]
+    return get_morphology(data).get_compartment_table().midpoint.copy()
 
 
 @marked(Geometric)
 @marked(BifurcationFeatures)
-def get_bifurcation_coordinates(morphology,
+@provider
+def get_bifurcation_coordinates(data: MorphologyLike,
                                 node_types: Optional[List[int]] = None):
     """
         Return the coordinates of each bifurcation in the morphology
@@ -94,7 +100,7 @@ def get_bifurcation_coordinates(morphology,
         Parameters
         ----------
 
-        morphology: Morphology object
+        data: Morphology or Data object
 
         node_types: list (AXON, BASAL_DENDRITE, APICAL_DENDRITE)
 
@@ -105,13 +111,14 @@ def get_bifurcation_coordinates(morphology,
 
 
     """
-    bifs = morphology.get_branching_nodes(node_types=node_types)
+    bifs = branching_nodes(data, node_types=node_types)
     return [[bif['x'], bif['y'], bif['z']] for bif in bifs]
 
 
 @marked(Geometric)
 @marked(TipFeatures)
-def get_tip_coordinates(morphology,
+@provider
+def get_tip_coordinates(data: MorphologyLike,
                         node_types: Optional[List[int]] = None):
     """
         Return the coordinates of each tip in the morphology
@@ -119,7 +126,7 @@ def get_tip_coordinates(morphology,
         Parameters
         ----------
 
-        morphology: Morphology object
+        data: Morphology or Data object
 
         node_types: list (AXON, BASAL_DENDRITE, APICAL_DENDRITE)
 
@@ -130,12 +137,13 @@ def get_tip_coordinates(morphology,
 
 
     """
-    tips = morphology.get_leaf_nodes(node_types=node_types)
+    tips = leaf_nodes(data, node_types=node_types)
     return [[tip['x'], tip['y'], tip['z']] for tip in tips]
 
 
 @marked(Geometric)
-def get_node_coordinates(morphology,
+@provider
+def get_node_coordinates(data: MorphologyLike,
                          node_types: Optional[List[int]] = None):
     """
         Return the coordinates of each node in the morphology
@@ -143,7 +151,7 @@ def get_node_coordinates(morphology,
         Parameters
         ----------
 
-        morphology: Morphology object
+        data: Morphology or Data object
 
         node_types: list (AXON, BASAL_DENDRITE, APICAL_DENDRITE)
 
@@ -154,7 +162,7 @@ def get_node_coordinates(morphology,
 
 
     """
-    nodes = morphology.get_node_by_types(node_types=node_types)
+    nodes = get_morphology(data).get_node_by_types(node_types=node_types)
     return [[node['x'], node['y'], node['z']] for node in nodes]
 
 
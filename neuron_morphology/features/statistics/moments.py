@@ -30,8 +30,8 @@ def moments(data: Data,
     """
 
     coordinates = coord_type.get_coordinates(
-                    data.morphology, node_types=node_types)
-    if not coordinates:
+                    data, node_types=node_types)
+    if len(coordinates) == 0:
         nan_array = np.empty((3,))
         nan_array[:] = np.nan
         moment_features = {
@@ -58,7 +58,7 @@ def calculate_coordinate_overlap(coordinates_a,
         dict: a_above_b, a_overlap_b, a_below_b, or
               -1's if coordinates_b is empty
     """
-    if not coordinates_b:
+    if len(coordinates_b) == 0:
         a_above_b, a_overlap_b, a_below_b = (-1, -1, -1)
 
     else:
@@ -109,8 +109,8 @@ def overlap(data: Data,
         dimension: dimension to compare (0, 1, 2 for x, y, z), default 1 (y)
 
     """
-    coords_a = coord_type.get_coordinates(data.morphology, node_types)
-    coords_b = coord_type.get_coordinates(data.morphology, node_types_to_compare)
+    coords_a = coord_type.get_coordinates(data, node_types)
+    coords_b = coord_type.get_coordinates(data, node_types_to_compare)
 
     overlap_features = calculate_coordinate_overlap(coords_a,
                                                     coords_b,
@@ -1,6 +1,9 @@
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Optional
 import copy as cp
 import logging
+import multiprocessing as mp
+import os
+import tempfile
 
 import numpy as np
 import pandas as pd
@@ -8,6 +11,8 @@ import xarray as xr
 from scipy.interpolate import RegularGridInterpolator
 from shapely.geometry.polygon import Polygon
 from shapely.geometry import LineString, Point
+from shapely.prepared import prep
+import shapely.vectorized
 
 from argschema.argschema_parser import ArgSchemaParser
 
@@ -16,6 +21,15 @@ from neuron_morphology.layered_point_depths._schemas import (
     InputParameters, OutputParameters)
 from neuron_morphology.features.layer.layered_point_depths import (
     LayeredPointDepths)
+from neuron_morphology.feature_extractor.result_cache import fingerprint
+
+
+# nodes are processed (and their outputs written) in chunks of this size
+DEFAULT_CHUNK_SIZE = 10000
+
+HDF5_EXTENSIONS = (".h5", ".hdf", ".hdf5")
+HDF5_KEY = "layered_point_depths"
+
 
 def translate_field(
     field: xr.DataArray,
@@ -107,6 +121,92 @@ def containing_layer(
         raise ValueError(f"overlapping layers: {in_layer}")
 
 
+def containing_layers(
+    positions: np.ndarray,
+    layers: List[Dict]
+) -> List[Optional[str]]:
+    """ As containing_layer, but classifies many points at once.
+
+    Parameters
+    ----------
+    positions : (N, 2) the coordinates of the points
+    layers : Each has "name" - a string and "bounds" - a Polygon
+
+    Returns
+    -------
+    For each point, the name of the containing layer or None if no containing
+        layer was found
+
+    """
+
+    return [
+        layers[index]["name"] if index >= 0 else None
+        for index in containing_layer_indices(positions, layers)
+    ]
+
+
+def containing_layer_indices(
+    positions: np.ndarray,
+    layers: List[Dict]
+) -> np.ndarray:
+    """ Find the index of the layer containing (or bounding) each of many
+    points. Points outside of a layer's bounding box are rejected without
+    further testing. The remainder are tested exactly, all at once, against
+    the layer's prepared bounds.
+
+    Parameters
+    ----------
+    positions : (N, 2) the coordinates of the points
+    layers : Each has "name" - a string and "bounds" - a Polygon
+
+    Returns
+    -------
+    (N,) For each point, the index in layers of the containing layer, or -1
+        if no containing layer was found
+
+    Raises
+    ------
+    ValueError : if some point lies in (or on the boundary of) more than one
+        layer
+
+    """
+
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    x = positions[:, 0]
+    y = positions[:, 1]
+    indices = np.full(len(positions), -1, dtype=np.int64)
+
+    for index, layer in enumerate(layers):
+        if layer["bounds"].is_empty:
+            continue
+
+        min_x, min_y, max_x, max_y = layer["bounds"].bounds
+        candidates = np.flatnonzero(
+            (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y))
+        if len(candidates) == 0:
+            continue
+
+        bounds = prep(layer["bounds"])
+        cand_x = x[candidates]
+        cand_y = y[candidates]
+
+        # as in containing_layer, points on the boundary are included
+        inside = shapely.vectorized.contains(bounds, cand_x, cand_y)
+        inside[~inside] = shapely.vectorized.touches(
+            bounds, cand_x[~inside], cand_y[~inside])
+        found = candidates[inside]
+
+        overlapping = found[indices[found] >= 0]
+        if len(overlapping):
+            raise ValueError(
+                "overlapping layers: "
+                f"{[layers[indices[overlapping[0]]]['name'], layer['name']]}"
+            )
+        indices[found] = index
+
+    return indices
+
+
 def tuplize(arr: np.array) -> Tuple:
     """ Convert an array to a tuple
     """
@@ -189,6 +289,201 @@ def step_from_node(
     return None # uneccessary, but satisfies linter :/
 
 
+def surface_segments(surface: LineString) -> np.ndarray:
+    """ Break a surface into its line segments
+
+    Parameters
+    ----------
+    surface : a linestring
+
+    Returns
+    -------
+    A (M, 2, 2) array of segments, each (start, end)
+
+    """
+
+    coords = np.asarray(surface.coords, dtype=float)[:, :2]
+    return np.stack([coords[:-1], coords[1:]], axis=1)
+
+
+def first_intersections(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    segments: np.ndarray,
+    max_block_size: int = 2 ** 22
+) -> np.ndarray:
+    """ For each of many rays, find the intersection with a set of segments
+    which is closest to the ray's start.
+
+    Parameters
+    ----------
+    starts : (N, 2) start point of each ray
+    ends : (N, 2) end point of each ray
+    segments : (M, 2, 2) the segments (e.g. of a surface) to test against
+    max_block_size : test at most this many ray-segment pairs at once
+
+    Returns
+    -------
+    (N,) For each ray, the fraction of the way from start to end at which
+        the closest intersection lies, or nan if the ray intersects no
+        segment. Collinear overlaps intersect at the overlap's closest point.
+
+    """
+
+    result = np.full(len(starts), np.nan)
+    if len(starts) == 0 or len(segments) == 0:
+        return result
+
+    seg_start = segments[np.newaxis, :, 0]
+    seg_dir = segments[np.newaxis, :, 1] - seg_start
+    block_size = max(max_block_size // len(segments), 1)
+
+    for block in range(0, len(starts), block_size):
+        pos = starts[block: block + block_size, np.newaxis]
+        ray = ends[block: block + block_size, np.newaxis] - pos
+        offset = seg_start - pos
+
+        denom = _cross(ray, seg_dir)
+        offset_ray = _cross(offset, ray)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            along = _cross(offset, seg_dir) / denom
+            along_seg = offset_ray / denom
+
+        # comparisons against nan (from parallel pairs) are False
+        crossing = (along >= 0) & (along <= 1) \
+            & (along_seg >= 0) & (along_seg <= 1)
+        along[~crossing] = np.inf
+
+        parallel = np.nonzero((denom == 0) & (offset_ray == 0))
+        if len(parallel[0]):
+            along[parallel] = _overlap_start(
+                ray[parallel[0], 0], offset[parallel], seg_dir[0, parallel[1]]
+            )
+
+        closest = along.min(axis=1)
+        closest[~np.isfinite(closest)] = np.nan
+        result[block: block + block_size] = closest
+
+    return result
+
+
+def _overlap_start(
+    ray: np.ndarray,
+    offset: np.ndarray,
+    seg_dir: np.ndarray
+) -> np.ndarray:
+    """ For collinear rays and segments, find the fraction along each ray at
+    which it first overlaps its segment (inf if they do not overlap)
+    """
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ray_length2 = np.sum(ray ** 2, axis=-1)
+        seg_lo = np.sum(offset * ray, axis=-1) / ray_length2
+        seg_hi = np.sum((offset + seg_dir) * ray, axis=-1) / ray_length2
+
+    overlap_lo = np.maximum(np.minimum(seg_lo, seg_hi), 0)
+    overlap_hi = np.minimum(np.maximum(seg_lo, seg_hi), 1)
+    return np.where(overlap_lo <= overlap_hi, overlap_lo, np.inf)
+
+
+def _cross(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """ z-component of the cross product of (..., 2) arrays
+    """
+    return first[..., 0] * second[..., 1] - first[..., 1] * second[..., 0]
+
+
+def step_from_nodes(
+    positions: np.ndarray,
+    depth_interp: RegularGridInterpolator,
+    dx_interp: RegularGridInterpolator,
+    dy_interp: RegularGridInterpolator,
+    surface: LineString,
+    step_size: float,
+    max_iter: int,
+    adaptive_scale: int = 32,
+) -> np.ndarray:
+    """ As step_from_node, but walks from many start positions at once. Each
+    step evaluates the interpolators once for all unfinished paths, and
+    tests all of their steps for intersection with the surface together.
+
+    Parameters
+    ----------
+    positions : (N, 2) the start positions
+    depth_interp : callable mapping positions to scalar depth values
+    dx_interp : callable mapping positions to the x component of the gradient
+    dy_interp : callable mapping positions to the y component of the gradient
+    surface : Check for the intersection of each path with this surface
+    step_size : Each step proceeds in the direction of the local gradient,
+        scaled to this step size
+    max_iter : give up (return nan) on paths which do not intersect the
+        surface in this many steps
+
+    Returns
+    -------
+    (N,) The depth of the intersection between each path and the given
+        surface, or nan if no intersection was found
+
+    """
+
+    positions = np.array(positions, dtype=float).reshape(-1, 2)
+    segments = surface_segments(surface)
+
+    num_paths = len(positions)
+    depths = np.full(num_paths, np.nan)
+    scale = np.full(num_paths, float(adaptive_scale))
+    base_step = np.zeros((num_paths, 2))
+    retry_step = np.zeros(num_paths, dtype=bool)
+    active = np.ones(num_paths, dtype=bool)
+
+    for _ in range(max_iter):
+        # skip recalculating base_step for paths retrying with smaller steps
+        fresh = np.flatnonzero(active & ~retry_step)
+        if len(fresh):
+            gradient = np.stack([
+                dx_interp(positions[fresh]),
+                dy_interp(positions[fresh])
+            ], axis=1)
+            undefined = np.any(np.isnan(gradient), axis=1)
+            active[fresh[undefined]] = False
+
+            fresh = fresh[~undefined]
+            gradient = gradient[~undefined]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                base_step[fresh] = gradient \
+                    / np.linalg.norm(gradient, axis=1)[:, np.newaxis]
+
+        current = np.flatnonzero(active)
+        if len(current) == 0:
+            break
+
+        step = (scale[current] * step_size)[:, np.newaxis] \
+            * base_step[current]
+        next_pos = positions[current] + step
+        along = first_intersections(positions[current], next_pos, segments)
+
+        intersected = ~np.isnan(along)
+        shrink = intersected & (scale[current] > 1)
+        found = intersected & ~shrink
+        moved = ~intersected
+
+        # We intersected, but with a big step; scale it down and try again
+        # from same starting point
+        scale[current[shrink]] /= 2
+        retry_step[current[shrink]] = True
+
+        if np.any(found):
+            points = positions[current[found]] \
+                + along[found, np.newaxis] * step[found]
+            depths[current[found]] = depth_interp(points)
+            active[current[found]] = False
+
+        positions[current[moved]] = next_pos[moved]
+        retry_step[current[moved]] = False
+
+    return depths
+
+
 def get_node_intersections(
     node: Dict,
     depth_interp: RegularGridInterpolator,
@@ -252,14 +547,9 @@ def get_node_intersections(
             "point_type": node["type"]
         }
 
-    pia = [
-        layer["pia_surface"] for layer in layers
-        if layer["name"] == start_layer
-    ][0]
-    wm = [
-        layer["wm_surface"] for layer in layers
-        if layer["name"] == start_layer
-    ][0]
+    layer = next(layer for layer in layers if layer["name"] == start_layer)
+    pia = layer["pia_surface"]
+    wm = layer["wm_surface"]
 
     return {
         "ids": node["id"],
@@ -274,6 +564,291 @@ def get_node_intersections(
         "point_type": node["type"]
     }
 
+def get_intersections(
+    nodes: List[Dict],
+    depth_interp: RegularGridInterpolator,
+    dx_interp: RegularGridInterpolator,
+    dy_interp: RegularGridInterpolator,
+    layers: List[Dict],
+    step_size: float,
+    max_iter: int,
+    surface_depth_grid: Optional[xr.Dataset] = None
+) -> pd.DataFrame:
+    """ As get_node_intersections, but for many nodes at once. Nodes are
+    grouped by containing layer and the paths from each group to its layer's
+    surfaces are walked together (see step_from_nodes). If a surface depth
+    grid is provided, intersection depths are instead interpolated from it,
+    walking only from nodes for which interpolation fails.
+
+    Parameters
+    ----------
+    nodes : Of a Morphology. See get_node_intersections
+    depth_interp : callable mapping positions to scalar depth values
+    dx_interp : callable mapping positions to the x component of the gradient
+    dy_interp : callable mapping positions to the y component of the gradient
+    layers : See get_node_intersections
+    step_size : Each step proceeds in the direction of the local gradient,
+        scaled to this step size
+    max_iter : give up (record nan) if the surface is not intersected in
+        this many steps
+    surface_depth_grid : if provided, precomputed intersection depths (see
+        compute_surface_depth_grid)
+
+    Returns
+    -------
+    A dataframe with one row of LayeredPointDepths per node. Columns are as
+        the keys of get_node_intersections' output. Missing
+        intersections are nan.
+
+    """
+
+    positions = np.array(
+        [(node["x"], node["y"]) for node in nodes], dtype=float
+    ).reshape(-1, 2)
+    layer_indices = containing_layer_indices(positions, layers)
+
+    pia_side = np.full(len(nodes), np.nan)
+    wm_side = np.full(len(nodes), np.nan)
+
+    for index, layer in enumerate(layers):
+        in_layer = layer_indices == index
+        if not np.any(in_layer):
+            continue
+
+        for depths, surface, step in (
+            (pia_side, "pia_surface", step_size),
+            (wm_side, "wm_surface", -step_size)
+        ):
+            to_walk = np.flatnonzero(in_layer)
+            if surface_depth_grid is not None:
+                depths[to_walk] = lookup_surface_depths(
+                    surface_depth_grid, layer["name"], surface,
+                    positions[to_walk]
+                )
+                to_walk = to_walk[np.isnan(depths[to_walk])]
+
+            depths[to_walk] = step_from_nodes(
+                positions[to_walk], depth_interp, dx_interp, dy_interp,
+                layer[surface], step, max_iter
+            )
+
+    return pd.DataFrame({
+        "ids": [node["id"] for node in nodes],
+        "layer_name": [
+            layers[index]["name"] if index >= 0 else None
+            for index in layer_indices
+        ],
+        "depth": depth_interp(positions) if len(nodes) else [],
+        "local_layer_pia_side_depth": pia_side,
+        "local_layer_wm_side_depth": wm_side,
+        "point_type": [node["type"] for node in nodes]
+    })
+
+
+def compute_surface_depth_grid(
+    x: np.ndarray,
+    y: np.ndarray,
+    depth_interp: RegularGridInterpolator,
+    dx_interp: RegularGridInterpolator,
+    dy_interp: RegularGridInterpolator,
+    layers: List[Dict],
+    step_size: float,
+    max_iter: int
+) -> xr.Dataset:
+    """ Precompute, for each point of a grid and each layer, the depths at
+    which the point's path intersects that layer's pia- and wm-side surfaces.
+    Intersection depths for nodes can then be interpolated from this grid
+    (see lookup_surface_depths), rather than walked for each node. Cells from
+    the same slice can share a grid.
+
+    Only grid points within one grid cell of a layer are walked for that
+    layer; the rest are nan.
+
+    Parameters
+    ----------
+    x, y : the (ascending) coordinates of the grid. Typically those of the
+        gradient field.
+    depth_interp : callable mapping positions to scalar depth values
+    dx_interp : callable mapping positions to the x component of the gradient
+    dy_interp : callable mapping positions to the y component of the gradient
+    layers : See get_node_intersections
+    step_size : Each step proceeds in the direction of the local gradient,
+        scaled to this step size
+    max_iter : give up (record nan) if the surface is not intersected in
+        this many steps
+
+    Returns
+    -------
+    A dataset with variables "pia_side_depth" and "wm_side_depth", each
+        with dimensions ("layer", "x", "y")
+
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    grid_x, grid_y = np.meshgrid(x, y, indexing="ij")
+    grid_x = grid_x.ravel()
+    grid_y = grid_y.ravel()
+    positions = np.stack([grid_x, grid_y], axis=1)
+
+    # any grid cell containing a point of a layer has all of its corners
+    # within this distance of the layer
+    margin = np.hypot(
+        np.max(np.diff(x), initial=0), np.max(np.diff(y), initial=0))
+
+    pia_side = np.full((len(layers), len(positions)), np.nan)
+    wm_side = np.full((len(layers), len(positions)), np.nan)
+
+    for index, layer in enumerate(layers):
+        near = np.flatnonzero(shapely.vectorized.contains(
+            prep(layer["bounds"].buffer(margin)), grid_x, grid_y))
+
+        pia_side[index, near] = step_from_nodes(
+            positions[near], depth_interp, dx_interp, dy_interp,
+            layer["pia_surface"], step_size, max_iter
+        )
+        wm_side[index, near] = step_from_nodes(
+            positions[near], depth_interp, dx_interp, dy_interp,
+            layer["wm_surface"], -step_size, max_iter
+        )
+
+    shape = (len(layers), len(x), len(y))
+    return xr.Dataset(
+        {
+            "pia_side_depth": (("layer", "x", "y"), pia_side.reshape(shape)),
+            "wm_side_depth": (("layer", "x", "y"), wm_side.reshape(shape)),
+        },
+        coords={
+            "layer": [layer["name"] for layer in layers],
+            "x": x,
+            "y": y
+        }
+    )
+
+
+def lookup_surface_depths(
+    grid: xr.Dataset,
+    layer_name: str,
+    surface: str,
+    positions: np.ndarray
+) -> np.ndarray:
+    """ Interpolate precomputed intersection depths for some points.
+
+    Parameters
+    ----------
+    grid : see compute_surface_depth_grid
+    layer_name : the layer containing the points
+    surface : "pia_surface" or "wm_surface"
+    positions : (N, 2) the coordinates of the points
+
+    Returns
+    -------
+    (N,) the interpolated depth of the intersection between each point's
+        path and the surface. nan where any surrounding grid point lacks a
+        depth, or outside of the grid.
+
+    """
+
+    name = {
+        "pia_surface": "pia_side_depth",
+        "wm_surface": "wm_side_depth"
+    }[surface]
+    values = grid[name].sel(layer=layer_name).transpose("x", "y").values
+
+    interp = RegularGridInterpolator(
+        (grid["x"].values, grid["y"].values), values,
+        method="linear", bounds_error=False, fill_value=np.nan
+    )
+    return interp(np.asarray(positions, dtype=float).reshape(-1, 2))
+
+
+def surface_depth_grid_key(
+    depth_field: xr.DataArray,
+    gradient_field: xr.DataArray,
+    layers: List[Dict],
+    step_size: float,
+    max_iter: int
+) -> str:
+    """ Identify the inputs to compute_surface_depth_grid, so that a cached
+    grid is only reused for the same fields, layers and stepping parameters.
+    """
+
+    return fingerprint((
+        [
+            (name, coord.values)
+            for field in (depth_field, gradient_field)
+            for name, coord in sorted(field.coords.items())
+        ],
+        depth_field.values,
+        gradient_field.values,
+        [
+            (
+                layer["name"],
+                np.asarray(layer["bounds"].exterior.coords),
+                np.asarray(layer["pia_surface"].coords),
+                np.asarray(layer["wm_surface"].coords)
+            )
+            for layer in layers
+        ],
+        float(step_size),
+        int(max_iter)
+    ))
+
+
+def load_surface_depth_grid(
+    path: str,
+    key: str,
+    compute: Callable[[], xr.Dataset]
+) -> xr.Dataset:
+    """ Read a surface depth grid cached at path, or compute one and add it
+    to the cache if none was cached for these inputs.
+
+    A cache file holds any number of grids with the same coordinates,
+    stacked along a "key" dimension. Cached grids whose coordinates differ
+    from those of a newly computed grid are discarded. The file is replaced
+    atomically, so concurrent readers see either the old or the new grids.
+
+    Parameters
+    ----------
+    path : of the (netcdf) cache file
+    key : identifies the inputs (see surface_depth_grid_key)
+    compute : called with no arguments to obtain the grid on a miss
+
+    Returns
+    -------
+    The surface depth grid
+
+    """
+
+    cached = None
+    if os.path.exists(path):
+        with xr.open_dataset(path) as dataset:
+            if "key" in dataset.dims:
+                cached = dataset.load()
+        if cached is not None and key in cached["key"].values:
+            return cached.sel(key=key, drop=True)
+        logging.info(f"adding a grid to surface depth grid cache: {path}")
+
+    grid = compute()
+    entries = [grid.expand_dims(key=[key])]
+    if cached is not None and all(
+        cached[name].equals(grid[name]) for name in grid.coords
+    ):
+        entries.insert(0, cached)
+
+    handle, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(handle)
+    try:
+        xr.concat(entries, dim="key").to_netcdf(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return grid
+
+
 def setup_layers(layers: List[Dict]):
     """ Convert layer bounds, pia, and white matter surfaces to shapely objects
 
@@ -292,35 +867,49 @@ def setup_layers(layers: List[Dict]):
         layer["pia_surface"] = LineString(layer["pia_surface"])
         layer["wm_surface"] = LineString(layer["wm_surface"])
 
-def run_layered_point_depths(
-    swc_path: str,
+def setup_depth_state(
     depth: Dict,
     layers: List[Dict],
     step_size: float,
     max_iter: int,
-    output_path: str
-):
+    soma_position: Optional[Tuple[float, float]] = None,
+    surface_depth_grid_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """ Load the depth and gradient fields and build everything needed to
+    compute intersections for a reconstruction's nodes.
 
-    morpho = morphology_from_swc(swc_path)
-    gradient_field: xr.DataArray = xr.open_dataarray(depth["gradient_field_path"])
-    depth_field: xr.DataArray = xr.open_dataarray(depth["depth_field_path"])
+    Parameters
+    ----------
+    depth : specifies the depth and gradient fields (see DepthField)
+    layers : specifies the layers (see Layer). Not modified.
+    step_size : unsigned; the direction towards pia is given by depth
+    max_iter : give up (record nan) if a surface is not intersected in this
+        many steps
+    soma_position : if provided, translate the fields by this (x, y)
+    surface_depth_grid_path : if provided, read (or compute and cache) a
+        surface depth grid here. See load_surface_depth_grid
+
+    Returns
+    -------
+    keyword arguments for get_intersections
+
+    """
+
+    with xr.open_dataarray(depth["gradient_field_path"]) as gradient_field:
+        gradient_field = gradient_field.load()
+    with xr.open_dataarray(depth["depth_field_path"]) as depth_field:
+        depth_field = depth_field.load()
+
+    layers = cp.deepcopy(layers)
     setup_layers(layers)
     step_size = depth["pia_sign"] * step_size
 
-    if depth["soma_origin"]:
-        soma = morpho.get_soma()
-        translate_field(
-            gradient_field,
-            soma["x"],
-            soma["y"],
-            inplace=True
-        )
-        translate_field(
-            depth_field,
-            soma["x"],
-            soma["y"],
-            inplace=True
-        )
+    field_x = gradient_field["x"].values
+    field_y = gradient_field["y"].values
+    offset_x, offset_y = (0.0, 0.0) if soma_position is None \
+        else soma_position
+    gradient_field = translate_field(gradient_field, offset_x, offset_y)
+    depth_field = translate_field(depth_field, offset_x, offset_y)
 
     depth_interp = setup_interpolator(
         depth_field, None, method="linear",
@@ -332,23 +921,180 @@ def run_layered_point_depths(
         gradient_field, "dy", method="linear",
         bounds_error=False, fill_value=None)
 
-    outputs = []
-    for node in morpho.nodes():
-        outputs.append(get_node_intersections(
-            node,
-            depth_interp,
-            dx_interp,
-            dy_interp,
-            layers,
-            step_size,
-            max_iter
-        ))
+    surface_depth_grid = None
+    if surface_depth_grid_path is not None:
+        # The fields move relative to the layers with the soma, so each soma
+        # position needs its own grid. Grids are cached in the untranslated
+        # frame of the fields, where they share coordinates, so that the
+        # grids of every reconstruction can be stored in one file.
+        surface_depth_grid = translate_field(
+            load_surface_depth_grid(
+                surface_depth_grid_path,
+                surface_depth_grid_key(
+                    depth_field, gradient_field, layers, step_size, max_iter),
+                lambda: compute_surface_depth_grid(
+                    field_x + offset_x,
+                    field_y + offset_y,
+                    depth_interp,
+                    dx_interp,
+                    dy_interp,
+                    layers,
+                    step_size,
+                    max_iter
+                ).assign_coords(x=field_x, y=field_y)
+            ),
+            offset_x, offset_y
+        )
+
+    return {
+        "depth_interp": depth_interp,
+        "dx_interp": dx_interp,
+        "dy_interp": dy_interp,
+        "layers": layers,
+        "step_size": step_size,
+        "max_iter": max_iter,
+        "surface_depth_grid": surface_depth_grid
+    }
+
+
+def write_intersections(
+    chunks: Iterable[pd.DataFrame],
+    output_path: str,
+    min_itemsize: Optional[Dict[str, int]] = None
+) -> int:
+    """ Write the outputs of get_intersections as they arrive, so that only
+    one chunk need be held in memory.
+
+    Parameters
+    ----------
+    chunks : each a dataframe of (consecutive) LayeredPointDepths rows
+    output_path : write a csv here, or an hdf5 table if the extension is
+        .h5, .hdf or .hdf5 (see LayeredPointDepths.read)
+    min_itemsize : when writing hdf5, reserve this many characters for
+        these string columns
+
+    Returns
+    -------
+    the number of rows written
+
+    """
+
+    is_hdf5 = os.path.splitext(output_path)[1] in HDF5_EXTENSIONS
+
+    num_rows = 0
+    for index, chunk in enumerate(chunks):
+        df = LayeredPointDepths.from_dataframe(chunk).df
+        if is_hdf5:
+            df.to_hdf(
+                output_path, key=HDF5_KEY, mode="w" if index == 0 else "a",
+                format="table", append=True, min_itemsize=min_itemsize
+            )
+        else:
+            df.to_csv(
+                output_path, mode="w" if index == 0 else "a",
+                header=index == 0
+            )
+        num_rows += len(df)
+
+    return num_rows
+
+
+def run_layered_point_depths(
+    swc_path: str,
+    depth: Dict,
+    layers: List[Dict],
+    step_size: float,
+    max_iter: int,
+    output_path: str,
+    surface_depth_grid_path: Optional[str] = None,
+    num_processes: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+):
+    """ Compute layered point depths for each node of a reconstruction.
+    Nodes are processed in chunks, optionally in a multiprocessing pool, and
+    each chunk's outputs are written as soon as they are available.
+
+    Parameters
+    ----------
+    swc_path : the reconstruction
+    depth, layers, step_size, max_iter, surface_depth_grid_path : see
+        setup_depth_state
+    output_path : see write_intersections
+    num_processes : use this many processes. Defaults to the number of
+        cpus. No pool is used if this (or the number of chunks) is 1.
+    chunk_size : process and write this many nodes at a time
+
+    Returns
+    -------
+    a dictionary describing the outputs
+
+    """
+
+    # parallel imports this module, so must not be imported before it loads
+    from neuron_morphology.layered_point_depths.parallel import (
+        initialize_worker, intersections_in_worker)
 
-    depths = LayeredPointDepths.from_dataframe(pd.DataFrame(outputs))
-    depths.to_csv(output_path)
+    morpho = morphology_from_swc(swc_path)
+
+    soma_position = None
+    if depth["soma_origin"]:
+        soma = morpho.get_soma()
+        soma_position = (soma["x"], soma["y"])
+
+    nodes = [
+        {key: node[key] for key in ("id", "type", "x", "y")}
+        for node in morpho.nodes()
+    ]
+    chunks = [
+        nodes[start: start + chunk_size]
+        for start in range(0, max(len(nodes), 1), chunk_size)
+    ]
+
+    num_processes = num_processes if num_processes else mp.cpu_count()
+    num_processes = max(min(num_processes, len(chunks)), 1)
+
+    worker_args = (
+        depth,
+        layers,
+        step_size,
+        max_iter,
+        soma_position,
+        surface_depth_grid_path
+    )
+
+    if num_processes > 1:
+        if surface_depth_grid_path is not None:
+            # compute and cache the grid once, rather than in each worker
+            setup_depth_state(*worker_args)
+
+        pool = mp.Pool(
+            num_processes,
+            initializer=initialize_worker,
+            initargs=worker_args
+        )
+        mapper = pool.imap(intersections_in_worker, chunks)
+    else:
+        pool = None
+        initialize_worker(*worker_args)
+        mapper = (intersections_in_worker(chunk) for chunk in chunks)  # type: ignore[assignment]
+
+    try:
+        write_intersections(
+            mapper,
+            output_path,
+            min_itemsize={
+                "layer_name": max(
+                    [len(layer["name"]) for layer in layers], default=1)
+            }
+        )
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
 
-    gradient_field.close()
-    depth_field.close()
+    if pool is not None:
+        pool.close()
+        pool.join()
 
     return {"output_path": output_path}
 
@@ -361,8 +1107,10 @@ def main():
 
     args = cp.deepcopy(parser.args)
     logging.getLogger().setLevel(args.pop("log_level"))
+    args.pop("input_json", None)
+    args.pop("output_json", None)
 
-    output = main(**args)
+    output = run_layered_point_depths(**args)
     output.update({"inputs": parser.args})
 
     parser.output(output)
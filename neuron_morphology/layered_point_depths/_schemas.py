@@ -93,7 +93,10 @@ class InputParameters(ArgSchema):
         default=1.0
     )
     output_path = OutputFile(
-        description="write (csv) outputs here",
+        description=(
+            "write outputs here, as a csv or (if the extension is .h5, .hdf "
+            "or .hdf5) an hdf5 table"
+        ),
         required=True
     )
     max_iter = Int(
@@ -101,6 +104,39 @@ class InputParameters(ArgSchema):
         required=True,
         default=1000
     )
+    surface_depth_grid_path = String(
+        description=(
+            "If provided, precompute the depths at which paths from each "
+            "point of the gradient field's grid intersect each layer's "
+            "surfaces, and cache them in this (netcdf) file. Node depths are "
+            "then interpolated from the grid. Reconstructions from the same "
+            "slice (sharing fields and layers) can share a cache file. If "
+            "the fields are centered at the soma, a grid is computed for each "
+            "soma position; all are kept in the file."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    num_processes = Int(
+        description=(
+            "Process chunks of nodes in a multiprocessing pool with this many "
+            "processes. Default is min(number of cpus, number of chunks). "
+            "Setting num_processes to 1 will avoid a pool."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    chunk_size = Int(
+        description=(
+            "Process this many nodes at a time. Outputs are written as each "
+            "chunk completes, so this bounds memory use."
+        ),
+        required=False,
+        default=10000,
+        validate=lambda val: val > 0
+    )
 
 class OutputParameters(DefaultSchema):
     inputs = Nested(
@@ -109,6 +145,6 @@ class OutputParameters(DefaultSchema):
         required=True
     )
     output_path = String(
-        description="(csv) outputs written here",
+        description="(csv or hdf5) outputs written here",
         required=True
     )
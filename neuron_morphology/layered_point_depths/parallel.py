@@ -0,0 +1,60 @@
+""" Worker-side helpers for computing the layered point depths of a
+reconstruction's nodes in a multiprocessing pool. Each worker loads the
+depth and gradient fields and builds its interpolators and layer geometries
+once (in initialize_worker) rather than once per chunk of nodes.
+
+These must live outside of __main__ due to how Windows handles
+multiprocessing.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from neuron_morphology.layered_point_depths.__main__ import (
+    setup_depth_state, get_intersections)
+
+
+# per-process state, populated by initialize_worker
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def initialize_worker(
+    depth: Dict,
+    layers: List[Dict],
+    step_size: float,
+    max_iter: int,
+    soma_position: Optional[Tuple[float, float]] = None,
+    surface_depth_grid_path: Optional[str] = None
+):
+    """ Prepare this process to compute layered point depths. Intended for
+    use as a multiprocessing pool initializer. Parameters are as
+    setup_depth_state.
+    """
+
+    _WORKER_STATE.clear()
+    _WORKER_STATE.update(setup_depth_state(
+        depth,
+        layers,
+        step_size,
+        max_iter,
+        soma_position,
+        surface_depth_grid_path
+    ))
+
+
+def intersections_in_worker(nodes: List[Dict]) -> pd.DataFrame:
+    """ Compute layered point depths for a chunk of nodes, using the state
+    set up by initialize_worker.
+
+    Parameters
+    ----------
+    nodes : each must have an id, type, x and y
+
+    Returns
+    -------
+    see get_intersections
+
+    """
+
+    return get_intersections(nodes, **_WORKER_STATE)
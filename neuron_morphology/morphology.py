@@ -1,12 +1,15 @@
 from typing import Sequence, Dict
 from statistics import mean
 import functools
-from collections import deque
+from collections import deque, Counter
+import itertools
 from six import iteritems
 from allensdk.core.simple_tree import SimpleTree
 import neuron_morphology.validation as validation
 from neuron_morphology.validation.result import InvalidMorphology
 from neuron_morphology.constants import *
+from neuron_morphology.compartment_table import CompartmentTable
+from neuron_morphology.topology import TreeTopology
 from scipy.spatial.distance import euclidean
 import numpy as np
 import copy
@@ -32,12 +35,156 @@ class Morphology(SimpleTree):
         self.node_id_cb = node_id_cb
         self.parent_id_cb = self._parent_id_cb
         self.nodes_by_types = {}
+        self._cache = {}
         self._create_compartment_dictionary()
         self.compartments = self.get_compartments()
 
     def __len__(self):
         return len(self._nodes)
 
+    def clear_cache(self):
+        """ Discard derived data (such as the compartment table) cached on
+        this morphology. Call this after modifying nodes in place.
+        """
+
+        self._cache.clear()
+
+    def _node_columns(self):
+        """ Gather per-node data into arrays, ordered as self.nodes().
+        Missing radii are filled with nan.
+        """
+
+        nodes = self.nodes()
+        index_of = {nid: ii for ii, nid in enumerate(self.node_ids())}
+
+        return {
+            "parent_index": np.array(
+                [index_of.get(self._parent_ids[nid], -1) for nid in index_of],
+                dtype=np.int64
+            ),
+            "types": np.array([node['type'] for node in nodes], dtype=np.int64),
+            "x": np.array([node['x'] for node in nodes], dtype=float),
+            "y": np.array([node['y'] for node in nodes], dtype=float),
+            "z": np.array([node['z'] for node in nodes], dtype=float),
+            "radius": np.array(
+                [node.get('radius', np.nan) for node in nodes], dtype=float),
+        }
+
+    def get_node_columns(self) -> Dict[str, np.ndarray]:
+        """ Obtain per-node arrays (parent_index, types, x, y, z, radius),
+        ordered as self.nodes(). Computed on first request and cached; see
+        clear_cache. The arrays must be treated as read-only.
+        """
+
+        if "node_columns" not in self._cache:
+            self._cache["node_columns"] = self._node_columns()
+        return self._cache["node_columns"]
+
+    def get_compartment_table(self) -> CompartmentTable:
+        """ Obtain vectorized geometry (length, surface area, volume,
+        midpoint) for every compartment in this morphology. The table is
+        computed on first request and cached; see clear_cache.
+        """
+
+        if "compartment_table" not in self._cache:
+            self._cache["compartment_table"] = \
+                CompartmentTable.from_arrays(**self.get_node_columns())
+        return self._cache["compartment_table"]
+
+    def get_topology(self) -> TreeTopology:
+        """ Obtain precomputed traversal orders (preorder, postorder, subtree
+        ranges and depth levels) for this morphology's trees. Node indices
+        follow the order of self.nodes(). Computed on first request and
+        cached; see clear_cache.
+        """
+
+        if "topology" not in self._cache:
+            self._cache["topology"] = TreeTopology.from_parent_index(
+                self.get_node_columns()["parent_index"], self.node_ids())
+        return self._cache["topology"]
+
+    def get_type_counts(self) -> Dict[int, int]:
+        """ Count the nodes of each type in this morphology. Computed on
+        first request and cached; see clear_cache.
+        """
+
+        if "type_counts" not in self._cache:
+            self._cache["type_counts"] = self._type_counts()
+        return self._cache["type_counts"]
+
+    def _type_counts(self):
+        return dict(Counter(node['type'] for node in self.nodes()))
+
+    def get_key_counts(self) -> Dict[str, int]:
+        """ Count the nodes annotated with each key (e.g. "radius" or
+        "layer"). Computed on first request and cached; see clear_cache.
+        """
+
+        if "key_counts" not in self._cache:
+            self._cache["key_counts"] = self._key_counts()
+        return self._cache["key_counts"]
+
+    def _key_counts(self):
+        return dict(Counter(itertools.chain.from_iterable(self.nodes())))
+
+    def nodes_have_key(self, key) -> bool:
+        """ Whether every node in this morphology is annotated with some key.
+        True for an empty morphology.
+        """
+
+        return self.get_key_counts().get(key, 0) == len(self)
+
+    def count_roots(self) -> int:
+        """ The number of root (parentless) nodes in this morphology.
+        Computed on first request and cached; see clear_cache.
+        """
+
+        if "num_roots" not in self._cache:
+            self._cache["num_roots"] = self._count_roots()
+        return self._cache["num_roots"]
+
+    def _count_roots(self):
+        return sum(pid is None for pid in self._parent_ids.values())
+
+    def get_positions(self) -> np.ndarray:
+        """ Obtain an (N, 3) array of node positions, ordered as
+        self.nodes(). Unlike get_node_columns, read from the nodes on every
+        call.
+        """
+
+        return np.array(
+            [(node['x'], node['y'], node['z']) for node in self.nodes()],
+            dtype=float
+        ).reshape(-1, 3)
+
+    def set_positions(self, positions, radius_scale=None):
+        """ Overwrite the position of every node, and clear the cache.
+
+        Parameters
+        ----------
+        positions : (N, 3) array-like of new positions, ordered as
+            self.nodes()
+        radius_scale : if provided, multiply each node's radius by this
+            factor
+
+        """
+
+        positions = np.asarray(positions, dtype=float)
+        if positions.shape != (len(self), 3):
+            raise ValueError(
+                f"expected positions of shape {(len(self), 3)}, "
+                f"found {positions.shape}"
+            )
+
+        for node, (x, y, z) in zip(self.nodes(), positions.tolist()):
+            node['x'] = x
+            node['y'] = y
+            node['z'] = z
+            if radius_scale is not None:
+                node['radius'] *= radius_scale
+
+        self.clear_cache()
+
     def validate(self, strict=False):
         """ 
         Validate the neuron morphology in 
@@ -216,12 +363,7 @@ class Morphology(SimpleTree):
             return self.nodes()
 
     def has_type(self, node_type):
-        if node_type not in self.nodes_by_types:
-            self.nodes_by_types[node_type] = self.filter_nodes(lambda node: node['type'] == node_type)
-        if self.nodes_by_types[node_type]:
-            return True
-        else:
-            return False
+        return self.get_type_counts().get(node_type, 0) > 0
 
     def get_non_soma_nodes(self):
         return self.filter_nodes(lambda node: node['type'] != SOMA)
@@ -328,15 +470,35 @@ class Morphology(SimpleTree):
         return compartments
 
     def get_compartment_for_node(self, node, node_types=None):
+        """ Find the compartment (parent, node) ending at a node. This is a
+        constant-time lookup in compartments_for_nodes, which is keyed by the
+        id of each compartment's child node.
 
-        for node_id, compartment in self.compartments_for_nodes.items():
-            if compartment[1] == node:
-                if node_types:
-                    if compartment[0]['type'] in node_types and compartment[1]['type'] in node_types:
-                        return compartment
-                    return None
+        Parameters
+        ----------
+        node : the child node of the requested compartment
+        node_types : if provided, only return the compartment if both of its
+            nodes are of these types
+
+        Returns
+        -------
+        The compartment, as a [parent, node] list, or None if the node is a
+        root (or the compartment is excluded by node_types)
+
+        """
+
+        if not node:
+            return None
+
+        compartment = self.compartments_for_nodes.get(node['id'])
+        if compartment is None:
+            return None
+
+        if node_types:
+            if compartment[0]['type'] in node_types and compartment[1]['type'] in node_types:
                 return compartment
-        return None
+            return None
+        return compartment
 
     def get_compartment_length(self, compartment):
         return self.euclidean_distance(compartment[0], compartment[1])
@@ -426,6 +588,7 @@ class Morphology(SimpleTree):
 
         visit = functools.partial(self._make_and_insert_intermediate, make_intermediates_cb, set_parent_id_cb)
         self.breadth_first_traversal(visit)
+        self.clear_cache()
 
     def _insert_between(self, new_node, parent_id, child_id, set_parent_id_cb):
 
@@ -503,14 +666,15 @@ class Morphology(SimpleTree):
 
         while neighbor_ids:
             current_id = neighbor_ids.popleft()
-            current_node = self.nodes([current_id])[0]
+            current_node = self.node_by_id(current_id)
 
             visit(current_node)
-            visited_ids.update([current_id])
+            visited_ids.add(current_id)
 
-            new_neighbor_ids = neighbor_cb(current_id)
-            new_neighbor_ids = set(new_neighbor_ids) - visited_ids
-            neighbor_ids.extend(new_neighbor_ids)
+            neighbor_ids.extend(
+                nid for nid in neighbor_cb(current_id)
+                if nid not in visited_ids
+            )
 
     def depth_first_traversal(self, visit, neighbor_cb=None, start_id=None):
 
@@ -550,14 +714,15 @@ class Morphology(SimpleTree):
 
         while neighbor_ids:
             current_id = neighbor_ids.pop()
-            current_node = self.nodes([current_id])[0]
+            current_node = self.node_by_id(current_id)
 
             visit(current_node)
-            visited_ids.update([current_id])
+            visited_ids.add(current_id)
 
-            new_neighbor_ids = neighbor_cb(current_id)
-            new_neighbor_ids = set(new_neighbor_ids) - visited_ids
-            neighbor_ids.extend(new_neighbor_ids)
+            neighbor_ids.extend(
+                nid for nid in neighbor_cb(current_id)
+                if nid not in visited_ids
+            )
 
     def swap_nodes_edges(self, merge_cb=None, parent_id_cb=None, make_root_cb=None, start_id=None):
 
@@ -0,0 +1,258 @@
+""" A collection of many morphologies stored as one set of concatenated node
+arrays. Each cell's nodes occupy a contiguous segment of the arrays, so
+per-cell quantities (counts, sums, moments, extents) can be computed for
+every cell at once as segmented reductions rather than one morphology at a
+time. See neuron_morphology.features.batch for features computed this way.
+"""
+
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology.compartment_table import CompartmentTable
+from neuron_morphology.swc_io import read_swc_columns
+
+
+class MorphologyBatch:
+
+    def __init__(
+        self,
+        identifiers: Sequence[Hashable],
+        offsets: np.ndarray,
+        parent_index: np.ndarray,
+        types: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray,
+        radius: np.ndarray
+    ):
+        """ Node data for many morphologies, concatenated.
+
+        Parameters
+        ----------
+        identifiers : a label for each cell
+        offsets : (num_cells + 1,) the nodes of cell i are those from
+            offsets[i] up to (but not including) offsets[i + 1]
+        parent_index : for each node, the (batch-wide) index of its parent,
+            or -1 for roots. Parents are always in the same cell as their
+            children.
+        types : the structure type of each node
+        x, y, z : node positions
+        radius : node radii
+
+        """
+
+        self.identifiers: List[Hashable] = list(identifiers)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.parent_index = np.asarray(parent_index, dtype=np.int64)
+        self.types = np.asarray(types, dtype=np.int64)
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.z = np.asarray(z, dtype=float)
+        self.radius = np.asarray(radius, dtype=float)
+
+        if len(self.offsets) != len(self.identifiers) + 1:
+            raise ValueError(
+                f"expected {len(self.identifiers) + 1} offsets, found "
+                f"{len(self.offsets)}"
+            )
+
+        self.cell = np.repeat(
+            np.arange(self.num_cells), np.diff(self.offsets))
+
+        has_parent = self.parent_index >= 0
+        if np.any(
+            self.cell[self.parent_index[has_parent]] != self.cell[has_parent]
+        ):
+            raise ValueError("nodes must not have parents in other cells")
+
+        self.num_children = np.bincount(
+            self.parent_index[has_parent], minlength=len(self))
+
+        self._cache: Dict[str, Any] = {}
+
+    def __len__(self):
+        return len(self.parent_index)
+
+    @property
+    def num_cells(self) -> int:
+        return len(self.identifiers)
+
+    @classmethod
+    def from_morphologies(
+        cls,
+        morphologies: Sequence[Morphology],
+        identifiers: Optional[Sequence[Hashable]] = None
+    ) -> "MorphologyBatch":
+        """ Concatenate several morphologies into a batch.
+
+        Parameters
+        ----------
+        morphologies : to be concatenated. Nodes are ordered within each cell
+            as morphology.nodes()
+        identifiers : a label for each morphology. Defaults to its position.
+
+        Returns
+        -------
+        A MorphologyBatch
+
+        """
+
+        if identifiers is None:
+            identifiers = list(range(len(morphologies)))
+        elif len(identifiers) != len(morphologies):
+            raise ValueError(
+                f"received {len(identifiers)} identifiers for "
+                f"{len(morphologies)} morphologies"
+            )
+
+        columns = [morphology.get_node_columns() for morphology in morphologies]
+        sizes = [len(column["parent_index"]) for column in columns]
+        offsets = np.zeros(len(columns) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+
+        def concatenate(key, dtype):
+            if not columns:
+                return np.zeros(0, dtype=dtype)
+            return np.concatenate(
+                [np.asarray(column[key], dtype=dtype) for column in columns])
+
+        parent_index = concatenate("parent_index", np.int64)
+        shifted = np.repeat(offsets[:-1], sizes)
+        parent_index = np.where(
+            parent_index >= 0, parent_index + shifted, -1)
+
+        return cls(
+            identifiers=identifiers,
+            offsets=offsets,
+            parent_index=parent_index,
+            types=concatenate("types", np.int64),
+            x=concatenate("x", float),
+            y=concatenate("y", float),
+            z=concatenate("z", float),
+            radius=concatenate("radius", float)
+        )
+
+    @classmethod
+    def from_swc(
+        cls,
+        swc_paths: Sequence[str],
+        identifiers: Optional[Sequence[Hashable]] = None
+    ) -> "MorphologyBatch":
+        """ Read several swc files into a batch, without building
+        per-node objects.
+
+        Parameters
+        ----------
+        swc_paths : the files to read (see swc_io.read_swc_columns)
+        identifiers : a label for each file. Defaults to its path.
+
+        Returns
+        -------
+        A MorphologyBatch
+
+        """
+
+        return cls.from_morphologies(
+            [
+                ArrayMorphology.from_arrays(**read_swc_columns(path))
+                for path in swc_paths
+            ],
+            list(swc_paths) if identifiers is None else identifiers
+        )
+
+    def type_mask(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ Select nodes of the argued types. If node_types is falsy, all
+        nodes are selected.
+        """
+
+        if not node_types:
+            return np.ones(len(self), dtype=bool)
+        return np.isin(self.types, list(node_types))
+
+    def has_type(self, node_type: int) -> np.ndarray:
+        """ For each cell, whether it has any nodes of the argued type
+        """
+
+        return self.count(self.types == node_type) > 0
+
+    def count(self, mask: np.ndarray) -> np.ndarray:
+        """ For each cell, count the selected nodes
+
+        Parameters
+        ----------
+        mask : a boolean mask over nodes
+
+        Returns
+        -------
+        (num_cells,) integer counts
+
+        """
+
+        return np.bincount(self.cell[mask], minlength=self.num_cells)
+
+    def sum(self, values: np.ndarray, cell: Optional[np.ndarray] = None):
+        """ For each cell, sum some values.
+
+        Parameters
+        ----------
+        values : the values to be summed
+        cell : the cell to which each value belongs. Defaults to self.cell
+            (i.e. one value per node)
+
+        Returns
+        -------
+        (num_cells,) sums. Cells without values sum to 0.
+
+        """
+
+        if cell is None:
+            cell = self.cell
+        return np.bincount(
+            cell, weights=values, minlength=self.num_cells).astype(float)
+
+    def positions(self) -> np.ndarray:
+        """ The (N, 3) positions of this batch's nodes
+        """
+
+        return np.stack([self.x, self.y, self.z], axis=1)
+
+    def get_roots(self) -> np.ndarray:
+        """ Find the first root node (in node order) of each cell, as
+        Morphology.get_root does.
+
+        Returns
+        -------
+        (num_cells,) root indices, or -1 for cells without a root
+
+        """
+
+        if "roots" not in self._cache:
+            root_index = np.flatnonzero(self.parent_index < 0)
+            cells, first = np.unique(
+                self.cell[root_index], return_index=True)
+            roots = np.full(self.num_cells, -1, dtype=np.int64)
+            roots[cells] = root_index[first]
+            self._cache["roots"] = roots
+        return self._cache["roots"]
+
+    def get_compartment_table(self) -> CompartmentTable:
+        """ Obtain vectorized compartment geometry for every cell in this
+        batch. The cell of each compartment is self.cell[table.child].
+        """
+
+        if "compartment_table" not in self._cache:
+            self._cache["compartment_table"] = CompartmentTable.from_arrays(
+                parent_index=self.parent_index,
+                types=self.types,
+                x=self.x,
+                y=self.y,
+                z=self.z,
+                radius=self.radius
+            )
+        return self._cache["compartment_table"]
@@ -1,5 +1,12 @@
+import json
+import re
+from typing import Dict
+
+import numpy as np
 import pandas as pd
 from neuron_morphology.morphology import Morphology
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology import binary_io
 
 
 SWC_COLUMNS = ('id', 'type', 'x', 'y', 'z', 'radius', 'parent',)
@@ -20,6 +27,81 @@ def read_swc(path, columns=SWC_COLUMNS, sep=' ', casts=COLUMN_CASTS):
     return df
 
 
+def read_swc_columns(path, columns=SWC_COLUMNS) -> Dict[str, np.ndarray]:
+
+    """ Read an swc file directly into typed numpy column arrays, without
+    going through pandas. Comments (from "#" to the end of a line) are
+    ignored and fields may be separated by any mix of whitespace.
+
+    Parameters
+    ----------
+    path : the swc file to read
+    columns : names of the fields on each line. Those named in COLUMN_CASTS
+        are returned as int64; the rest as float64.
+
+    Returns
+    -------
+    A dictionary mapping each column name to a 1D array with one entry per
+        node
+
+    """
+
+    with open(path, 'r') as swc_file:
+        text = swc_file.read()
+
+    if '#' in text:
+        text = _COMMENT_PATTERN.sub('', text)
+
+    fields_per_line = _count_fields_per_line(text)
+    if np.any((fields_per_line != 0) & (fields_per_line != len(columns))):
+        _raise_for_malformed_line(text, path, len(columns))
+
+    values = np.array(text.split(), dtype=np.float64)
+    values = values.reshape(-1, len(columns))
+
+    return {
+        name: (
+            values[:, ii].astype(np.int64) if name in COLUMN_CASTS
+            else np.ascontiguousarray(values[:, ii])
+        )
+        for ii, name in enumerate(columns)
+    }
+
+
+_COMMENT_PATTERN = re.compile(r'#[^\n]*')
+
+
+def _count_fields_per_line(text):
+    """ Count the whitespace-separated fields on each line of some text,
+    without splitting the lines individually.
+    """
+
+    # space, tab, newline and the other ascii control characters. Any of the
+    # latter which str.split does not treat as whitespace would fail to parse
+    # as a number regardless.
+    characters = np.frombuffer(text.encode(), dtype=np.uint8)
+    is_space = characters <= ord(' ')
+
+    starts_field = ~is_space
+    starts_field[1:] &= is_space[:-1]
+    field_starts = np.flatnonzero(starts_field)
+
+    newlines = np.flatnonzero(characters == ord('\n'))
+    boundaries = np.searchsorted(field_starts, newlines)
+    return np.diff(boundaries, prepend=0, append=len(field_starts))
+
+
+def _raise_for_malformed_line(text, path, num_columns):
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        num_fields = len(line.split())
+        if num_fields not in (0, num_columns):
+            raise ValueError(
+                f"{path}, line {line_number}: expected {num_columns} fields, "
+                f"found {num_fields}"
+            )
+    raise ValueError(f"{path}: could not parse swc")
+
+
 def write_swc(data, path, comments=None, sep=' ', columns=SWC_COLUMNS, casts=COLUMN_CASTS):
 
     """ Write an swc file from a pandas dataframe
@@ -43,7 +125,23 @@ def apply_casts(df, casts):
         df[key] = df[key].astype(typ)
 
 
-def morphology_from_swc(swc_path):
+def morphology_from_swc(swc_path, engine='pandas'):
+    """ Load a morphology from an swc file
+
+    Parameters
+    ----------
+    swc_path : the file to load
+    engine : "pandas" (default) reads via read_swc and builds a Morphology of
+        node dictionaries. "native" reads via read_swc_columns and builds an
+        ArrayMorphology directly from the parsed columns, which is much
+        faster for large files.
+
+    """
+
+    if engine == 'native':
+        return ArrayMorphology.from_arrays(**read_swc_columns(swc_path))
+    elif engine != 'pandas':
+        raise ValueError(f"unrecognized swc engine: {engine}")
 
     swc_data = read_swc(swc_path, sep=' ')
 
@@ -67,3 +165,52 @@ def morphology_to_swc(morphology, swc_path, comments=None):
 
     df = pd.DataFrame(morphology.nodes())
     write_swc(df, swc_path, comments=comments)
+
+
+def swc_to_binary(
+    swc_path,
+    binary_path,
+    units=binary_io.DEFAULT_UNITS,
+    transforms=None
+):
+    """ Convert an swc file to a binary morphology file (see binary_io).
+
+    Parameters
+    ----------
+    swc_path : the swc file to read
+    binary_path : the binary morphology file to write
+    units : the spatial units of the swc's coordinates and radii
+    transforms : json-serializable descriptions of the transforms already
+        applied to this reconstruction, oldest first
+
+    """
+
+    columns = read_swc_columns(swc_path)
+    binary_io.write_binary(
+        ArrayMorphology.from_arrays(**columns),
+        binary_path,
+        units=units,
+        transforms=transforms
+    )
+
+
+def binary_to_swc(binary_path, swc_path, comments=None):
+    """ Convert a binary morphology file (see binary_io) to an swc file. The
+    binary file's units and transforms are recorded as comments.
+
+    Parameters
+    ----------
+    binary_path : the binary morphology file to read
+    swc_path : the swc file to write
+    comments : additional comment lines for the swc's header
+
+    """
+
+    header = binary_io.read_binary_header(binary_path)
+    columns = binary_io.read_binary_columns(binary_path, mode='r')
+
+    comments = list(comments or []) + [
+        f"units: {header['units']}",
+        f"transforms: {json.dumps(header['transforms'])}",
+    ]
+    write_swc(pd.DataFrame(columns), swc_path, comments=comments)
@@ -0,0 +1,276 @@
+""" Precomputed traversal orders for a morphology's trees. Rather than
+walking the tree node by node (as Morphology.breadth_first_traversal does),
+features can express themselves as array operations over these orderings:
+up-sweeps, which reduce values from the leaves towards the roots, and
+down-sweeps, which accumulate values from the roots towards the leaves.
+"""
+
+from typing import Dict, Hashable, Optional, Sequence
+
+import numpy as np
+
+
+class TreeTopology:
+
+    def __init__(
+        self,
+        parent: np.ndarray,
+        preorder: np.ndarray,
+        depth: np.ndarray,
+        subtree_size: np.ndarray,
+        index_of: Optional[Dict[Hashable, int]] = None
+    ):
+        """ The structure of a forest of rooted trees, stored as arrays
+        indexed by node (array) index.
+
+        Parameters
+        ----------
+        parent : for each node, the index of its parent (-1 for roots)
+        preorder : node indices in depth-first preorder. Each node's subtree
+            occupies a contiguous run of this array, beginning with the node.
+        depth : for each node, the number of edges between it and its root
+        subtree_size : for each node, the number of nodes in its subtree
+            (including itself)
+        index_of : maps node ids to indices
+
+        """
+
+        self.parent = parent
+        self.preorder = preorder
+        self.depth = depth
+        self.subtree_size = subtree_size
+        self.index_of = {} if index_of is None else index_of
+
+        self.position = np.empty_like(preorder)
+        self.position[preorder] = np.arange(len(preorder))
+        self.subtree_end = self.position + subtree_size
+
+        # a node finishes after its descendants and after every node
+        # preceding it in preorder, except for its ancestors
+        postorder_position = self.position - depth + subtree_size - 1
+        self.postorder = np.empty_like(preorder)
+        self.postorder[postorder_position] = np.arange(len(preorder))
+
+        self.child_index, self.child_offsets = _child_lists(parent)
+        self.num_children = np.diff(self.child_offsets)
+
+        by_depth = np.argsort(depth, kind="stable")
+        boundaries = np.searchsorted(
+            depth[by_depth], np.arange(depth.max(initial=-1) + 2))
+        self.levels = [
+            by_depth[start: end]
+            for start, end in zip(boundaries[:-1], boundaries[1:])
+        ]
+
+    def __len__(self):
+        return len(self.parent)
+
+    @property
+    def roots(self) -> np.ndarray:
+        """ The indices of root nodes
+        """
+        return np.flatnonzero(self.parent < 0)
+
+    @classmethod
+    def from_parent_index(
+        cls,
+        parent_index: np.ndarray,
+        node_ids: Optional[Sequence[Hashable]] = None
+    ) -> "TreeTopology":
+        """ Compute traversal orders from a parent array
+
+        Parameters
+        ----------
+        parent_index : for each node, the index of its parent (-1 for roots)
+        node_ids : the id of each node. Used to populate index_of
+
+        Returns
+        -------
+        A TreeTopology. Children are visited in index order, as are roots.
+
+        Raises
+        ------
+        ValueError : if some nodes are not reachable from a root (i.e. the
+            parent array contains a cycle)
+
+        """
+
+        parent_index = np.asarray(parent_index, dtype=np.int64)
+        num_nodes = len(parent_index)
+
+        has_parent = parent_index >= 0
+        child_index, child_offsets = _child_lists(parent_index)
+
+        children = child_index.tolist()
+        offsets = child_offsets.tolist()
+        depth = [0] * num_nodes
+        preorder = []
+
+        stack = np.flatnonzero(~has_parent)[::-1].tolist()
+        while stack:
+            current = stack.pop()
+            preorder.append(current)
+            current_depth = depth[current] + 1
+            current_children = children[offsets[current]: offsets[current + 1]]
+            for child in current_children:
+                depth[child] = current_depth
+            stack.extend(reversed(current_children))
+
+        if len(preorder) != num_nodes:
+            raise ValueError(
+                f"{num_nodes - len(preorder)} nodes are not reachable from a "
+                "root. Does this morphology contain a cycle?"
+            )
+
+        parents = parent_index.tolist()
+        subtree_size = [1] * num_nodes
+        for node in reversed(preorder):
+            if parents[node] >= 0:
+                subtree_size[parents[node]] += subtree_size[node]
+
+        return cls(
+            parent=parent_index,
+            preorder=np.array(preorder, dtype=np.int64),
+            depth=np.array(depth, dtype=np.int64),
+            subtree_size=np.array(subtree_size, dtype=np.int64),
+            index_of=None if node_ids is None else {
+                node_id: index for index, node_id in enumerate(node_ids)}
+        )
+
+    def children(self, index: int) -> np.ndarray:
+        """ The indices of a node's children, in index order
+        """
+
+        return self.child_index[
+            self.child_offsets[index]: self.child_offsets[index + 1]]
+
+    def subtree(self, index: int) -> np.ndarray:
+        """ The indices of the argued node and its descendants, in preorder
+        """
+
+        return self.preorder[self.position[index]: self.subtree_end[index]]
+
+    def count_children(self, edge_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """ Count the children of each node.
+
+        Parameters
+        ----------
+        edge_mask : if provided, for each node, whether the edge joining it to
+            its parent should be counted
+
+        Returns
+        -------
+        The number of (selected) children of each node
+
+        """
+
+        if edge_mask is None:
+            return self.num_children
+
+        selected = (self.parent >= 0) & edge_mask
+        return np.bincount(self.parent[selected], minlength=len(self))
+
+    def reachable(
+        self,
+        index: int,
+        edge_mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """ Find the nodes which can be reached by walking from a node
+        towards the leaves.
+
+        Parameters
+        ----------
+        index : start from this node
+        edge_mask : if provided, for each node, whether the edge joining it to
+            its parent may be traversed
+
+        Returns
+        -------
+        The indices of reachable nodes (including the start node), in
+        preorder
+
+        """
+
+        subtree = self.subtree(index)
+        if edge_mask is None:
+            return subtree
+
+        # a blocked edge hides the whole (contiguous) subtree below it
+        start = self.position[index]
+        blocked = subtree[1:][~edge_mask[subtree[1:]]]
+        hidden = np.zeros(len(subtree) + 1, dtype=np.int64)
+        np.add.at(hidden, self.position[blocked] - start, 1)
+        np.add.at(hidden, self.subtree_end[blocked] - start, -1)
+
+        return subtree[np.cumsum(hidden[:-1]) == 0]
+
+    def up_sweep(
+        self,
+        values: np.ndarray,
+        reduce: np.ufunc = np.add
+    ) -> np.ndarray:
+        """ Reduce per-node values over each node's subtree, working from the
+        leaves towards the roots.
+
+        Parameters
+        ----------
+        values : one value per node
+        reduce : a binary ufunc, such as np.add or np.maximum, used to
+            combine a node's value with those of its children
+
+        Returns
+        -------
+        For each node, reduce applied across the values of that node and all
+        of its descendants
+
+        """
+
+        result = np.array(values, copy=True)
+        for level in reversed(self.levels[1:]):
+            reduce.at(result, self.parent[level], result[level])
+        return result
+
+    def down_sweep(
+        self,
+        values: np.ndarray,
+        accumulate: np.ufunc = np.add
+    ) -> np.ndarray:
+        """ Accumulate per-node values along each root->node path, working
+        from the roots towards the leaves.
+
+        Parameters
+        ----------
+        values : one value per node
+        accumulate : a binary ufunc, such as np.add or np.maximum, used to
+            combine a parent's accumulated value with its child's value
+
+        Returns
+        -------
+        For each node, accumulate applied across the values of that node and
+        all of its ancestors
+
+        """
+
+        result = np.array(values, copy=True)
+        for level in self.levels[1:]:
+            result[level] = accumulate(result[self.parent[level]], result[level])
+        return result
+
+
+def _child_lists(parent: np.ndarray):
+    """ Group node indices by parent. Returns child_index and child_offsets
+    such that the children of node i are
+    child_index[child_offsets[i]: child_offsets[i + 1]], in index order.
+    """
+
+    has_parent = parent >= 0
+    child_index = np.flatnonzero(has_parent)
+    child_index = child_index[
+        np.argsort(parent[child_index], kind="stable")]
+
+    child_offsets = np.zeros(len(parent) + 1, dtype=np.int64)
+    np.cumsum(
+        np.bincount(parent[has_parent], minlength=len(parent)),
+        out=child_offsets[1:]
+    )
+    return child_index, child_offsets
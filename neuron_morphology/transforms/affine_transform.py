@@ -166,12 +166,14 @@ class AffineTransform(TransformBase):
                              scale_radius: bool = True,
                              ) -> Morphology:
         """
-            Apply this transform to all nodes in a morphology.
+            Apply this transform to all nodes in a morphology. Node
+            positions are gathered into one array and transformed together.
 
             Parameters
             ----------
             morphology: a Morphology loaded from an swc file
-            clone: make a new object if True
+            clone: make a new object if True. Otherwise the morphology is
+                modified in place, which avoids copying it.
             scale_radius: apply radius scaling if True
 
             Returns
@@ -182,20 +184,15 @@ class AffineTransform(TransformBase):
             morphology = morphology.clone()
 
         if scale_radius:
+            # approximate with uniform scaling in each dimension
             scaling_factor = self._get_scaling_factor()
         else:
-            scaling_factor = 1
-
-        for node in morphology.nodes():
-            coordinates = np.array((node['x'], node['y'], node['z']),
-                                   dtype=float)
-            new_coordinates = self.transform(coordinates)
-            node['x'] = new_coordinates[0]
-            node['y'] = new_coordinates[1]
-            node['z'] = new_coordinates[2]
-            # approximate with uniform scaling in each dimension
-            node['radius'] *= scaling_factor
+            scaling_factor = None
 
+        morphology.set_positions(
+            self.transform(morphology.get_positions()),
+            radius_scale=scaling_factor
+        )
         return morphology
 
 
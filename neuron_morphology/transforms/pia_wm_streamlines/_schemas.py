@@ -4,6 +4,10 @@ from argschema.fields import (
     Nested, String, Int, Float, OutputDir, OutputFile, NumpyArray)
 
 
+# ways of resampling the solution onto a regular grid (see run_streamlines)
+INTERPOLATION_METHODS = ("cubic", "mesh")
+
+
 class PiaWmStreamlineSchema(ArgSchema):
     """Arg Schema for run_pia_wm_streamlines"""
 
@@ -30,6 +34,19 @@ class PiaWmStreamlineSchema(ArgSchema):
     mesh_res = Int(required=False,
                    default=20,
                    description='Resolution for mesh for laplace solver')
+    interpolation_method = String(
+        required=False,
+        default="cubic",
+        validate=lambda val: val in INTERPOLATION_METHODS,
+        description='How to resample the solution onto a regular grid. '
+                    '"cubic" uses scipy.interpolate.griddata. "mesh" '
+                    'interpolates linearly within the triangles of the '
+                    'solver mesh, which is much faster for large slices')
+    grid_spacing = Float(
+        required=False,
+        default=1.0,
+        validate=lambda val: val > 0,
+        description='Spacing of the output grid in microns')
     output_dir = OutputDir(required=True,
                            description='Directory to write xarray results')
 
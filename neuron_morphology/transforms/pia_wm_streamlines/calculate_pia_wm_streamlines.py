@@ -12,8 +12,10 @@ import xarray as xr
 from argschema import ArgSchemaParser
 
 from neuron_morphology.transforms.pia_wm_streamlines._schemas import (
-    PiaWmStreamlineSchema, OutputParameters)
+    PiaWmStreamlineSchema, OutputParameters, INTERPOLATION_METHODS)
 from neuron_morphology.transforms.streamline import generate_laplace_field
+from neuron_morphology.transforms.pia_wm_streamlines.mesh_interpolation \
+    import MeshGridInterpolator
 
 
 def convert_path_str_to_list(path_str: str,
@@ -35,7 +37,44 @@ def run_streamlines(pia_path_str: str,
          soma_path_str: Optional[str] = None,
          mesh_res: int = 20,
          pia_fixed_value: float = 1.0,
-         wm_fixed_value: float = 0.0,):
+         wm_fixed_value: float = 0.0,
+         interpolation_method: str = "cubic",
+         grid_spacing: float = 1.0):
+    """
+        Solve for the pia-wm depth field and resample it, along with its
+        gradient, onto a regular grid
+
+        Parameters
+        ----------
+        pia_path_str: alternating x, y coordinates outlining the pia
+        wm_path_str: alternating x, y coordinates outlining the wm
+        resolution: size of a pixel in the path strings, in microns
+        soma_path_str: alternating x, y coordinates outlining the soma. If
+            provided, the outputs are translated so that the soma is at the
+            origin
+        mesh_res: resolution of the mesh for the laplace solver
+        pia_fixed_value: fixed value boundary condition at the pia
+        wm_fixed_value: fixed value boundary condition at the wm
+        interpolation_method: "cubic" resamples with a cubic
+            scipy.interpolate.griddata, which retriangulates the mesh
+            vertices. "mesh" interpolates linearly within the solver's own
+            mesh triangles (matching the P1 solution), which is much faster
+            on large slices. Grid nodes outside of the mesh are nan.
+        grid_spacing: spacing of the output grid, in microns
+
+        Returns
+        -------
+        depth_field: the value field on the grid
+        gradient_field: the gradient of the value field on the grid
+        translation: applied to the paths to place the soma at the origin
+
+    """
+
+    if interpolation_method not in INTERPOLATION_METHODS:
+        raise ValueError(
+            f"unknown interpolation method: {interpolation_method}. Expected "
+            f"one of {INTERPOLATION_METHODS}"
+        )
 
     pia_path = convert_path_str_to_list(pia_path_str, resolution)
     wm_path = convert_path_str_to_list(wm_path_str, resolution)
@@ -60,18 +99,26 @@ def run_streamlines(pia_path_str: str,
 
     x = [coord[0] for coord in mesh_coords]
     y = [coord[1] for coord in mesh_coords]
-    xx = np.arange(min(x)-1, max(x)+1, 1)
-    yy = np.arange(min(y)-1, max(y)+1, 1)
-
-    grid_x, grid_y = np.meshgrid(xx, yy, indexing='ij')
-    grid_u = griddata((x, y),
-                      np.asarray(mesh_values),
-                      (grid_x, grid_y),
-                      method='cubic')
-    grid_grad_u = griddata((x, y),
-                           np.asarray(mesh_gradients),
-                           (grid_x, grid_y),
-                           method='cubic')
+    xx = np.arange(min(x) - grid_spacing, max(x) + grid_spacing, grid_spacing)
+    yy = np.arange(min(y) - grid_spacing, max(y) + grid_spacing, grid_spacing)
+
+    # resample the value and both gradient components together, so that the
+    # mesh is triangulated (or its triangles searched) only once
+    mesh_fields = np.column_stack(
+        [np.asarray(mesh_values), np.asarray(mesh_gradients)])
+
+    if interpolation_method == "mesh":
+        interpolator = MeshGridInterpolator(mesh_coords, mesh.cells(), xx, yy)
+        grid_fields = interpolator(mesh_fields)
+    else:
+        grid_x, grid_y = np.meshgrid(xx, yy, indexing='ij')
+        grid_fields = griddata((x, y),
+                               mesh_fields,
+                               (grid_x, grid_y),
+                               method='cubic')
+
+    grid_u = grid_fields[:, :, 0]
+    grid_grad_u = grid_fields[:, :, 1:]
 
     depth_field = xr.DataArray(
         data=grid_u,
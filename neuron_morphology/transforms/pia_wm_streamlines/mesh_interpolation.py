@@ -0,0 +1,141 @@
+""" Resample values defined on the vertices of a triangle mesh (e.g. the
+vertex values of a fenics P1 function) onto a regular grid, using the mesh's
+own triangulation. Each grid node is located within a triangle once (using
+matplotlib's trapezoid map search); any number of vertex value arrays can
+then be interpolated at little cost.
+"""
+
+from typing import Sequence
+
+import numpy as np
+import matplotlib.tri as mtri
+
+
+# grid nodes are located and interpolated this many at a time
+DEFAULT_NODES_PER_CHUNK = 1000000
+
+
+class MeshGridInterpolator:
+    """ Piecewise linear interpolation from the vertices of a triangle mesh
+    onto the nodes of a regular grid.
+
+    Parameters
+    ----------
+    vertices : (M, 2) x, y coordinates of the mesh vertices
+    triangles : (T, 3) vertex indices of each mesh triangle
+    xx : increasing x coordinates of the grid
+    yy : increasing y coordinates of the grid
+    nodes_per_chunk : locate this many grid nodes at a time. Bounds the
+        memory used while building.
+
+    Notes
+    -----
+    Grid nodes outside of every triangle (i.e. outside of the meshed domain)
+    are interpolated as nan.
+
+    """
+
+    def __init__(
+            self,
+            vertices: np.ndarray,
+            triangles: np.ndarray,
+            xx: Sequence[float],
+            yy: Sequence[float],
+            nodes_per_chunk: int = DEFAULT_NODES_PER_CHUNK
+    ):
+        self.vertices = np.asarray(vertices, dtype=float)[:, :2]
+        self.triangles = np.asarray(triangles, dtype=np.int64)
+        self.xx = np.asarray(xx, dtype=float)
+        self.yy = np.asarray(yy, dtype=float)
+
+        corners = self.vertices[self.triangles]
+        self.origins = corners[:, 0, :]
+        edges = np.stack([
+            corners[:, 1, :] - self.origins,
+            corners[:, 2, :] - self.origins
+        ], axis=-1)
+
+        # degenerate (zero area) triangles are masked out of the search
+        determinants = np.linalg.det(edges)
+        self.valid = np.abs(determinants) > 0
+        self.inverse_edges = np.zeros_like(edges)
+        self.inverse_edges[self.valid] = np.linalg.inv(edges[self.valid])
+
+        self.node_triangles = self._locate(nodes_per_chunk)
+
+    @property
+    def shape(self):
+        return (len(self.xx), len(self.yy))
+
+    @property
+    def node_count(self):
+        return len(self.xx) * len(self.yy)
+
+    def _locate(self, nodes_per_chunk: int) -> np.ndarray:
+        """ Find, for each grid node, the index of the triangle containing it
+        (or -1).
+        """
+
+        triangulation = mtri.Triangulation(
+            self.vertices[:, 0], self.vertices[:, 1], self.triangles,
+            mask=~self.valid
+        )
+        find_triangle = mtri.TrapezoidMapTriFinder(triangulation)
+
+        node_triangles = np.empty(self.node_count, dtype=np.int64)
+        num_y = len(self.yy)
+
+        for start in range(0, self.node_count, nodes_per_chunk):
+            nodes = np.arange(start, min(start + nodes_per_chunk,
+                                         self.node_count))
+            node_triangles[nodes] = find_triangle(
+                self.xx[nodes // num_y], self.yy[nodes % num_y])
+
+        return node_triangles.reshape(self.shape)
+
+    def __call__(
+            self,
+            vertex_values: np.ndarray,
+            nodes_per_chunk: int = DEFAULT_NODES_PER_CHUNK
+    ) -> np.ndarray:
+        """ Interpolate vertex values onto the grid.
+
+        Parameters
+        ----------
+        vertex_values : (M,) or (M, K) values at each mesh vertex. Pass
+            several quantities as columns to interpolate them together.
+        nodes_per_chunk : interpolate this many grid nodes at a time
+
+        Returns
+        -------
+        (len(xx), len(yy)) or (len(xx), len(yy), K) interpolated values
+
+        """
+
+        vertex_values = np.asarray(vertex_values, dtype=float)
+        columns = vertex_values.reshape(len(vertex_values), -1)
+
+        # values are linear within each triangle: find each triangle's plane
+        corner_values = columns[self.triangles]
+        differences = corner_values[:, 1:, :] - corner_values[:, :1, :]
+        slopes = np.einsum("tij,tik->tjk", self.inverse_edges, differences)
+        intercepts = corner_values[:, 0, :] \
+            - np.einsum("tj,tjk->tk", self.origins, slopes)
+
+        result = np.full(
+            (self.node_triangles.size, columns.shape[1]), np.nan)
+        flat_triangles = self.node_triangles.ravel()
+        num_y = len(self.yy)
+
+        for start in range(0, flat_triangles.size, nodes_per_chunk):
+            nodes = start + np.flatnonzero(
+                flat_triangles[start: start + nodes_per_chunk] >= 0)
+            triangle_ids = flat_triangles[nodes]
+
+            result[nodes] = intercepts[triangle_ids] \
+                + self.xx[nodes // num_y, np.newaxis] \
+                * slopes[triangle_ids, 0] \
+                + self.yy[nodes % num_y, np.newaxis] \
+                * slopes[triangle_ids, 1]
+
+        return result.reshape(self.shape + vertex_values.shape[1:])
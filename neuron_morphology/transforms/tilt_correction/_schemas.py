@@ -1,7 +1,7 @@
 import marshmallow as mm
 from argschema.schemas import ArgSchema, DefaultSchema
 from argschema.fields import (
-    InputFile, List, Float, Int, Nested, Boolean
+    InputFile, OutputFile, List, Float, Int, Nested, Boolean, String
 )
 from neuron_morphology.transforms.affine_transformer._schemas import (
     AffineDictSchema
@@ -54,6 +54,12 @@ class InputParameters(ArgSchema):
         description='path to common cortical framework streamline file',
         required=True
     )
+    ccf_index_path = String(
+        description=('where a spatial index of the ccf streamlines is stored '
+                     '(built on first use). Defaults to alongside ccf_path'),
+        required=False,
+        allow_none=True
+    )
 
     @mm.validates_schema
     def validate_schema_input(self, data):
@@ -73,3 +79,144 @@ class OutputParameters(DefaultSchema):
     tilt_transform_dict = Nested(AffineDictSchema,
                                  required=False,
                                  description='Dictionary defining an affine transform')
+
+
+class CellParameters(DefaultSchema):
+    identifier = String(
+        description='label for this cell in the outputs. Defaults to swc_path',
+        required=False
+    )
+    swc_path = InputFile(
+        description='path to swc file for soma location',
+        required=True
+    )
+    marker_path = InputFile(
+        description='path to reconstruction marker file',
+        required=True
+    )
+    slice_image_flip = Boolean(
+        description=('indicates whether the image was flipped relative '
+                     'to the slice (avg_group_label.name = \'Flip Slice Indicator\''),
+        required=True
+    )
+    ccf_soma_location = List(
+        Float,
+        description='Soma location (x,y,z) coordinates in CCF',
+        required=True
+    )
+    slice_transform_list = List(
+        Float,
+        required=False,
+        description='List defining the transform defining slice cut angle'
+    )
+    slice_transform_dict = Nested(
+        AffineDictSchema,
+        description='Dict defining the transform defining the slice cut angle',
+        required=False
+    )
+
+    @mm.validates_schema
+    def validate_schema_input(self, data):
+        validate_input_affine(data)
+
+
+class BatchInputParameters(ArgSchema):
+    cells = Nested(
+        CellParameters,
+        description='the cells whose tilt corrections will be calculated',
+        many=True,
+        required=True
+    )
+    ccf_path = InputFile(
+        description='path to common cortical framework streamline file',
+        required=True
+    )
+    ccf_index_path = String(
+        description=('where a spatial index of the ccf streamlines is stored '
+                     '(built on first use). Defaults to alongside ccf_path'),
+        required=False,
+        allow_none=True
+    )
+    output_table_path = OutputFile(
+        description=('if provided, write a csv table of tilt corrections '
+                     '(one row per cell) here'),
+        required=False,
+        allow_none=True
+    )
+
+
+class CellTiltCorrection(DefaultSchema):
+    identifier = String(
+        description='label for this cell',
+        required=True
+    )
+    tilt_correction = Float(
+        description='Tilt correction about x axis to align with streamlines (radians)',
+        required=False
+    )
+    tilt_transform_dict = Nested(AffineDictSchema,
+                                 required=False,
+                                 description='Dictionary defining an affine transform')
+    error = String(
+        description='if the cell could not be processed, why not',
+        required=False
+    )
+
+
+class BatchOutputParameters(DefaultSchema):
+    inputs = Nested(
+        BatchInputParameters,
+        description="The parameters argued to this executable",
+        required=True
+    )
+    results = Nested(
+        CellTiltCorrection,
+        description='the tilt correction of each cell',
+        many=True,
+        required=True
+    )
+
+
+class RelayoutInputParameters(ArgSchema):
+    source_path = InputFile(
+        description='path to common cortical framework streamline file',
+        required=True
+    )
+    destination_path = OutputFile(
+        description=('write a copy of the streamline file here, with paths '
+                     'stored in a ragged, chunked and compressed layout'),
+        required=True
+    )
+    paths_per_chunk = Int(
+        description='read this many paths at a time from the source',
+        required=False,
+        default=10000
+    )
+    values_per_chunk = Int(
+        description=('store path voxels in chunks of this size. Smaller '
+                     'chunks make reading a single path cheaper'),
+        required=False,
+        default=4096
+    )
+    compression_level = Int(
+        description='gzip compression level (0-9)',
+        required=False,
+        default=4,
+        validate=lambda val: 0 <= val <= 9
+    )
+
+
+class RelayoutOutputParameters(DefaultSchema):
+    inputs = Nested(
+        RelayoutInputParameters,
+        description="The parameters argued to this executable",
+        required=True
+    )
+    destination_path = String(
+        description='the ragged streamline file was written here',
+        required=True
+    )
+    num_paths = Int(
+        description='the number of paths written',
+        required=True
+    )
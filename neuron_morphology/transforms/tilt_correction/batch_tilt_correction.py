@@ -0,0 +1,164 @@
+""" Calculate tilt corrections for many cells against one CCF streamline
+file. The closest streamlines to every soma are found together (see
+find_closest_paths), rather than opening and searching the streamline file
+once per cell. A cell whose inputs cannot be read, or whose tilt cannot be
+calculated, is reported with an error rather than failing the batch.
+"""
+
+from typing import Any, Dict, List, Optional, Union, IO
+import copy as cp
+import logging
+
+import pandas as pd
+
+from argschema.argschema_parser import ArgSchemaParser
+from neuron_morphology.transforms.tilt_correction._schemas import (
+    BatchInputParameters, BatchOutputParameters)
+from neuron_morphology.transforms.tilt_correction.compute_tilt_correction \
+    import (find_closest_paths, tilt_from_closest_path, ccf_soma_voxel,
+            read_soma_marker, read_slice_transform)
+from neuron_morphology.swc_io import morphology_from_swc
+
+
+def cell_identifier(cell_spec: Dict[str, Any]) -> str:
+    """ Label a cell in the outputs
+    """
+
+    return cell_spec.get("identifier", cell_spec["swc_path"])
+
+
+def record_error(result: Dict[str, Any], message: str, err: Exception):
+    """ Log a failure for one cell and store it on that cell's result
+    """
+
+    logging.warning(f"{message} for {result['identifier']}: {err}")
+    result["error"] = f"{type(err).__name__}: {err}"
+
+
+def load_cell(cell_spec: Dict[str, Any]) -> Dict[str, Any]:
+    """ Read the inputs to run_tilt_correction for one cell.
+
+    Parameters
+    ----------
+    cell_spec : see CellParameters
+
+    Returns
+    -------
+    a dictionary of arguments, as expected by run_tilt_corrections
+
+    """
+
+    return {
+        "morphology": morphology_from_swc(cell_spec["swc_path"]),
+        "soma_marker": read_soma_marker(cell_spec["marker_path"]),
+        "ccf_soma_location": dict(
+            zip(["x", "y", "z"], cell_spec["ccf_soma_location"])),
+        "slice_transform": read_slice_transform(cell_spec),
+        "slice_image_flip": cell_spec["slice_image_flip"],
+    }
+
+
+def run_batch_tilt_correction(
+    cells: List[Dict[str, Any]],
+    ccf_path: Union[str, IO],
+    ccf_index_path: Optional[str] = None,
+    output_table_path: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """ Calculate the tilt correction of each of many cells.
+
+    Parameters
+    ----------
+    cells : each specifies a cell (see CellParameters)
+    ccf_path : the CCF streamline file
+    ccf_index_path : where a spatial index of the streamlines is stored. See
+        find_closest_paths
+    output_table_path : if provided, write a csv table of results here
+
+    Returns
+    -------
+    For each cell, a dictionary with its identifier and either its
+        tilt_correction and tilt_transform_dict or, if its inputs could not
+        be read or its tilt could not be calculated, an error message
+
+    """
+
+    results: List[Dict[str, Any]] = []
+    loaded: List[Dict[str, Any]] = []
+    loaded_results: List[Dict[str, Any]] = []
+
+    for cell_spec in cells:
+        identifier = cell_identifier(cell_spec)
+        result: Dict[str, Any] = {"identifier": identifier}
+        results.append(result)
+
+        try:
+            cell = load_cell(cell_spec)
+            cell["soma_voxel"] = ccf_soma_voxel(cell["ccf_soma_location"])
+        except Exception as err:
+            record_error(result, "unable to read inputs", err)
+            continue
+        loaded.append(cell)
+        loaded_results.append(result)
+
+    if loaded:
+        closest_paths = find_closest_paths(
+            [cell["soma_voxel"] for cell in loaded],
+            ccf_path,
+            index_path=ccf_index_path
+        )
+
+        for cell, result, closest_path in zip(
+                loaded, loaded_results, closest_paths):
+            try:
+                tilt, transform = tilt_from_closest_path(
+                    cell["morphology"],
+                    cell["soma_marker"],
+                    cell["soma_voxel"],
+                    cell["slice_transform"],
+                    cell["slice_image_flip"],
+                    closest_path
+                )
+            except Exception as err:
+                record_error(result, "unable to calculate tilt", err)
+                continue
+            result["tilt_correction"] = float(tilt)
+            result["tilt_transform_dict"] = transform.to_dict()
+
+    if output_table_path is not None:
+        pd.DataFrame([
+            {
+                "identifier": result["identifier"],
+                "tilt_correction": result.get("tilt_correction"),
+                **result.get("tilt_transform_dict", {}),
+                "error": result.get("error"),
+            }
+            for result in results
+        ]).to_csv(output_table_path, index=False)
+
+    return results
+
+
+def main():
+    parser = ArgSchemaParser(
+        schema_type=BatchInputParameters,
+        output_schema_type=BatchOutputParameters
+    )
+
+    args = cp.deepcopy(parser.args)
+    logging.getLogger().setLevel(args.pop("log_level"))
+
+    results = run_batch_tilt_correction(
+        args["cells"],
+        args["ccf_path"],
+        ccf_index_path=args.get("ccf_index_path"),
+        output_table_path=args.get("output_table_path")
+    )
+
+    parser.output({
+        "results": results,
+        "inputs": parser.args
+    })
+
+
+if __name__ == "__main__":
+    main()
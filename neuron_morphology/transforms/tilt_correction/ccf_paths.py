@@ -0,0 +1,222 @@
+""" Read CCF streamline paths (e.g. top_view_paths_10.h5) in either of two
+layouts:
+
+padded : a 2D "paths" dataset with one row per path. Each row lists the
+    path's voxels as flat indices into the CCF volume, padded with zeros.
+ragged : a 1D "path_values" dataset holding every path's (nonzero) voxels
+    end to end, and a "path_offsets" dataset such that path i's voxels are
+    path_values[path_offsets[i]: path_offsets[i + 1]]. The values are stored
+    in small compressed chunks, so that reading one path touches little of
+    the file.
+
+The layout of a file is detected automatically. Use relayout_paths (or run
+this module) to convert a padded file to the ragged layout.
+"""
+
+from typing import Iterator, List, Tuple, Union, IO
+import copy as cp
+import logging
+
+import numpy as np
+import h5py
+
+from argschema.argschema_parser import ArgSchemaParser
+from neuron_morphology.transforms.tilt_correction._schemas import (
+    RelayoutInputParameters, RelayoutOutputParameters)
+
+
+PADDED_PATHS = "paths"
+PATH_VALUES = "path_values"
+PATH_OFFSETS = "path_offsets"
+LAYOUT_ATTRIBUTE = "paths_layout"
+RAGGED = "ragged"
+
+# paths are read from the source this many at a time when converting
+DEFAULT_PATHS_PER_CHUNK = 10000
+
+# values per stored chunk of the ragged layout. Most paths are a few hundred
+# voxels long, so a single path usually lies within one or two chunks.
+DEFAULT_VALUES_PER_CHUNK = 4096
+DEFAULT_OFFSETS_PER_CHUNK = 4096
+
+
+def is_ragged(ccf_data: h5py.File) -> bool:
+    """ Whether a paths file uses the ragged layout
+    """
+
+    return PATH_OFFSETS in ccf_data and PATH_VALUES in ccf_data
+
+
+def count_paths(ccf_data: h5py.File) -> int:
+    """ The number of paths in an (open) paths file
+    """
+
+    if is_ragged(ccf_data):
+        return ccf_data[PATH_OFFSETS].shape[0] - 1
+    return ccf_data[PADDED_PATHS].shape[0]
+
+
+def read_path(ccf_data: h5py.File, path_id: int) -> np.ndarray:
+    """ Read the (nonzero) flat voxel indices of a single path
+    """
+
+    if is_ragged(ccf_data):
+        start, stop = ccf_data[PATH_OFFSETS][path_id: path_id + 2]
+        return ccf_data[PATH_VALUES][start: stop]
+
+    path = ccf_data[PADDED_PATHS][path_id, :]
+    return path[path > 0]
+
+
+def read_paths(
+    ccf_data: h5py.File,
+    start: int,
+    stop: int
+) -> List[np.ndarray]:
+    """ Read the (nonzero) flat voxel indices of each of a contiguous range
+    of paths.
+    """
+
+    if is_ragged(ccf_data):
+        offsets = ccf_data[PATH_OFFSETS][start: stop + 1]
+        values = ccf_data[PATH_VALUES][offsets[0]: offsets[-1]]
+        return np.split(values, offsets[1:-1] - offsets[0])
+
+    return [row[row > 0] for row in ccf_data[PADDED_PATHS][start: stop, :]]
+
+
+def iter_path_voxels(
+    ccf_data: h5py.File,
+    paths_per_chunk: int = DEFAULT_PATHS_PER_CHUNK
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """ Read every path's voxels, a bounded number of paths at a time.
+
+    Parameters
+    ----------
+    ccf_data : an open paths file
+    paths_per_chunk : read this many paths at a time
+
+    Yields
+    ------
+    path_ids : for each voxel, the id of the path on which it lies
+    voxels : (nonzero) flat voxel indices, grouped by path in order
+
+    """
+
+    num_paths = count_paths(ccf_data)
+    for start in range(0, num_paths, paths_per_chunk):
+        stop = min(start + paths_per_chunk, num_paths)
+
+        if is_ragged(ccf_data):
+            offsets = ccf_data[PATH_OFFSETS][start: stop + 1]
+            voxels = ccf_data[PATH_VALUES][offsets[0]: offsets[-1]]
+            path_ids = np.repeat(np.arange(start, stop), np.diff(offsets))
+        else:
+            rows = ccf_data[PADDED_PATHS][start: stop]
+            nonzero = rows > 0
+            path_ids = np.nonzero(nonzero)[0] + start
+            voxels = rows[nonzero]
+
+        yield path_ids, voxels
+
+
+def relayout_paths(
+    source_path: Union[str, IO],
+    destination_path: str,
+    paths_per_chunk: int = DEFAULT_PATHS_PER_CHUNK,
+    values_per_chunk: int = DEFAULT_VALUES_PER_CHUNK,
+    compression: str = "gzip",
+    compression_opts: int = 4
+) -> int:
+    """ Write a copy of a paths file using the ragged layout. Other datasets
+    and groups (e.g. "view lookup") are copied unchanged.
+
+    Parameters
+    ----------
+    source_path : paths file, in either layout
+    destination_path : write the ragged copy here
+    paths_per_chunk : read this many paths at a time from the source
+    values_per_chunk : store voxel values in chunks of this size
+    compression : h5py compression filter for the voxel values and offsets
+    compression_opts : options (e.g. gzip level) for the compression filter
+
+    Returns
+    -------
+    The number of paths written
+
+    """
+
+    with h5py.File(source_path, "r") as source, \
+            h5py.File(destination_path, "w") as destination:
+
+        num_paths = count_paths(source)
+        dtype = source[PATH_VALUES].dtype if is_ragged(source) \
+            else source[PADDED_PATHS].dtype
+
+        values = destination.create_dataset(
+            PATH_VALUES,
+            shape=(0,),
+            maxshape=(None,),
+            dtype=dtype,
+            chunks=(values_per_chunk,),
+            shuffle=True,
+            compression=compression,
+            compression_opts=compression_opts
+        )
+        lengths = np.zeros(num_paths + 1, dtype=np.int64)
+
+        for path_ids, voxels in iter_path_voxels(source, paths_per_chunk):
+            if len(voxels) == 0:
+                continue
+            ids, counts = np.unique(path_ids, return_counts=True)
+            lengths[ids + 1] = counts
+
+            end = values.shape[0]
+            values.resize((end + len(voxels),))
+            values[end:] = voxels
+
+        offsets = np.cumsum(lengths)
+
+        destination.create_dataset(
+            PATH_OFFSETS,
+            data=offsets,
+            chunks=(min(DEFAULT_OFFSETS_PER_CHUNK, len(offsets)),),
+            shuffle=True,
+            compression=compression,
+            compression_opts=compression_opts
+        )
+        destination.attrs[LAYOUT_ATTRIBUTE] = RAGGED
+
+        for name in source:
+            if name not in (PADDED_PATHS, PATH_VALUES, PATH_OFFSETS):
+                source.copy(source[name], destination, name=name)
+
+    return num_paths
+
+
+def main():
+    parser = ArgSchemaParser(
+        schema_type=RelayoutInputParameters,
+        output_schema_type=RelayoutOutputParameters
+    )
+
+    args = cp.deepcopy(parser.args)
+    logging.getLogger().setLevel(args.pop("log_level"))
+
+    num_paths = relayout_paths(
+        args["source_path"],
+        args["destination_path"],
+        paths_per_chunk=args["paths_per_chunk"],
+        values_per_chunk=args["values_per_chunk"],
+        compression_opts=args["compression_level"]
+    )
+
+    parser.output({
+        "destination_path": args["destination_path"],
+        "num_paths": num_paths,
+        "inputs": parser.args
+    })
+
+
+if __name__ == "__main__":
+    main()
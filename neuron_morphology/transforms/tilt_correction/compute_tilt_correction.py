@@ -1,4 +1,4 @@
-from typing import Dict, Optional, List, Any, IO, Union
+from typing import Dict, Optional, List, Any, IO, Union, Sequence, Tuple
 
 import logging
 import copy as cp
@@ -14,6 +14,11 @@ from neuron_morphology.transforms.tilt_correction._schemas import (
 from neuron_morphology.morphology import Morphology
 from neuron_morphology.swc_io import morphology_from_swc
 import neuron_morphology.transforms.affine_transform as aff
+from neuron_morphology.transforms.tilt_correction.ccf_paths import (
+    count_paths, read_path, read_paths, iter_path_voxels,
+    DEFAULT_PATHS_PER_CHUNK)
+from neuron_morphology.transforms.tilt_correction.path_index import (
+    load_or_build_path_index)
 
 
 CCF_SHAPE = (1320, 800, 1140)
@@ -79,35 +84,54 @@ def get_tilt_correction(morphology: Morphology,
 
 def find_closest_path(soma_voxel: List[int],
                       ccf_path: Union[str, IO],
-                      n_sublists: int = 2):
+                      n_sublists: int = 2,
+                      index_path: Optional[str] = None,
+                      use_index: bool = True):
     '''
         Finds closest path to soma_voxel
 
         Parameters
         ----------
         soma_voxel: List containing soma voxel ccf coordinates
-        ccf_path: str, FilePath, or File-like object openable by H5PY
-        n_sublists: will seperate path_ids into n sublists to load in
-                    at a time. Higher values decrease memory usage but
-                    increase processing time. n = 1 uses about 16GB
+        ccf_path: str, FilePath, or File-like object openable by H5PY.
+                  Paths may be padded or ragged (see ccf_paths.py)
+        n_sublists: when not using an index, will seperate path_ids into n
+                    sublists to load in at a time. Higher values decrease
+                    memory usage but increase processing time. n = 1 uses
+                    about 16GB
+        index_path: where a spatial index of the paths (see path_index.py)
+                    is stored. Defaults to alongside ccf_path. The index is
+                    built on first use.
+        use_index: if False, or if ccf_path is file-like and no index_path
+                   is given, scan every path instead of using an index
 
         Returns
         -------
         closest_path: array of voxel coordinates of the closest streamline
     '''
+    if use_index and (index_path is not None or isinstance(ccf_path, str)):
+        index = load_or_build_path_index(ccf_path, CCF_SHAPE, index_path)
+
+        with h5py.File(ccf_path, 'r') as ccf_data:
+            closest_path = read_path(
+                ccf_data, index.closest_path_id(soma_voxel))
+
+        return np.array(np.unravel_index(closest_path, CCF_SHAPE))
+
     soma_voxel = np.reshape(soma_voxel, (3, 1))
 
     closest_path_id = None
     min_distance = np.inf
     with h5py.File(ccf_path, 'r') as ccf_data:
-        path_ids = np.arange(ccf_data['paths'].shape[0])
+        path_ids = np.arange(count_paths(ccf_data))
         sublists = np.array_split(path_ids, n_sublists)
         for sublist in sublists:
-            paths = ccf_data['paths'][sublist, :]
+            if len(sublist) == 0:
+                continue
+            paths = read_paths(ccf_data, sublist[0], sublist[-1] + 1)
             for sublist_idx, path_id in enumerate(sublist):
-                path = paths[sublist_idx, :]
-                path = path[path > 0]
-                if path is None:
+                path = paths[sublist_idx]
+                if len(path) == 0:
                     continue
 
                 voxels = np.array(np.unravel_index(path, CCF_SHAPE))
@@ -121,14 +145,103 @@ def find_closest_path(soma_voxel: List[int],
                     if distance < 1:
                         return voxels
 
-        closest_path = ccf_data['paths'][closest_path_id, :]
+        closest_path = read_path(ccf_data, closest_path_id)
 
-    closest_path = closest_path[closest_path > 0]
     closest_path_coords = np.array(np.unravel_index(closest_path, CCF_SHAPE))
 
     return closest_path_coords
 
 
+def find_closest_paths(soma_voxels: Sequence[Sequence[int]],
+                       ccf_path: Union[str, IO],
+                       index_path: Optional[str] = None,
+                       use_index: bool = True,
+                       paths_per_chunk: int = DEFAULT_PATHS_PER_CHUNK):
+    '''
+        Finds the closest path to each of many soma voxels, opening the
+        paths file once. Each distinct path is read once.
+
+        Parameters
+        ----------
+        soma_voxels: (N, 3) ccf coordinates of soma voxels
+        ccf_path: see find_closest_path
+        index_path: see find_closest_path
+        use_index: if False, or if ccf_path is file-like and no index_path
+                   is given, find all closest paths in a single pass over
+                   the paths (see scan_closest_path_ids)
+        paths_per_chunk: when not using an index, read this many paths at
+                         a time
+
+        Returns
+        -------
+        for each soma voxel, an array of voxel coordinates of the closest
+            streamline
+    '''
+    soma_voxels = np.asarray(soma_voxels, dtype=np.int64).reshape(-1, 3)
+
+    if use_index and (index_path is not None or isinstance(ccf_path, str)):
+        index = load_or_build_path_index(ccf_path, CCF_SHAPE, index_path)
+        path_ids = index.closest_path_ids(soma_voxels)
+    else:
+        with h5py.File(ccf_path, 'r') as ccf_data:
+            path_ids = scan_closest_path_ids(
+                ccf_data, soma_voxels, paths_per_chunk)
+
+    with h5py.File(ccf_path, 'r') as ccf_data:
+        paths = {
+            path_id: np.array(np.unravel_index(
+                read_path(ccf_data, path_id), CCF_SHAPE))
+            for path_id in np.unique(path_ids).tolist()
+        }
+
+    return [paths[path_id] for path_id in path_ids.tolist()]
+
+
+def scan_closest_path_ids(ccf_data: h5py.File,
+                          soma_voxels: np.ndarray,
+                          paths_per_chunk: int = DEFAULT_PATHS_PER_CHUNK):
+    '''
+        Find the closest path to each of many soma voxels in a single pass
+        over the paths. Ties are broken in favor of the lowest path id.
+
+        Parameters
+        ----------
+        ccf_data: an open paths file, in either layout (see ccf_paths.py)
+        soma_voxels: (N, 3) ccf coordinates of soma voxels
+        paths_per_chunk: read this many paths at a time
+
+        Returns
+        -------
+        (N,) array of path ids
+
+        Raises
+        ------
+        ValueError if there are soma voxels but no non-empty paths
+    '''
+    best_distances = np.full(len(soma_voxels), np.inf)
+    best_ids = np.full(len(soma_voxels), -1, dtype=np.int64)
+
+    for path_ids, voxels in iter_path_voxels(ccf_data, paths_per_chunk):
+        if len(voxels) == 0:
+            continue
+
+        coordinates = np.stack(np.unravel_index(voxels, CCF_SHAPE), axis=1)
+        starts = np.flatnonzero(
+            np.concatenate([[True], path_ids[1:] != path_ids[:-1]]))
+
+        for ii, soma_voxel in enumerate(soma_voxels):
+            distances = np.sum((coordinates - soma_voxel) ** 2, axis=1)
+            per_path = np.minimum.reduceat(distances, starts)
+            closest = np.argmin(per_path)
+            if per_path[closest] < best_distances[ii]:
+                best_distances[ii] = per_path[closest]
+                best_ids[ii] = path_ids[starts[closest]]
+
+    if np.any(best_ids < 0):
+        raise ValueError("the paths file contains no non-empty paths")
+    return best_ids
+
+
 def determine_slice_flip(morphology: Morphology,
                          soma_marker: Dict,
                          slice_image_flip: bool):
@@ -169,20 +282,31 @@ def read_soma_marker(marker_path: str):
     return soma_marker[0]
 
 
-def run_tilt_correction(
+def ccf_soma_voxel(ccf_soma_location: Dict) -> Tuple[int, int, int]:
+    """ Find the CCF voxel containing a soma, given its location
+        ({'x': , 'y': , 'z': }) in CCF coordinates
+    """
+    return (int(ccf_soma_location["x"] // CCF_RESOLUTION),
+            int(ccf_soma_location["y"] // CCF_RESOLUTION),
+            int(ccf_soma_location["z"] // CCF_RESOLUTION))
+
+
+def tilt_from_closest_path(
         morphology: Morphology,
         soma_marker: Dict,
-        ccf_soma_location: Dict,
+        soma_voxel: Tuple[int, int, int],
         slice_transform: aff.AffineTransform,
         slice_image_flip: bool,
-        ccf_path: Union[str, IO]):
-
-    soma_voxel = (int(ccf_soma_location["x"] // CCF_RESOLUTION),
-                  int(ccf_soma_location["y"] // CCF_RESOLUTION),
-                  int(ccf_soma_location["z"] // CCF_RESOLUTION))
+        closest_path: np.ndarray):
+    """
+        Calculate the tilt correction of a cell, given the streamline
+        closest to its soma
 
-    closest_path = find_closest_path(soma_voxel,
-                                     ccf_path)
+        Returns
+        -------
+        tilt: tilt angle correction (radians)
+        transform: AffineTransform rotating by the tilt about the x axis
+    """
 
     tilt = get_tilt_correction(morphology,
                                soma_voxel,
@@ -202,6 +326,87 @@ def run_tilt_correction(
     return tilt, transform
 
 
+def run_tilt_correction(
+        morphology: Morphology,
+        soma_marker: Dict,
+        ccf_soma_location: Dict,
+        slice_transform: aff.AffineTransform,
+        slice_image_flip: bool,
+        ccf_path: Union[str, IO],
+        ccf_index_path: Optional[str] = None):
+
+    soma_voxel = ccf_soma_voxel(ccf_soma_location)
+
+    closest_path = find_closest_path(soma_voxel,
+                                     ccf_path,
+                                     index_path=ccf_index_path)
+
+    return tilt_from_closest_path(morphology,
+                                  soma_marker,
+                                  soma_voxel,
+                                  slice_transform,
+                                  slice_image_flip,
+                                  closest_path)
+
+
+def run_tilt_corrections(
+        cells: Sequence[Dict[str, Any]],
+        ccf_path: Union[str, IO],
+        ccf_index_path: Optional[str] = None,
+        use_index: bool = True
+) -> List[Tuple[float, aff.AffineTransform]]:
+    """
+        Calculate the tilt corrections of many cells at once. The closest
+        streamlines to all somas are found together (see
+        find_closest_paths), so that the paths file is opened, and the index
+        loaded, once.
+
+        Parameters
+        ----------
+        cells: each a dictionary of arguments to run_tilt_correction
+               (morphology, soma_marker, ccf_soma_location, slice_transform
+               and slice_image_flip)
+        ccf_path: see find_closest_paths
+        ccf_index_path: see find_closest_paths
+        use_index: see find_closest_paths
+
+        Returns
+        -------
+        For each cell, a (tilt, transform) tuple as run_tilt_correction
+    """
+
+    soma_voxels = [ccf_soma_voxel(cell["ccf_soma_location"])
+                   for cell in cells]
+    closest_paths = find_closest_paths(soma_voxels,
+                                       ccf_path,
+                                       index_path=ccf_index_path,
+                                       use_index=use_index)
+
+    return [
+        tilt_from_closest_path(cell["morphology"],
+                               cell["soma_marker"],
+                               soma_voxel,
+                               cell["slice_transform"],
+                               cell["slice_image_flip"],
+                               closest_path)
+        for cell, soma_voxel, closest_path
+        in zip(cells, soma_voxels, closest_paths)
+    ]
+
+
+def read_slice_transform(args: Dict) -> aff.AffineTransform:
+    """ Build the slice transform from parameters providing either a
+        slice_transform_dict or a slice_transform_list
+    """
+    if 'slice_transform_dict' in args:
+        return aff.AffineTransform.from_dict(args['slice_transform_dict'])
+    elif 'slice_transform_list' in args:
+        return aff.AffineTransform.from_list(args['slice_transform_list'])
+    else:
+        raise ValueError('must provide either an slice_transform_dict '
+                         'or an slice_transform_list')
+
+
 def main():
     parser = ArgSchemaParser(
         schema_type=InputParameters,
@@ -211,15 +416,7 @@ def main():
     args = cp.deepcopy(parser.args)
     logging.getLogger().setLevel(args.pop("log_level"))
 
-    if 'slice_transform_dict' in args:
-        slice_transform = aff.AffineTransform.from_dict(
-            args['slice_transform_dict'])
-    elif 'slice_transform_list' in args:
-        slice_transform = aff.AffineTransform.from_list(
-            args['slice_transform_list'])
-    else:
-        raise ValueError('must provide either an slice_transform_dict '
-                         'or an slice_transform_list')
+    slice_transform = read_slice_transform(args)
 
     morphology = morphology_from_swc(args['swc_path'])
     soma_marker = read_soma_marker(args['marker_path'])
@@ -232,6 +429,7 @@ def main():
         slice_transform,
         args["slice_image_flip"],
         args['ccf_path'],
+        args.get('ccf_index_path'),
     )
     output = {
         'tilt_transform_dict': tilt_transform.to_dict(),
@@ -0,0 +1,354 @@
+""" A spatial index over the voxels of CCF streamline paths (e.g. those in
+top_view_paths_10.h5). Scanning every path for the one closest to a soma
+requires reading the whole paths dataset (many GB). Instead, the index is
+built once and stored next to the paths file. It maps each voxel lying on
+some path to the first such path. Finding the closest path is then a search
+of the voxels near the soma, followed by reading a single row of the paths
+dataset.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple, Union, IO
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import h5py
+
+from neuron_morphology.transforms.tilt_correction.ccf_paths import (
+    count_paths, iter_path_voxels)
+
+
+INDEX_SUFFIX = ".path_index"
+INDEX_VERSION = 1
+
+# paths are read from the h5 file this many rows at a time when building
+DEFAULT_ROWS_PER_CHUNK = 10000
+
+# search cubes of (at most) this half-width around the query voxel before
+# falling back to scanning every indexed voxel
+MAX_SEARCH_RADIUS = 64
+
+
+def default_index_path(ccf_path: str) -> str:
+    """ Where the index for a paths file is stored by default (alongside it)
+    """
+
+    return ccf_path + INDEX_SUFFIX
+
+
+def source_stamp(ccf_path: str) -> Dict[str, int]:
+    """ Identify the state of a paths file, so that indices built from an
+    older version of it can be detected.
+    """
+
+    stat = os.stat(ccf_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class PathIndex:
+
+    def __init__(
+        self,
+        voxels: np.ndarray,
+        path_ids: np.ndarray,
+        shape: Sequence[int],
+        metadata: Optional[Dict] = None
+    ):
+        """ Maps CCF voxels to the paths passing through them.
+
+        Parameters
+        ----------
+        voxels : (N,) sorted, unique flat (raveled) indices of voxels lying on
+            at least one path. May be a memory-mapped array.
+        path_ids : (N,) for each voxel, the lowest id (row in the paths
+            dataset) of the paths through it
+        shape : of the volume into which voxels index
+        metadata : describes the source of this index (see build)
+
+        """
+
+        self.voxels = voxels
+        self.path_ids = path_ids
+        self.shape = tuple(int(size) for size in shape)
+        self.metadata = {} if metadata is None else metadata
+
+    def __len__(self):
+        return len(self.voxels)
+
+    @classmethod
+    def build(
+        cls,
+        ccf_path: Union[str, IO],
+        shape: Sequence[int],
+        rows_per_chunk: int = DEFAULT_ROWS_PER_CHUNK
+    ) -> "PathIndex":
+        """ Index the paths in an h5 file, reading a bounded number of rows
+        at a time.
+
+        Parameters
+        ----------
+        ccf_path : h5 file of paths, in either layout (see ccf_paths.py).
+            Voxels are flat indices into shape.
+        shape : of the CCF volume
+        rows_per_chunk : read this many paths at a time
+
+        Returns
+        -------
+        the index
+
+        """
+
+        voxel_chunks = []
+        path_id_chunks = []
+
+        with h5py.File(ccf_path, "r") as ccf_data:
+            num_paths = count_paths(ccf_data)
+
+            for path_ids, voxels in iter_path_voxels(
+                ccf_data, rows_per_chunk
+            ):
+                # paths are visited in order, so keeping the first
+                # occurrence of each voxel keeps its lowest path id
+                voxels, first = np.unique(
+                    voxels.astype(np.int64), return_index=True)
+                voxel_chunks.append(voxels)
+                path_id_chunks.append(path_ids[first])
+
+        voxels = np.concatenate(voxel_chunks) if voxel_chunks \
+            else np.zeros(0, dtype=np.int64)
+        path_ids = np.concatenate(path_id_chunks) if path_id_chunks \
+            else np.zeros(0, dtype=np.int64)
+
+        order = np.lexsort((path_ids, voxels))
+        voxels = voxels[order]
+        path_ids = path_ids[order]
+        voxels, first = np.unique(voxels, return_index=True)
+
+        metadata = {"version": INDEX_VERSION, "num_paths": int(num_paths)}
+        if isinstance(ccf_path, str):
+            metadata["source"] = source_stamp(ccf_path)
+
+        return cls(voxels, path_ids[first], shape, metadata)
+
+    def save(self, index_path: str):
+        """ Write this index to a directory (replacing any existing index
+        there). Arrays are stored as .npy files, so that they can be memory
+        mapped on load.
+        """
+
+        parent = os.path.dirname(os.path.abspath(index_path))
+        temp_path = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+        try:
+            np.save(os.path.join(temp_path, "voxels.npy"), self.voxels)
+            np.save(os.path.join(temp_path, "path_ids.npy"), self.path_ids)
+            with open(os.path.join(temp_path, "metadata.json"), "w") as file:
+                json.dump(
+                    dict(self.metadata, shape=list(self.shape)), file)
+
+            if os.path.exists(index_path):
+                shutil.rmtree(index_path)
+            os.replace(temp_path, index_path)
+        finally:
+            if os.path.exists(temp_path):
+                shutil.rmtree(temp_path)
+
+    @classmethod
+    def load(cls, index_path: str, mmap_mode: Optional[str] = "r"):
+        """ Read an index written by save. By default, arrays are memory
+        mapped, so that queries read only the pages they touch.
+        """
+
+        with open(os.path.join(index_path, "metadata.json"), "r") as file:
+            metadata = json.load(file)
+
+        return cls(
+            np.load(os.path.join(index_path, "voxels.npy"), mmap_mode=mmap_mode),
+            np.load(
+                os.path.join(index_path, "path_ids.npy"), mmap_mode=mmap_mode),
+            metadata.pop("shape"),
+            metadata
+        )
+
+    def is_current(self, ccf_path: str, shape: Sequence[int]) -> bool:
+        """ Whether this index was built from the current version of a paths
+        file, with the same volume shape.
+        """
+
+        return (
+            self.metadata.get("version") == INDEX_VERSION
+            and self.shape == tuple(shape)
+            and self.metadata.get("source") == source_stamp(ccf_path)
+        )
+
+    def closest_path_id(self, voxel: Sequence[int]) -> Optional[int]:
+        """ Find the path passing closest to a voxel. Ties are broken in
+        favor of the lowest path id.
+
+        Parameters
+        ----------
+        voxel : (x, y, z) coordinates of the query voxel
+
+        Returns
+        -------
+        the id (row in the paths dataset) of the closest path, or None if
+            there are no paths
+
+        """
+
+        voxel = np.asarray(voxel, dtype=np.int64).reshape(3)
+        if len(self) == 0:
+            return None
+
+        radius = 0
+        while radius <= MAX_SEARCH_RADIUS:
+            found = self._search_cube(voxel, radius)
+            if found is not None:
+                # voxels outside of this cube might be closer than the best
+                # within it, but not outside a cube containing that sphere
+                reach = int(np.ceil(np.sqrt(found[0])))
+                if reach > radius:
+                    found = self._search_cube(voxel, reach)
+                return found[1]  # type: ignore[index]
+            radius = max(1, 2 * radius)
+
+        return self._scan(voxel)
+
+    def closest_path_ids(self, voxels: Sequence[Sequence[int]]) -> np.ndarray:
+        """ Find the path passing closest to each of many voxels (see
+        closest_path_id). Repeated voxels are only searched once.
+
+        Parameters
+        ----------
+        voxels : (N, 3) coordinates of the query voxels
+
+        Returns
+        -------
+        (N,) array of path ids
+
+        Raises
+        ------
+        ValueError : if there are no paths
+
+        """
+
+        if len(self) == 0:
+            raise ValueError("unable to find paths in an empty index")
+
+        unique, inverse = np.unique(
+            np.asarray(voxels, dtype=np.int64).reshape(-1, 3),
+            axis=0, return_inverse=True
+        )
+        path_ids = np.array(
+            [self.closest_path_id(voxel) for voxel in unique], dtype=np.int64)
+        return path_ids[inverse.reshape(-1)]
+
+    def _search_cube(
+        self,
+        voxel: np.ndarray,
+        radius: int
+    ) -> Optional[Tuple[int, int]]:
+        """ Find the closest indexed voxel within a cube about the query
+        voxel. Returns its squared distance and path id, or None.
+        """
+
+        ranges = [
+            np.arange(max(center - radius, 0), min(center + radius + 1, size))
+            for center, size in zip(voxel, self.shape)
+        ]
+        if any(len(values) == 0 for values in ranges):
+            return None
+
+        grid = np.meshgrid(*ranges, indexing="ij")
+        candidates = np.ravel_multi_index(
+            [axis.ravel() for axis in grid], self.shape)
+
+        positions = np.searchsorted(self.voxels, candidates)
+        positions[positions == len(self)] = 0
+        hit = np.asarray(self.voxels[positions]) == candidates
+        if not np.any(hit):
+            return None
+
+        coordinates = np.stack([axis.ravel()[hit] for axis in grid], axis=1)
+        return self._closest(
+            coordinates, voxel, np.asarray(self.path_ids[positions[hit]]))
+
+    def _scan(
+        self,
+        voxel: np.ndarray,
+        block_size: int = 2 ** 22
+    ) -> int:
+        """ Find the closest path by checking every indexed voxel
+        """
+
+        logging.info(f"scanning all indexed voxels for the path closest to "
+                     f"{voxel.tolist()}")
+
+        best: Optional[Tuple[int, int]] = None
+        for start in range(0, len(self), block_size):
+            coordinates = np.stack(np.unravel_index(
+                np.asarray(self.voxels[start: start + block_size]),
+                self.shape
+            ), axis=1)
+            found = self._closest(
+                coordinates, voxel,
+                np.asarray(self.path_ids[start: start + block_size])
+            )
+            if best is None or found < best:
+                best = found
+
+        return best[1]  # type: ignore[index]
+
+    @staticmethod
+    def _closest(
+        coordinates: np.ndarray,
+        voxel: np.ndarray,
+        path_ids: np.ndarray
+    ) -> Tuple[int, int]:
+        distances = np.sum((coordinates - voxel) ** 2, axis=1)
+        nearest = distances == distances.min()
+        return int(distances.min()), int(path_ids[nearest].min())
+
+
+def load_or_build_path_index(
+    ccf_path: Union[str, IO],
+    shape: Sequence[int],
+    index_path: Optional[str] = None
+) -> PathIndex:
+    """ Read the index for a paths file, building and storing it if it does
+    not exist or is out of date.
+
+    Parameters
+    ----------
+    ccf_path : h5 file of paths, in either layout (see ccf_paths.py)
+    shape : of the CCF volume
+    index_path : where the index is stored. Defaults to alongside the paths
+        file (see default_index_path), in which case ccf_path must be a
+        path rather than a file-like object.
+
+    Returns
+    -------
+    the index
+
+    """
+
+    if index_path is None:
+        index_path = default_index_path(ccf_path)  # type: ignore[arg-type]
+
+    if os.path.exists(index_path):
+        index = PathIndex.load(index_path)
+        # the staleness of an index built from a file-like object can not be
+        # checked
+        if not isinstance(ccf_path, str) or index.is_current(ccf_path, shape):
+            return index
+        logging.info(f"rebuilding out of date path index: {index_path}")
+
+    index = PathIndex.build(ccf_path, shape)
+    try:
+        index.save(index_path)
+    except OSError as err:
+        logging.warning(f"unable to store path index at {index_path}: {err}")
+
+    return index
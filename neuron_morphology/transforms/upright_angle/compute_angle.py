@@ -1,10 +1,9 @@
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Sequence, Tuple, Union
 
 import logging
 import copy as cp
 
 import numpy as np
-from scipy.interpolate import interp2d
 import xarray as xr
 
 from argschema.argschema_parser import ArgSchemaParser
@@ -15,54 +14,193 @@ from neuron_morphology.swc_io import morphology_from_swc
 import neuron_morphology.transforms.affine_transform as aff
 
 
-def get_upright_angle(gradient: xr.DataArray,
-                      point: Optional[List[float]] = None,
-                      n_win: int = 2) -> float:
+class GradientSampler:
+    """ Bilinearly interpolates a 2D gradient field at arbitrary points.
+    Build one of these per gradient field and reuse it to evaluate many
+    points in a single call.
+
+    Parameters
+    ----------
+    x : increasing x coordinates of the grid
+    y : increasing y coordinates of the grid
+    dx : x component of the gradient, shape (len(x), len(y))
+    dy : y component of the gradient, shape (len(x), len(y))
+
+    Notes
+    -----
+    Each point is interpolated from the 4 grid nodes surrounding it, so nans
+    elsewhere in the field do not affect it. If some of those nodes are nan,
+    the remaining nodes are reweighted. The result is nan only if every node
+    with a nonzero weight is nan - for instance, for a point lying exactly on
+    a nan node. Points outside of the grid take the value at the nearest
+    edge.
 
     """
-        Calculate the upright angle at a position, e.g. soma, given a vector field
+
+    def __init__(
+            self,
+            x: np.ndarray,
+            y: np.ndarray,
+            dx: np.ndarray,
+            dy: np.ndarray
+    ):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.values = np.stack(
+            [np.asarray(dx, dtype=float), np.asarray(dy, dtype=float)],
+            axis=-1
+        )
+
+        expected_shape = (len(self.x), len(self.y), 2)
+        if self.values.shape != expected_shape:
+            raise ValueError(
+                f"expected gradient components of shape {expected_shape[:2]}"
+                f", got {self.values.shape[:2]}"
+            )
+
+    @classmethod
+    def from_dataarray(cls, gradient: xr.DataArray) -> "GradientSampler":
+        """ Build a sampler from a gradient field stored as an xarray with
+        dims (x, y, dim), where dim holds the dx and dy components.
+        """
+
+        gradient = gradient.transpose("x", "y", ...)
+        return cls(
+            gradient.x.values,
+            gradient.y.values,
+            gradient.values[:, :, 0],
+            gradient.values[:, :, 1]
+        )
+
+    @staticmethod
+    def _cell_weights(
+            coords: np.ndarray,
+            queries: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """ Find the lower grid index of each query's cell, along with the
+        fractional position of the query within that cell.
+        """
+
+        if len(coords) == 1:
+            return np.zeros(len(queries), dtype=int), np.zeros(len(queries))
+
+        queries = np.clip(queries, coords[0], coords[-1])
+        lower = np.clip(
+            np.searchsorted(coords, queries, side="right") - 1,
+            0, len(coords) - 2
+        )
+        fraction = (queries - coords[lower]) \
+            / (coords[lower + 1] - coords[lower])
+        return lower, fraction
+
+    def __call__(self, points: Sequence[Sequence[float]]) -> np.ndarray:
+        """ Interpolate the gradient at some points
 
         Parameters
         ----------
-        gradient: xarray of the the vector field
-        point: list [x,y,z] coordinates
-        n_win: number of grid points to define the interpolation window
+        points : (N, 2+) array of coordinates. Only the first two (x, y)
+            columns are used.
 
         Returns
         -------
-        angle
+        (N, 2) array of interpolated (dx, dy)
+
+        """
+
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        xi, xf = self._cell_weights(self.x, points[:, 0])
+        yi, yf = self._cell_weights(self.y, points[:, 1])
+
+        xn = np.minimum(xi + 1, len(self.x) - 1)
+        yn = np.minimum(yi + 1, len(self.y) - 1)
+
+        corners = np.stack([
+            self.values[xi, yi],
+            self.values[xn, yi],
+            self.values[xi, yn],
+            self.values[xn, yn]
+        ])
+        weights = np.stack([
+            (1 - xf) * (1 - yf),
+            xf * (1 - yf),
+            (1 - xf) * yf,
+            xf * yf
+        ])[:, :, np.newaxis] * np.ones_like(corners)
+
+        finite = np.isfinite(corners)
+        weights[~finite] = 0.0
+        total = weights.sum(axis=0)
+
+        # total is 0 (and the result nan) only when every node contributing
+        # to a query is nan
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sampled = np.where(finite, corners, 0.0) * weights
+            return sampled.sum(axis=0) / total
+
+    def upright_angles(
+            self,
+            points: Sequence[Sequence[float]]
+    ) -> np.ndarray:
+        """ Calculate the upright angle at each of some points
+        """
+
+        gradient = self(points)
+        return np.pi / 2 - np.arctan2(gradient[:, 1], gradient[:, 0])
+
+
+def get_upright_angles(
+        gradient: Union[xr.DataArray, GradientSampler],
+        points: Sequence[Sequence[float]]
+) -> np.ndarray:
+    """
+        Calculate the upright angle at each of many positions, given a vector
+        field
+
+        Parameters
+        ----------
+        gradient: xarray of the vector field, or a GradientSampler built
+            from one
+        points: (N, 3) [x,y,z] coordinates
+
+        Returns
+        -------
+        angles, one per point
 
     """
 
-    if not point:
-        point = [0, 0, 0]
+    if not isinstance(gradient, GradientSampler):
+        gradient = GradientSampler.from_dataarray(gradient)
+    return gradient.upright_angles(points)
 
-    x_point, y_point, z_point = point
 
-    nx_idx = np.searchsorted(gradient.x, x_point)
-    ny_idx = np.searchsorted(gradient.y, y_point)
+def get_upright_angle(gradient: Union[xr.DataArray, GradientSampler],
+                      point: Optional[List[float]] = None,
+                      n_win: int = 2) -> float:
 
-    # Only use the  n_win points on each side, because if
-    # the full array has any nans, interp2d will return nan
+    """
+        Calculate the upright angle at a position, e.g. soma, given a vector field
 
-    x_win = gradient.x[nx_idx - n_win:nx_idx + n_win]
-    y_win = gradient.y[ny_idx - n_win:ny_idx + n_win]
+        Parameters
+        ----------
+        gradient: xarray of the the vector field, or a GradientSampler built
+            from one
+        point: list [x,y,z] coordinates
+        n_win: unused. Retained for compatibility; interpolation only ever
+            uses the grid points surrounding the position (see
+            GradientSampler)
 
-    values_win = gradient[
-             nx_idx - n_win:nx_idx + n_win,
-             ny_idx - n_win:ny_idx + n_win,
-             :]
+        Returns
+        -------
+        angle
 
-    # Also transpose because if x=m,y=n, interp2d requires z=(n,m)
-    f_dx = interp2d(x_win, y_win, values_win[:, :, 0].T)
-    f_dy = interp2d(x_win, y_win, values_win[:, :, 1].T)
+    """
 
-    dx = f_dx(x_point, y_point)
-    dy = f_dy(x_point, y_point)
+    if not point:
+        point = [0, 0, 0]
 
-    return np.pi / 2 - np.arctan2(dy[0], dx[0])
+    return float(get_upright_angles(gradient, [point])[0])
 
-def calculate_transform(gradient_field: xr.DataArray,
+def calculate_transform(gradient_field: Union[xr.DataArray, GradientSampler],
          morph: Morphology,
          node: Optional[List[float]] = None,
                       ):
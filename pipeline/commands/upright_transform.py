@@ -107,8 +107,8 @@ def run_upright_transform(token: Optional[str] = None):
     # find the upright direction at the soma location
     outputs = calculate_transform(gradient_field, morphology)
 
-    # apply affine transform
-    upright_morphology = outputs["upright_transform"].transform_morphology(morphology, clone=True)
+    # apply affine transform (the input morphology is not needed afterwards)
+    upright_morphology = outputs["upright_transform"].transform_morphology(morphology)
 
     return put_outputs(
         working_bucket,
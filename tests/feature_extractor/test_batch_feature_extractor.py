@@ -0,0 +1,98 @@
+import unittest
+
+import numpy as np
+
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.morphology_batch import MorphologyBatch
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor.batch_feature_extractor import (
+    BatchFeatureExtractor, validate_mark)
+from neuron_morphology.feature_extractor.mark import (
+    Mark, RequiresAxon, RequiresLayerAnnotations)
+from neuron_morphology.feature_extractor.utilities import unnest
+from neuron_morphology.features import batch as batch_features
+from neuron_morphology.features.default_features import default_features
+
+
+class TestBatchFeatureExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.morphologies = [
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .axon(0, 1, 0)
+                        .axon(0, 2, 1).up()
+                        .axon(1, 1, 0)
+                            .axon(2, 1, 3).up(3)
+                    .basal_dendrite(-1, 0, 0)
+                        .basal_dendrite(-2, 1, 0)
+                .build(),
+            MorphologyBuilder()
+                .root(5, 5, 5)
+                    .basal_dendrite(5, 6, 5)
+                        .basal_dendrite(5, 7, 5).up()
+                        .basal_dendrite(6, 6, 5).up()
+                        .basal_dendrite(4, 7, 6)
+                .build(),
+            MorphologyBuilder()
+                .root(1, 2, 3)
+                .build(),
+        ]
+        self.batch = MorphologyBatch.from_morphologies(
+            self.morphologies, ["a", "b", "c"])
+        self.extractor = BatchFeatureExtractor(
+            batch_features.default_batch_features)
+
+    def test_matches_single_cell(self):
+        names = {feature.name for feature in self.extractor.features}
+        single = FeatureExtractor([
+            feature for feature in FeatureExtractor(default_features).features
+            if feature.name in names
+        ])
+        runs = self.extractor.extract(self.batch)
+
+        for identifier, morphology in zip("abc", self.morphologies):
+            expected = single.extract(Data(morphology)).serialize()
+            obtained = runs[identifier]
+
+            self.assertEqual(
+                set(obtained["selected_features"]),
+                set(expected["selected_features"])
+            )
+
+            expected_results = unnest(expected["results"])
+            obtained_results = unnest(obtained["results"])
+            self.assertEqual(set(obtained_results), set(expected_results))
+            for key, value in expected_results.items():
+                np.testing.assert_allclose(
+                    obtained_results[key], value, err_msg=key)
+
+    def test_required_marks(self):
+        with self.assertRaises(ValueError):
+            self.extractor.extract(self.batch, required_marks={RequiresAxon})
+
+    def test_only_marks(self):
+        runs = self.extractor.extract(
+            self.batch, only_marks={RequiresAxon})
+        self.assertEqual(
+            set(runs["a"]["results"]),
+            {
+                name for name in runs["a"]["selected_features"]
+                if name.startswith("axon.")
+            }
+        )
+        self.assertEqual(runs["b"]["results"], {})
+
+    def test_validate_unsupported_mark(self):
+        with self.assertRaises(ValueError):
+            validate_mark(RequiresLayerAnnotations, self.batch)
+
+    def test_validate_default_mark(self):
+        np.testing.assert_array_equal(
+            validate_mark(Mark.factory("Plain"), self.batch), [True] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,11 @@
 import unittest
+from unittest import mock
+import tracemalloc
 
 from neuron_morphology.feature_extractor.data import Data
 from neuron_morphology.feature_extractor.mark import Mark
 from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.provider import provider
 from neuron_morphology.feature_extractor.feature_extraction_run import \
     FeatureExtractionRun
 from neuron_morphology.morphology_builder import MorphologyBuilder
@@ -74,3 +77,67 @@ class TestFeatureExtractionRun(unittest.TestCase):
 
         self.assertEqual(run.results["foo"], True)
         self.assertEqual(len(run.results), 1)
+
+    def test_extract_shares_providers(self):
+        calls = []
+
+        @provider
+        def shared(data, node_types=None):
+            calls.append(node_types)
+            return len(calls)
+
+        @marked(self.amark)
+        def first(data):
+            return shared(data, node_types=[1])
+
+        @marked(self.amark)
+        def second(data):
+            return shared(data, node_types=[1]) + shared(data)
+
+        run = FeatureExtractionRun(Data(self.morphology, a=2))
+        run.selected_features = [first, second]
+        run.extract()
+
+        self.assertEqual(run.results, {"first": 1, "second": 3})
+        self.assertEqual(calls, [[1], None])
+        self.assertEqual(
+            run.serialize()["intermediate_cache"],
+            {"shared": {"hits": 1, "misses": 2}}
+        )
+        self.assertFalse(hasattr(run.data, "intermediate_cache"))
+
+    def test_extract_profile(self):
+        run = FeatureExtractionRun(Data(self.morphology, a=2, b=3))
+        run.selected_features = [self.foo, self.baz]
+        run.extract(profile=True)
+
+        features = run.profile["features"]
+        self.assertEqual(set(features), {"foo", "baz"})
+        for record in features.values():
+            self.assertGreaterEqual(record["wall_time"], 0)
+            self.assertGreaterEqual(record["cpu_time"], 0)
+            self.assertGreaterEqual(record["peak_memory"], 0)
+
+        self.assertEqual(
+            set(run.profile["marks"]), {self.amark.__name__, self.bmark.__name__})
+        self.assertIn("profile", run.serialize())
+
+    def test_extract_profile_without_reset_peak(self):
+        # tracemalloc.reset_peak is unavailable before Python 3.9
+        with mock.patch.object(tracemalloc, "reset_peak", None):
+            run = FeatureExtractionRun(Data(self.morphology, a=2, b=3))
+            run.selected_features = [self.foo, self.baz]
+            run.extract(profile=True)
+
+        self.assertEqual(set(run.profile["features"]), {"foo", "baz"})
+        for record in run.profile["features"].values():
+            self.assertGreaterEqual(record["peak_memory"], 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_extract_no_profile(self):
+        run = FeatureExtractionRun(Data(self.morphology, a=2))
+        run.selected_features = [self.foo]
+        run.extract()
+
+        self.assertIsNone(run.profile)
+        self.assertNotIn("profile", run.serialize())
@@ -2,9 +2,18 @@ import unittest
 import shutil
 import tempfile
 import os
+import json
 
 import numpy as np
 import pandas as pd
+import h5py
+import pytest
+
+try:
+    import pyarrow
+    import pyarrow.feather
+except ImportError:
+    pyarrow = None
 
 from neuron_morphology.feature_extractor.feature_extraction_run import \
     FeatureExtractionRun
@@ -89,6 +98,118 @@ class TestFeatureWriter(unittest.TestCase):
             check_like=True
         )
 
+    def test_add_failure(self):
+        writer = self.simple_writer()
+        writer.output = self.outputs
+        error = {"type": "ValueError", "message": "bad", "traceback": ""}
+        writer.add_failure("c", error)
+        output = writer.write()
+
+        obt = pd.read_csv(self.table_path)
+        self.assertEqual(set(obt["reconstruction_id"]), {"a", "b"})
+        self.assertEqual(output["c"], {"error": error})
+
+    def profiled_writer(self, profile_path):
+        writer = fw.FeatureWriter(
+            self.heavy_path, profile_path=profile_path)
+        for identifier, wall_time in (("a", 1.0), ("b", 3.0)):
+            record = {
+                "wall_time": wall_time,
+                "cpu_time": wall_time / 2,
+                "peak_memory": int(wall_time * 100)
+            }
+            writer.add_run(identifier, {
+                "results": {"fish": wall_time},
+                "profile": {
+                    "features": {"fish": record},
+                    "marks": {"Geometric": record}
+                }
+            })
+        return writer
+
+    def test_add_run_profile(self):
+        writer = self.profiled_writer(os.path.join(self.tmpdir, "prof.csv"))
+        self.assertNotIn("profile", writer.output["a"])
+        self.assertEqual(writer.profiles["b"]["features"]["fish"]["wall_time"], 3.0)
+
+    def test_build_profile_table(self):
+        writer = self.profiled_writer(os.path.join(self.tmpdir, "prof.csv"))
+        table = writer.build_profile_table()
+
+        row = table.loc[("feature", "fish")]
+        self.assertEqual(row["num_runs"], 2)
+        self.assertEqual(row["wall_time_total"], 4.0)
+        self.assertEqual(row["wall_time_mean"], 2.0)
+        self.assertEqual(row["cpu_time_max"], 1.5)
+        self.assertEqual(row["peak_memory_max"], 300)
+        self.assertIn(("mark", "Geometric"), table.index)
+
+    def test_write_profile_json(self):
+        profile_path = os.path.join(self.tmpdir, "prof.json")
+        writer = self.profiled_writer(profile_path)
+        writer.write_profile()
+
+        with open(profile_path, "r") as profile_file:
+            obt = json.load(profile_file)
+        self.assertEqual(obt["features"]["fish"]["num_runs"], 2)
+        self.assertEqual(obt["marks"]["Geometric"]["wall_time_total"], 4.0)
+
+    def test_bad_profile_extension(self):
+        with self.assertRaises(ValueError):
+            fw.FeatureWriter(
+                self.heavy_path,
+                profile_path=os.path.join(self.tmpdir, "prof.txt")
+            )
+
+
+    @pytest.mark.skipif(pyarrow is None, reason="requires pyarrow")
+    def test_write_parquet(self):
+        table_path = os.path.join(self.tmpdir, "table.parquet")
+        writer = fw.FeatureWriter(self.heavy_path, table_path)
+        writer.output = self.array_outputs()
+        writer.write_table()
+
+        obt = pd.read_parquet(table_path).set_index("reconstruction_id")
+        self.assertEqual(
+            list(obt.columns),
+            ["fish", "mean.0", "mean.1", "mean.2", "name"]
+        )
+        self.assertEqual(obt["fish"].dtype, np.float64)
+        self.assertEqual(obt.loc["b", "mean.1"], 5.0)
+        self.assertTrue(np.isnan(obt.loc["c", "mean.0"]))
+
+        subset = pd.read_parquet(table_path, columns=["mean.2"])
+        self.assertEqual(list(subset["mean.2"])[:2], [3.0, 6.0])
+
+    @pytest.mark.skipif(pyarrow is None, reason="requires pyarrow")
+    def test_write_feather_lists(self):
+        table_path = os.path.join(self.tmpdir, "table.feather")
+        writer = fw.FeatureWriter(
+            self.heavy_path, table_path, array_features_as_lists=True)
+        writer.output = self.array_outputs()
+        writer.write_table()
+
+        obt = pyarrow.feather.read_table(table_path)
+        self.assertEqual(
+            obt.schema.field("mean").type,
+            pyarrow.list_(pyarrow.float64(), 3)
+        )
+        self.assertEqual(obt.column("mean").to_pylist()[1], [4.0, 5.0, 6.0])
+        self.assertIsNone(obt.column("mean").to_pylist()[2])
+
+    def array_outputs(self):
+        return {
+            "a": {"results": {"fish": 1.0, "mean": [1.0, 2.0, 3.0], "name": "x"}},
+            "b": {"results": {"fish": 2.0, "mean": [4.0, 5.0, 6.0], "name": "y"}},
+            "c": {"results": {"fish": 3.0, "name": "z"}},
+        }
+
+    def test_bad_table_extension(self):
+        with self.assertRaises(ValueError):
+            fw.FeatureWriter(
+                self.heavy_path, os.path.join(self.tmpdir, "table.xlsx"))
+
+
 class TestFeatureFormatters(TestFeatureWriter):
 
     def test_add_layer_histogram(self):
@@ -115,3 +236,90 @@ class TestFeatureFormatters(TestFeatureWriter):
 
         self.assertEqual(obtained["interpretation"], "BothPresent")
         self.assertEqual(obtained["result"], 1.0)
+
+
+class TestStreamingFeatureWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.heavy_path = os.path.join(self.tmpdir, "heavy.h5")
+        self.table_path = os.path.join(self.tmpdir, "table.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def streaming_writer(self, **kwargs):
+        return fw.StreamingFeatureWriter(
+            self.heavy_path,
+            self.table_path,
+            fw.DEFAULT_FEATURE_FORMATTERS,
+            **kwargs
+        )
+
+    def read_table(self):
+        return pd.read_csv(self.table_path, index_col="reconstruction_id")
+
+    def test_requires_table(self):
+        with self.assertRaises(ValueError):
+            fw.StreamingFeatureWriter(self.heavy_path, None)
+
+    def test_flush_every(self):
+        writer = self.streaming_writer(flush_every=2)
+        writer.add_run("a", {"results": {"fish": 1}})
+        self.assertFalse(os.path.exists(self.table_path))
+
+        writer.add_run("b", {"results": {"fish": 2}})
+        self.assertEqual(list(self.read_table()["fish"]), [1, 2])
+        self.assertEqual(writer.pending, [])
+
+        writer.add_run("c", {"results": {"fish": 3}})
+        summary = writer.write()
+        self.assertEqual(list(self.read_table()["fish"]), [1, 2, 3])
+        self.assertEqual(summary["num_written"], 3)
+
+    def test_new_columns(self):
+        writer = self.streaming_writer(flush_every=1)
+        writer.add_run("a", {"results": {"fish": 1}})
+        writer.add_run("b", {"results": {"fowl": {"hawk": 2}}})
+        writer.write()
+
+        obt = self.read_table()
+        self.assertEqual(list(obt.columns), ["fish", "fowl.hawk"])
+        self.assertTrue(np.isnan(obt.loc["a", "fowl.hawk"]))
+        self.assertEqual(obt.loc["b", "fowl.hawk"], 2)
+
+    def test_heavy(self):
+        writer = self.streaming_writer(flush_every=1)
+        writer.add_run("a", {"results": {
+            "normalized_depth_histogram": LayerHistogram([1, 2], [0, 1, 2])}})
+        writer.write()
+
+        self.assertEqual(self.read_table().loc["a"].iloc[0], self.heavy_path)
+        with h5py.File(self.heavy_path, "r") as heavy:
+            assert np.allclose(
+                heavy["a/normalized_depth_histogram/counts"][:], [1, 2])
+
+    def test_resume(self):
+        writer = self.streaming_writer(flush_every=1)
+        writer.add_run("a", {"results": {"fish": 1}})
+        writer.write()
+
+        writer = self.streaming_writer(flush_every=1, resume=True)
+        self.assertTrue(writer.has_run("a"))
+        writer.add_run("a", {"results": {"fish": 10}})
+        writer.add_run("b", {"results": {"fish": 2}})
+        summary = writer.write()
+
+        self.assertEqual(list(self.read_table()["fish"]), [1, 2])
+        self.assertEqual(summary["skipped"], ["a"])
+
+    def test_no_resume_overwrites(self):
+        writer = self.streaming_writer(flush_every=1)
+        writer.add_run("a", {"results": {"fish": 1}})
+        writer.write()
+
+        writer = self.streaming_writer(flush_every=1)
+        writer.add_run("b", {"results": {"fish": 2}})
+        writer.write()
+
+        self.assertEqual(list(self.read_table().index), ["b"])
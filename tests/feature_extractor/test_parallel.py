@@ -0,0 +1,144 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import numpy as np
+import pandas as pd
+
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.features.layer.layer_histogram import LayerHistogram
+from neuron_morphology.feature_extractor import parallel
+import neuron_morphology.feature_extractor.__main__ as main
+from tests.feature_extractor.test_main import nodes
+
+
+class TestSharedArrays(unittest.TestCase):
+
+    def test_round_trip(self):
+        value = {
+            "big": np.arange(100, dtype=float),
+            "small": np.arange(3),
+            "nested": [LayerHistogram(np.ones(50), np.zeros(51))],
+            "scalar": 1.0
+        }
+        shared = parallel.share_arrays(value, threshold=400)
+
+        self.assertIsInstance(shared["big"], parallel.SharedArray)
+        self.assertIsInstance(shared["small"], np.ndarray)
+        self.assertIsInstance(shared["nested"][0], LayerHistogram)
+        self.assertIsInstance(
+            shared["nested"][0].bin_edges, parallel.SharedArray)
+
+        obtained = parallel.receive_result(shared)
+        np.testing.assert_array_equal(obtained["big"], value["big"])
+        np.testing.assert_array_equal(
+            obtained["nested"][0].counts, value["nested"][0].counts)
+        self.assertEqual(obtained["scalar"], 1.0)
+
+    def test_receive_frees(self):
+        shared = parallel.share_arrays(np.arange(10.0), threshold=0)
+        parallel.receive_result(shared)
+        with self.assertRaises(FileNotFoundError):
+            parallel.receive_result(shared)
+
+
+class TestExtractInWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        self.swc_path = os.path.join(self.tmpdir, "good.swc")
+        write_swc(pd.DataFrame(nodes()), self.swc_path)
+
+        self.bad_swc_path = os.path.join(self.tmpdir, "bad.swc")
+        with open(self.bad_swc_path, "w") as bad_swc:
+            bad_swc.write("1 1 0 0 0 1 -1\n2 3 0 0 1 1 1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def initialize(self, capture_failures=True):
+        parallel.initialize_worker(
+            "aibs_default", None, None, {},
+            capture_failures=capture_failures
+        )
+
+    def test_extract(self):
+        self.initialize()
+        spec = {"swc_path": self.swc_path, "identifier": "good"}
+        identifier, run = parallel.extract_in_worker(spec)
+
+        self.assertEqual(identifier, "good")
+        self.assertEqual(run["results"]["axon.num_tips"], 1)
+        self.assertIn("swc_path", spec)
+
+    def test_capture_failure(self):
+        self.initialize()
+        identifier, run = parallel.extract_in_worker(
+            {"swc_path": self.bad_swc_path})
+
+        self.assertEqual(identifier, self.bad_swc_path)
+        self.assertEqual(run["error"]["type"], "ZeroDivisionError")
+        self.assertIn("Traceback", run["error"]["traceback"])
+
+    def test_raise_failure(self):
+        self.initialize(capture_failures=False)
+        with self.assertRaises(ZeroDivisionError):
+            parallel.extract_in_worker({"swc_path": self.bad_swc_path})
+
+
+class TestExtractMultipleInPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        self.reconstructions = []
+        for index in range(3):
+            swc_path = os.path.join(self.tmpdir, f"{index}.swc")
+            write_swc(pd.DataFrame(nodes()), swc_path)
+            self.reconstructions.append(
+                {"swc_path": swc_path, "identifier": str(index)})
+
+        bad_swc_path = os.path.join(self.tmpdir, "bad.swc")
+        with open(bad_swc_path, "w") as bad_swc:
+            bad_swc.write("1 1 0 0 0 1 -1\n2 3 0 0 1 1 1\n")
+        self.reconstructions.append(
+            {"swc_path": bad_swc_path, "identifier": "bad"})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def extract(self, name, num_processes):
+        table_path = os.path.join(self.tmpdir, f"{name}.csv")
+        results = main.extract_multiple(
+            self.reconstructions,
+            "aibs_default",
+            os.path.join(self.tmpdir, f"{name}.h5"),
+            num_processes=num_processes,
+            output_table_path=table_path,
+            shared_memory_threshold=0
+        )
+        return results, pd.read_csv(table_path, index_col=0)
+
+    def test_pool_matches_serial(self):
+        serial, serial_table = self.extract("serial", 1)
+        pooled, pooled_table = self.extract("pooled", 2)
+
+        self.assertEqual(set(pooled), {"0", "1", "2", "bad"})
+        self.assertEqual(
+            pooled["bad"]["error"]["type"], "ZeroDivisionError")
+        for identifier in ("0", "1", "2"):
+            self.assertEqual(
+                pooled[identifier]["results"]["axon.num_tips"], 1)
+            self.assertEqual(
+                set(pooled[identifier]["results"]),
+                set(serial[identifier]["results"])
+            )
+
+        pd.testing.assert_frame_equal(
+            pooled_table.sort_index(), serial_table.sort_index())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -225,3 +225,45 @@ class TestMaxPathDistance(PathTestCase):
         self.assertEqual(feature_extraction_run.results["dendrite.max_path_distance"], 4)
         self.assertEqual(feature_extraction_run.results["basal_dendrite.max_path_distance"], 3)
         self.assertEqual(feature_extraction_run.results["apical_dendrite.max_path_distance"], 4)
+
+
+class TestDeepMorphology(unittest.TestCase):
+
+    def setUp(self):
+        # a comb: a long axon with a one-node side branch at each node. Deep
+        # enough to exceed the recursion limit if features recurse per
+        # bifurcation
+        self.depth = 5000
+        nodes = [{
+            "id": 0, "parent_id": -1, "type": SOMA,
+            "x": 0, "y": 0, "z": 0, "radius": 1
+        }]
+        for level in range(1, self.depth + 1):
+            nodes.append({
+                "id": 2 * level - 1, "parent_id": max(2 * level - 3, 0),
+                "type": AXON, "x": 0, "y": 0, "z": level, "radius": 1
+            })
+            nodes.append({
+                "id": 2 * level, "parent_id": 2 * level - 1,
+                "type": AXON, "x": 1, "y": 0, "z": level, "radius": 1
+            })
+
+        self.morphology = Morphology(
+            nodes,
+            node_id_cb=lambda node: node["id"],
+            parent_id_cb=lambda node: node["parent_id"]
+        )
+
+    def test_max_path_distance(self):
+        self.assertAlmostEqual(
+            path.max_path_distance(self.morphology), self.depth + 1)
+
+    def test_early_branch_path(self):
+        self.assertAlmostEqual(
+            path.early_branch_path(self.morphology), 1 / (self.depth + 1))
+
+    def test_mean_contraction(self):
+        self.assertAlmostEqual(
+            path.mean_contraction(self.morphology),
+            (2 * self.depth - 3 + 2 ** 0.5) / (2 * self.depth - 1)
+        )
@@ -0,0 +1,55 @@
+import unittest
+
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.provider import (
+    IntermediateCache, provider, CACHE_ATTRIBUTE)
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+class TestIntermediateCache(unittest.TestCase):
+
+    def test_get(self):
+        cache = IntermediateCache()
+        self.assertEqual(cache.get("a", [1, 2], lambda: 5), 5)
+        self.assertEqual(cache.get("a", [1, 2], lambda: 6), 5)
+        self.assertEqual(cache.get("a", [2], lambda: 7), 7)
+        self.assertEqual(cache.report(), {"a": {"hits": 1, "misses": 2}})
+
+    def test_empty_node_types(self):
+        cache = IntermediateCache()
+        cache.get("a", None, lambda: 5)
+        self.assertEqual(cache.get("a", [], lambda: 6), 5)
+
+
+class TestProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = MorphologyBuilder().root().build()
+        self.calls = 0
+
+        @provider
+        def count(data, node_types=None):
+            self.calls += 1
+            return self.calls
+        self.count = count
+
+    def test_uncached(self):
+        data = Data(self.morphology)
+        self.count(data)
+        self.count(self.morphology)
+        self.assertEqual(self.calls, 2)
+
+    def test_cached(self):
+        data = Data(self.morphology)
+        setattr(data, CACHE_ATTRIBUTE, IntermediateCache())
+        self.assertEqual(self.count(data), 1)
+        self.assertEqual(self.count(data), 1)
+        self.assertEqual(self.count(data, node_types=[3]), 2)
+
+    def test_name(self):
+        self.assertEqual(self.count.__name__, "count")
+        self.assertEqual(self.count.provider_name, "count")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import numpy as np
+import pandas as pd
+
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor.marked_feature import specialize
+from neuron_morphology.feature_extractor.feature_specialization import (
+    NEURITE_SPECIALIZATIONS)
+from neuron_morphology.feature_extractor.result_cache import (
+    ResultCache, fingerprint, hash_file)
+from neuron_morphology.features.layer.reference_layer_depths import \
+    ReferenceLayerDepths
+from neuron_morphology.feature_extractor import parallel
+from tests.feature_extractor.test_main import nodes
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def test_equal_values(self):
+        self.assertEqual(
+            fingerprint({"a": np.arange(3.0), "b": [1, "x"]}),
+            fingerprint({"b": [1, "x"], "a": np.arange(3.0)})
+        )
+
+    def test_array_contents(self):
+        self.assertNotEqual(
+            fingerprint(np.arange(3.0)), fingerprint(np.arange(3)))
+        self.assertNotEqual(
+            fingerprint(np.zeros((2, 3))), fingerprint(np.zeros((3, 2))))
+
+    def test_dataframe(self):
+        df = pd.DataFrame({"a": [1.0, 2.0]}, index=["x", "y"])
+        other = df.copy()
+        self.assertEqual(fingerprint(df), fingerprint(other))
+        other.loc["y", "a"] = 3.0
+        self.assertNotEqual(fingerprint(df), fingerprint(other))
+
+    def test_named_tuple(self):
+        self.assertNotEqual(
+            fingerprint(ReferenceLayerDepths(0, 100)),
+            fingerprint(ReferenceLayerDepths(0, 101))
+        )
+
+    def test_specialization(self):
+        features = specialize(_count_calls, NEURITE_SPECIALIZATIONS)
+        self.assertEqual(
+            len({fingerprint(feature) for feature in features.values()}),
+            len(features)
+        )
+
+
+_calls = []
+
+
+def _count_calls(data, node_types=None):
+    _calls.append(node_types)
+    return len(data.morphology.get_node_by_types(node_types))
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.tmpdir, "cache"))
+        _calls.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+        self.cache.put("abcd", {"a": np.arange(4)})
+        hit, value = self.cache.get("abcd")
+
+        self.assertTrue(hit)
+        np.testing.assert_array_equal(value["a"], np.arange(4))
+
+    def test_miss(self):
+        self.assertEqual(self.cache.get("abcd"), (False, None))
+
+    def test_unreadable(self):
+        self.cache.put("abcd", 1)
+        with open(self.cache.entry_path("abcd"), "wb") as entry:
+            entry.write(b"garbage")
+        self.assertEqual(self.cache.get("abcd"), (False, None))
+
+    def test_evict_least_recently_used(self):
+        for ii, key in enumerate(["aa", "bb", "cc"]):
+            self.cache.put(key, np.zeros(100))
+            os.utime(self.cache.entry_path(key), (ii, ii))
+        entry_size = os.path.getsize(self.cache.entry_path("aa"))
+
+        self.cache.get("aa")
+        removed = self.cache.evict(max_bytes=2 * entry_size)
+
+        self.assertEqual(removed, 1)
+        self.assertFalse(self.cache.get("bb")[0])
+        self.assertTrue(self.cache.get("aa")[0])
+        self.assertTrue(self.cache.get("cc")[0])
+
+    def test_evict_unbounded(self):
+        self.cache.put("aa", 1)
+        self.assertEqual(self.cache.evict(), 0)
+
+    def test_extract(self):
+        morphology = MorphologyBuilder().root().axon().axon().build()
+        extractor = FeatureExtractor(
+            [specialize(_count_calls, NEURITE_SPECIALIZATIONS)])
+        data = Data(morphology, reference_layer_depths=ReferenceLayerDepths(
+            0, 100))
+        data_key = self.cache.data_key("swc", data)
+
+        first = extractor.extract(
+            data, result_cache=self.cache, data_key=data_key).serialize()
+        num_calls = len(_calls)
+        second = extractor.extract(
+            data, result_cache=self.cache, data_key=data_key).serialize()
+
+        self.assertEqual(len(_calls), num_calls)
+        self.assertEqual(first["results"], second["results"])
+        self.assertEqual(second["result_cache"]["misses"], 0)
+        self.assertEqual(second["result_cache"]["hits"], num_calls)
+
+    def test_parameters_change_key(self):
+        morphology = MorphologyBuilder().root().axon().build()
+        first = Data(
+            morphology, reference_layer_depths=ReferenceLayerDepths(0, 100))
+        second = Data(
+            morphology, reference_layer_depths=ReferenceLayerDepths(0, 200))
+
+        self.assertEqual(
+            self.cache.data_key("swc", first),
+            self.cache.data_key("swc", Data(
+                morphology,
+                reference_layer_depths=ReferenceLayerDepths(0, 100)
+            ))
+        )
+        self.assertNotEqual(
+            self.cache.data_key("swc", first),
+            self.cache.data_key("swc", second)
+        )
+        self.assertNotEqual(
+            self.cache.data_key("swc", first),
+            self.cache.data_key("other_swc", first)
+        )
+
+    def test_requires_data_key(self):
+        extractor = FeatureExtractor([_count_calls])
+        data = Data(MorphologyBuilder().root().build())
+        with self.assertRaises(ValueError):
+            extractor.extract(data, result_cache=self.cache)
+
+
+class TestCachedWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.swc_path = os.path.join(self.tmpdir, "good.swc")
+        write_swc(pd.DataFrame(nodes()), self.swc_path)
+        self.cache_path = os.path.join(self.tmpdir, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_extract_in_worker(self):
+        parallel.initialize_worker(
+            "aibs_default", None, None, {},
+            result_cache_path=self.cache_path
+        )
+        spec = {"swc_path": self.swc_path, "identifier": "good"}
+
+        _, first = parallel.extract_in_worker(spec)
+        _, second = parallel.extract_in_worker(spec)
+
+        self.assertEqual(second["result_cache"]["misses"], 0)
+        self.assertEqual(
+            second["result_cache"]["hits"], first["result_cache"]["misses"])
+        self.assertEqual(
+            first["results"]["axon.num_tips"],
+            second["results"]["axon.num_tips"]
+        )
+
+    def test_swc_contents_change_key(self):
+        other_path = os.path.join(self.tmpdir, "other.swc")
+        shutil.copy(self.swc_path, other_path)
+        self.assertEqual(hash_file(self.swc_path), hash_file(other_path))
+
+        with open(other_path, "a") as other:
+            other.write("# a comment\n")
+        self.assertNotEqual(hash_file(self.swc_path), hash_file(other_path))
+
+    def test_swc_contents_change_misses(self):
+        parallel.initialize_worker(
+            "aibs_default", None, None, {},
+            result_cache_path=self.cache_path
+        )
+        spec = {"swc_path": self.swc_path, "identifier": "good"}
+        _, first = parallel.extract_in_worker(spec)
+
+        # same path, different contents
+        moved = pd.DataFrame(nodes())
+        moved["z"] += 10.0
+        write_swc(moved, self.swc_path)
+        _, second = parallel.extract_in_worker(spec)
+
+        self.assertGreater(first["result_cache"]["misses"], 0)
+        self.assertEqual(second["result_cache"]["hits"], 0)
+        self.assertEqual(
+            second["result_cache"]["misses"], first["result_cache"]["misses"])
+
+
+if __name__ == "__main__":
+    unittest.main()
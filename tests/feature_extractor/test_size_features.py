@@ -191,6 +191,17 @@ class TestMeanParentDaughterRatio(unittest.TestCase):
             (1/20 + 20) / 2
         )
 
+    def test_zero_child_radius(self):
+        self.morphology.node_by_id(4)["radius"] = 0
+        self.morphology.clear_cache()
+
+        with self.assertRaises(ZeroDivisionError):
+            size.mean_parent_daughter_ratio(self.morphology)
+        self.assertAlmostEqual(
+            size.mean_parent_daughter_ratio(self.morphology, [SOMA, AXON]),
+            (1/20 + 20) / 2
+        )
+
 
 class TestMaxEuclideanDistance(MorphoSizeTest):
 
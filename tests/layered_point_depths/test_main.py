@@ -1,11 +1,17 @@
-from unittest import TestCase
+import os
+import tempfile
+from unittest import TestCase, mock
 
 import xarray as xr
 import numpy as np
+import pandas as pd
 from shapely.geometry.polygon import Polygon
 from shapely.geometry import LineString
 from scipy.interpolate import RegularGridInterpolator
 
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.features.layer.layered_point_depths import (
+    LayeredPointDepths)
 import neuron_morphology.layered_point_depths.__main__ as lpd
 
 class TestUtilities(TestCase):
@@ -59,6 +65,40 @@ class TestUtilities(TestCase):
             "b"
         )
 
+    def test_containing_layers(self):
+        layers = [
+            {
+                "name": "a",
+                "bounds": Polygon([(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)])
+            },
+            {
+                "name": "b",
+                "bounds":  Polygon([(1, 1), (2, 1), (3, 2), (1, 2), (1, 1)])
+            }
+        ]
+        positions = np.concatenate([
+            np.random.default_rng(0).uniform(-0.5, 3.5, size=(200, 2)),
+            [[0.5, 0], [1.5, 2], [2.5, 1.5], [3, 2], [2.6, 1.5]]
+        ])
+
+        obt = lpd.containing_layers(positions, layers)
+        expected = [lpd.containing_layer(pos, layers) for pos in positions]
+        self.assertEqual(obt, expected)
+
+    def test_containing_layers_overlap(self):
+        layers = [
+            {
+                "name": "a",
+                "bounds": Polygon([(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)])
+            },
+            {
+                "name": "b",
+                "bounds":  Polygon([(1, 1), (2, 1), (2, 2), (1, 2), (1, 1)])
+            }
+        ]
+        with self.assertRaises(ValueError):
+            lpd.containing_layers([(0.5, 0.5), (1, 1)], layers)
+
     def test_tuplize(self):
         arr = np.array([1, 2, 3])
         self.assertEqual(
@@ -166,4 +206,342 @@ class TestUtilities(TestCase):
         assert np.allclose(
             list(layers[0]["bounds"].exterior.coords),
             bounds
-        )
\ No newline at end of file
+        )
+
+    def test_first_intersections(self):
+        segments = np.array([
+            [[0, 2], [4, 2]],
+            [[0, 3], [4, 3]],
+            [[5, 0], [5, 4]]
+        ], dtype=float)
+        starts = np.array(
+            [[1, 0], [1, 4], [0, 0], [3, 1], [6, 1]], dtype=float)
+        ends = np.array(
+            [[1, 4], [1, 0], [1, 1], [7, 1], [6, 4]], dtype=float)
+
+        obt = lpd.first_intersections(
+            starts, ends, segments, max_block_size=4)
+        assert np.allclose(
+            obt, [0.5, 0.25, np.nan, 0.5, np.nan], equal_nan=True)
+
+    def test_first_intersections_collinear(self):
+        segments = np.array([[[2, 0], [6, 0]]], dtype=float)
+        obt = lpd.first_intersections(
+            np.array([[0, 0], [8, 0]], dtype=float),
+            np.array([[4, 0], [10, 0]], dtype=float),
+            segments
+        )
+        assert np.allclose(obt, [0.5, np.nan], equal_nan=True)
+
+    def test_step_from_nodes(self):
+        depth_interp = RegularGridInterpolator(
+            (np.arange(4), np.arange(4)),
+            np.arange(16).reshape((4, 4)),
+            bounds_error=False, fill_value=None
+        )
+        dx_interp = RegularGridInterpolator(
+            (np.arange(4), np.arange(4)),
+            np.ones((4, 4)),
+            bounds_error=False, fill_value=None
+        )
+        dy_interp = RegularGridInterpolator(
+            (np.arange(4), np.arange(4)),
+            np.ones((4, 4)) * 2,
+            bounds_error=False, fill_value=None
+        )
+        surface = LineString([(0, 2), (4, 2)])
+        positions = [(0, 0), (0.5, 1), (1, 0.25), (0, 3)]
+
+        obt = lpd.step_from_nodes(
+            positions, depth_interp, dx_interp, dy_interp, surface, 1.0, 50)
+
+        for pos, depth in zip(positions, obt):
+            expected = lpd.step_from_node(
+                pos, depth_interp, dx_interp, dy_interp, surface, 1.0, 50)
+            if expected is None:
+                self.assertTrue(np.isnan(depth))
+            else:
+                self.assertAlmostEqual(depth, expected)
+
+    def test_get_intersections(self):
+        nodes = [
+            {"x": 0, "y": 0, "id": 100, "type": "foo"},
+            {"x": 1, "y": 0.5, "id": 101, "type": "bar"},
+            {"x": 1, "y": 3, "id": 102, "type": "foo"},
+        ]
+
+        depth_interp = RegularGridInterpolator(
+            (np.arange(4), np.arange(4)),
+            np.arange(16).reshape((4, 4))
+        )
+        dx_interp = RegularGridInterpolator(
+            (np.arange(4), np.arange(4)),
+            np.ones((4, 4))
+        )
+        dy_interp = RegularGridInterpolator(
+            (np.arange(4), np.arange(4)),
+            np.ones((4, 4)) * 2
+        )
+        layers = [
+            {
+                "name": "a",
+                "bounds": Polygon([(0, 0), (0, 2), (4, 2), (4, 0), (0, 0)]),
+                "pia_surface": LineString([(0, 2), (4, 2)]),
+                "wm_surface": LineString([(0, 0), (4, 0)])
+            }
+        ]
+
+        obt = lpd.get_intersections(
+            nodes, depth_interp, dx_interp, dy_interp, layers, 1.0, 1000)
+
+        for node, (_, row) in zip(nodes, obt.iterrows()):
+            expected = lpd.get_node_intersections(
+                node, depth_interp, dx_interp, dy_interp, layers, 1.0, 1000)
+            for key, value in expected.items():
+                if value is None:
+                    self.assertTrue(row[key] is None or np.isnan(row[key]))
+                elif isinstance(value, float):
+                    self.assertAlmostEqual(row[key], value)
+                else:
+                    self.assertEqual(row[key], value)
+
+
+class TestSurfaceDepthGrid(TestCase):
+
+    def setUp(self):
+        self.x = np.arange(5, dtype=float)
+        self.y = np.arange(5, dtype=float)
+        grid_x, grid_y = np.meshgrid(self.x, self.y, indexing="ij")
+
+        self.depth_interp = RegularGridInterpolator(
+            (self.x, self.y), 10 * grid_y,
+            bounds_error=False, fill_value=None
+        )
+        self.dx_interp = RegularGridInterpolator(
+            (self.x, self.y), np.zeros_like(grid_x),
+            bounds_error=False, fill_value=None
+        )
+        self.dy_interp = RegularGridInterpolator(
+            (self.x, self.y), np.ones_like(grid_y),
+            bounds_error=False, fill_value=None
+        )
+        self.layers = [
+            {
+                "name": "a",
+                "bounds": Polygon([(0, 1), (0, 3), (4, 3), (4, 1), (0, 1)]),
+                "pia_surface": LineString([(0, 3), (4, 3)]),
+                "wm_surface": LineString([(0, 1), (4, 1)])
+            }
+        ]
+
+    def test_compute_surface_depth_grid(self):
+        grid = lpd.compute_surface_depth_grid(
+            self.x, self.y, self.depth_interp, self.dx_interp,
+            self.dy_interp, self.layers, 0.1, 1000
+        )
+
+        pia = grid["pia_side_depth"].sel(layer="a").values
+        assert pia.shape == (5, 5)
+        assert np.allclose(pia[:, 1:4], 30)
+        wm = grid["wm_side_depth"].sel(layer="a").values
+        assert np.allclose(wm[:, 1:4], 10)
+
+        obt = lpd.lookup_surface_depths(
+            grid, "a", "pia_surface", [(0.5, 1.5), (3.2, 2.9), (9, 9)])
+        assert np.allclose(obt, [30, 30, np.nan], equal_nan=True)
+
+    def test_get_intersections(self):
+        grid = lpd.compute_surface_depth_grid(
+            self.x, self.y, self.depth_interp, self.dx_interp,
+            self.dy_interp, self.layers, 0.1, 1000
+        )
+        nodes = [
+            {"x": 0.5, "y": 1.5, "id": 0, "type": 3},
+            {"x": 2.25, "y": 2.75, "id": 1, "type": 3},
+            {"x": 2, "y": 4, "id": 2, "type": 3},
+        ]
+
+        expected = lpd.get_intersections(
+            nodes, self.depth_interp, self.dx_interp, self.dy_interp,
+            self.layers, 0.1, 1000
+        )
+        obt = lpd.get_intersections(
+            nodes, self.depth_interp, self.dx_interp, self.dy_interp,
+            self.layers, 0.1, 1000, surface_depth_grid=grid
+        )
+
+        assert np.allclose(
+            obt["local_layer_pia_side_depth"],
+            expected["local_layer_pia_side_depth"],
+            equal_nan=True
+        )
+        assert np.allclose(
+            obt["local_layer_wm_side_depth"],
+            expected["local_layer_wm_side_depth"],
+            equal_nan=True
+        )
+
+    def test_load_surface_depth_grid(self):
+        calls = []
+
+        def compute():
+            calls.append(None)
+            return lpd.compute_surface_depth_grid(
+                self.x, self.y, self.depth_interp, self.dx_interp,
+                self.dy_interp, self.layers, 0.1, 1000
+            )
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "grid.nc")
+
+            first = lpd.load_surface_depth_grid(path, "key", compute)
+            second = lpd.load_surface_depth_grid(path, "key", compute)
+            assert len(calls) == 1
+            assert np.allclose(
+                first["pia_side_depth"], second["pia_side_depth"],
+                equal_nan=True
+            )
+
+            lpd.load_surface_depth_grid(path, "other", compute)
+            assert len(calls) == 2
+
+            # both grids are kept
+            lpd.load_surface_depth_grid(path, "key", compute)
+            lpd.load_surface_depth_grid(path, "other", compute)
+            assert len(calls) == 2
+            assert not [
+                name for name in os.listdir(tmpdir) if name != "grid.nc"]
+
+    def test_surface_depth_grid_key(self):
+        field = xr.DataArray(
+            np.zeros((2, 3)), coords={"x": [0, 1], "y": [0, 1, 2]},
+            dims=("x", "y")
+        )
+
+        key = lpd.surface_depth_grid_key(field, field, self.layers, 1.0, 10)
+        assert key == lpd.surface_depth_grid_key(
+            field.copy(), field, self.layers, 1.0, 10)
+        assert key != lpd.surface_depth_grid_key(
+            field, field, self.layers, -1.0, 10)
+        assert key != lpd.surface_depth_grid_key(
+            field.assign_coords(x=[1, 2]), field, self.layers, 1.0, 10)
+
+
+class TestRunLayeredPointDepths(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        x = np.arange(-5, 6, dtype=float)
+        y = np.arange(-5, 6, dtype=float)
+        grid_x, grid_y = np.meshgrid(x, y, indexing="ij")
+
+        depth_path = os.path.join(self.tmpdir.name, "depth.nc")
+        xr.DataArray(
+            -10 * grid_y, coords={"x": x, "y": y}, dims=("x", "y")
+        ).to_netcdf(depth_path)
+
+        gradient_path = os.path.join(self.tmpdir.name, "gradient.nc")
+        xr.DataArray(
+            np.stack([np.zeros_like(grid_x), -np.ones_like(grid_y)], axis=2),
+            coords={"x": x, "y": y, "dim": ["dx", "dy"]},
+            dims=("x", "y", "dim")
+        ).to_netcdf(gradient_path)
+
+        self.depth = {
+            "gradient_field_path": gradient_path,
+            "depth_field_path": depth_path,
+            "soma_origin": False,
+            "pia_sign": -1
+        }
+        self.layers = [
+            {
+                "name": "upper",
+                "bounds": [[-5, 1], [-5, 5], [5, 5], [5, 1], [-5, 1]],
+                "pia_surface": [[-5, 5], [5, 5]],
+                "wm_surface": [[-5, 1], [5, 1]]
+            },
+            {
+                "name": "lower",
+                "bounds": [[-5, -3], [-5, 1], [5, 1], [5, -3], [-5, -3]],
+                "pia_surface": [[-5, 1], [5, 1]],
+                "wm_surface": [[-5, -3], [5, -3]]
+            }
+        ]
+
+        rng = np.random.default_rng(0)
+        positions = rng.uniform(-4, 4, size=(25, 2))
+        self.swc_path = os.path.join(self.tmpdir.name, "cell.swc")
+        write_swc(pd.DataFrame({
+            "id": np.arange(len(positions)),
+            "type": [1] + [2] * (len(positions) - 1),
+            "x": positions[:, 0],
+            "y": positions[:, 1],
+            "z": np.zeros(len(positions)),
+            "radius": np.ones(len(positions)),
+            "parent": np.arange(len(positions)) - 1
+        }), self.swc_path)
+        self.positions = positions
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_depths(self, output_name, **kwargs):
+        output_path = os.path.join(self.tmpdir.name, output_name)
+        lpd.run_layered_point_depths(
+            self.swc_path, self.depth, self.layers, 0.1, 1000, output_path,
+            **kwargs
+        )
+        return LayeredPointDepths.read(output_path).df
+
+    def test_chunked(self):
+        serial = self.run_depths("serial.csv", num_processes=1)
+        chunked = self.run_depths(
+            "chunked.csv", num_processes=1, chunk_size=4)
+
+        assert serial.shape == (25, 5)
+        pd.testing.assert_frame_equal(serial, chunked)
+
+        upper = serial["layer_name"] == "upper"
+        assert np.allclose(serial.loc[upper, "local_layer_pia_side_depth"], -50)
+        assert np.allclose(serial.loc[upper, "local_layer_wm_side_depth"], -10)
+        assert np.allclose(serial["depth"], -10 * self.positions[:, 1])
+
+    def test_pool(self):
+        serial = self.run_depths("serial.csv", num_processes=1)
+        pooled = self.run_depths("pooled.h5", num_processes=2, chunk_size=4)
+
+        pd.testing.assert_frame_equal(
+            serial.reset_index(drop=True),
+            pooled.reset_index(drop=True),
+            check_dtype=False
+        )
+
+    def test_soma_origin(self):
+        self.depth["soma_origin"] = True
+        obt = self.run_depths("soma_origin.csv")
+        assert np.allclose(
+            obt["depth"], -10 * (self.positions[:, 1] - self.positions[0, 1]))
+
+    def test_surface_depth_grid_soma_positions(self):
+        grid_path = os.path.join(self.tmpdir.name, "grid.nc")
+        nodes = [
+            {"id": ii, "type": 2, "x": x, "y": y}
+            for ii, (x, y) in enumerate(self.positions)
+        ]
+        with mock.patch.object(
+            lpd, "compute_surface_depth_grid",
+            wraps=lpd.compute_surface_depth_grid
+        ) as compute:
+            for soma_position in [(1.0, 0.5), (-0.5, 1.0), (1.0, 0.5)]:
+                state = lpd.setup_depth_state(
+                    self.depth, self.layers, 0.1, 1000, soma_position,
+                    surface_depth_grid_path=grid_path
+                )
+                obt = lpd.get_intersections(nodes, **state)
+
+                state["surface_depth_grid"] = None
+                expected = lpd.get_intersections(nodes, **state)
+                pd.testing.assert_frame_equal(obt, expected, atol=1e-3)
+
+        # one grid for each soma position, cached in the same file
+        assert compute.call_count == 2
@@ -0,0 +1,279 @@
+import unittest
+import copy as cp
+import pickle
+
+import numpy as np
+
+from neuron_morphology.constants import *
+from neuron_morphology.array_morphology import ArrayMorphology, NodeView
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from tests.objects import (test_node,
+                           test_morphology_small,
+                           test_morphology_small_branching,
+                           test_morphology_small_multiple_trees,
+                           test_morphology_large,
+                           )
+
+
+class TestArrayMorphology(unittest.TestCase):
+
+    def setUp(self):
+        self.reference = test_morphology_large()
+        self.morphology = ArrayMorphology.from_morphology(self.reference)
+
+    def test_len(self):
+        self.assertEqual(len(self.reference), len(self.morphology))
+
+    def test_columns(self):
+        self.assertEqual(self.morphology.x.dtype, np.float64)
+        self.assertEqual(self.morphology.radius.dtype, np.float64)
+        self.assertEqual(self.morphology.types.dtype, np.int64)
+        self.assertEqual(self.morphology.parent_index[0], -1)
+        self.assertEqual(self.morphology.parent_index[1], 0)
+
+    def test_nodes(self):
+        self.assertEqual(self.reference.nodes(), self.morphology.nodes())
+        self.assertIsInstance(self.morphology.nodes()[0], NodeView)
+
+    def test_views_are_lazy(self):
+        self.assertTrue(all(view is None for view in self.morphology._views))
+        self.morphology.node_by_id(3)
+        self.assertEqual(
+            sum(view is not None for view in self.morphology._views), 1)
+
+    def test_children_of(self):
+        for node in self.reference.nodes():
+            self.assertEqual(
+                self.reference.children_of(node),
+                self.morphology.children_of(node)
+            )
+
+    def test_parent_of(self):
+        for node in self.reference.nodes():
+            self.assertEqual(
+                self.reference.parent_of(node),
+                self.morphology.parent_of(node)
+            )
+
+    def test_child_ids(self):
+        ids = self.reference.node_ids()
+        self.assertEqual(
+            self.reference.child_ids(ids), self.morphology.child_ids(ids))
+
+    def test_get_node_by_types(self):
+        for node_types in [None, [AXON], [APICAL_DENDRITE, BASAL_DENDRITE]]:
+            self.assertEqual(
+                self.reference.get_node_by_types(node_types),
+                self.morphology.get_node_by_types(node_types)
+            )
+
+    def test_has_type(self):
+        self.assertTrue(self.morphology.has_type(AXON))
+        self.assertFalse(self.morphology.has_type(CUT_DENDRITE))
+
+    def test_summaries(self):
+        self.assertEqual(
+            self.reference.get_type_counts(),
+            self.morphology.get_type_counts()
+        )
+        self.assertEqual(
+            self.reference.get_key_counts(),
+            self.morphology.get_key_counts()
+        )
+        self.assertEqual(
+            self.reference.count_roots(), self.morphology.count_roots())
+
+    def test_key_counts_track_writes(self):
+        self.assertFalse(self.morphology.nodes_have_key("layer"))
+        for node in self.morphology.nodes():
+            node["layer"] = "1"
+        self.assertTrue(self.morphology.nodes_have_key("layer"))
+
+        del self.morphology.node_by_id(1)["layer"]
+        self.assertEqual(
+            self.morphology.get_key_counts()["layer"], len(self.morphology) - 1)
+
+    def test_set_positions(self):
+        columns = self.morphology.get_node_columns()
+        x = columns["x"].copy()
+        positions = self.reference.get_positions() * 2
+
+        self.reference.set_positions(positions, radius_scale=0.5)
+        self.morphology.set_positions(positions, radius_scale=0.5)
+
+        self.assertEqual(self.reference.nodes(), self.morphology.nodes())
+        np.testing.assert_array_equal(columns["x"], x)
+        np.testing.assert_array_equal(
+            self.morphology.get_node_columns()["x"], positions[:, 0])
+
+    def test_get_compartments(self):
+        self.assertEqual(
+            self.reference.compartments, self.morphology.compartments)
+
+        nodes = self.reference.get_node_by_types([AXON])
+        self.assertEqual(
+            self.reference.get_compartments(nodes, [AXON]),
+            self.morphology.get_compartments(nodes, [AXON])
+        )
+
+    def test_get_compartment_for_node(self):
+        node = test_node(id=2, type=BASAL_DENDRITE, x=400, y=600, z=10,
+                         radius=3, parent_node_id=1)
+        self.assertEqual(
+            self.reference.get_compartment_for_node(node),
+            self.morphology.get_compartment_for_node(node)
+        )
+        self.assertIsNone(
+            self.morphology.get_compartment_for_node(node, [AXON]))
+
+    def test_get_segment_list(self):
+        self.assertEqual(
+            self.reference.get_segment_list(),
+            self.morphology.get_segment_list()
+        )
+
+    def test_get_dimensions(self):
+        self.assertEqual(
+            self.reference.get_dimensions([AXON]),
+            self.morphology.get_dimensions([AXON])
+        )
+
+    def test_leaf_and_branching_nodes(self):
+        morphology = ArrayMorphology.from_morphology(
+            test_morphology_small_branching())
+        self.assertEqual(
+            {node["id"] for node in morphology.get_branching_nodes()},
+            {3, 7, 11}
+        )
+        self.assertEqual(
+            test_morphology_small_branching().get_leaf_nodes(),
+            morphology.get_leaf_nodes()
+        )
+
+    def test_multiple_trees(self):
+        reference = test_morphology_small_multiple_trees()
+        morphology = ArrayMorphology.from_morphology(reference)
+
+        self.assertEqual(reference.get_roots(), morphology.get_roots())
+        self.assertEqual(reference.get_tree_list(), morphology.get_tree_list())
+
+    def test_view_writes_through(self):
+        node = self.morphology.node_by_id(2)
+        node["x"] = 12.5
+        node["layer"] = "2/3"
+
+        self.assertEqual(self.morphology.x[1], 12.5)
+        self.assertEqual(self.morphology.node_by_id(2)["layer"], "2/3")
+        self.assertNotIn("layer", self.morphology.node_by_id(3))
+
+    def test_clone(self):
+        clone = self.morphology.clone()
+        clone.node_by_id(2)["x"] = -1
+
+        self.assertEqual(self.morphology.node_by_id(2)["x"], 400)
+        self.assertEqual(clone.node_by_id(2)["x"], -1)
+
+    def test_pickle(self):
+        # the test morphology uses lambda callbacks, which can't be pickled
+        morphology = ArrayMorphology.from_arrays(**{
+            key: self.morphology.columns[key]
+            for key in ("id", "type", "x", "y", "z", "radius", "parent")
+        })
+        obtained = pickle.loads(pickle.dumps(morphology))
+        self.assertEqual(obtained.nodes(), self.morphology.nodes())
+
+        node = pickle.loads(pickle.dumps(self.morphology.node_by_id(2)))
+        self.assertIsInstance(node, dict)
+        self.assertEqual(cp.deepcopy(self.morphology.node_by_id(2)), node)
+
+    def test_build_intermediate_nodes(self):
+        def make_intermediates(child, parent, max_id):
+            if child["type"] != AXON:
+                return []
+            first = {
+                "id": max_id + 1, "type": child["type"], "parent": parent["id"],
+                "x": (child["x"] + parent["x"]) / 2, "y": child["y"],
+                "z": child["z"], "radius": child["radius"]
+            }
+            second = dict(first, id=max_id + 2, parent=max_id + 1)
+            return [first, second]
+
+        def set_parent_id(node, parent_id):
+            node["parent"] = parent_id
+
+        reference = MorphologyBuilder().root(0, 0, 0) \
+            .axon(0, 0, 2) \
+                .axon(0, 0, 4).up() \
+                .axon(0, 2, 2).up(2) \
+            .basal_dendrite(2, 0, 0).build()
+        morphology = ArrayMorphology.from_morphology(reference)
+
+        reference.build_intermediate_nodes(make_intermediates, set_parent_id)
+        morphology.build_intermediate_nodes(make_intermediates, set_parent_id)
+
+        self.assertEqual(len(morphology), len(reference))
+        self.assertEqual(len(morphology), 11)
+        for node in reference.nodes():
+            self.assertEqual(morphology.node_by_id(node["id"]), node)
+            self.assertEqual(
+                morphology.parent_id_cb(morphology.node_by_id(node["id"])),
+                reference.parent_id_cb(node)
+            )
+            self.assertEqual(
+                sorted(morphology.child_ids([node["id"]])[0]),
+                sorted(reference.child_ids([node["id"]])[0])
+            )
+        self.assertEqual(
+            morphology.get_dimensions(), reference.get_dimensions())
+
+    def test_breadth_first_traversal(self):
+        expected = []
+        obtained = []
+        self.reference.breadth_first_traversal(
+            lambda node: expected.append(node["id"]))
+        self.morphology.breadth_first_traversal(
+            lambda node: obtained.append(node["id"]))
+
+        self.assertEqual(expected, obtained)
+
+    def test_from_arrays(self):
+        morphology = ArrayMorphology.from_arrays(
+            id=[1, 2, 3, 4],
+            type=[SOMA, AXON, AXON, BASAL_DENDRITE],
+            x=[0, 1, 2, 3],
+            y=[0, 0, 0, 0],
+            z=[0, 0, 0, 0],
+            radius=[5, 1, 1, 1],
+            parent=[-1, 1, 2, 1],
+        )
+
+        self.assertEqual(morphology.get_root()["id"], 1)
+        self.assertEqual(
+            [node["id"] for node in morphology.children_of(
+                morphology.get_root())],
+            [2, 4]
+        )
+        self.assertEqual(morphology.parent_id_cb(morphology.node_by_id(1)), None)
+        self.assertEqual(morphology.parent_id_cb(morphology.node_by_id(3)), 2)
+
+    def test_arbitrary_callbacks(self):
+        reference = (
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .axon(0, 0, 1)
+                        .axon(0, 0, 2).up(2)
+                    .basal_dendrite(1, 0, 0)
+                .build()
+        )
+        nodes = [
+            {"key": node["id"] + 10, "parent_key": node["parent"] + 10, **node}
+            for node in reference.nodes()
+        ]
+        morphology = ArrayMorphology(
+            nodes,
+            node_id_cb=lambda node: node["key"],
+            parent_id_cb=lambda node: node["parent_key"]
+        )
+
+        self.assertEqual(morphology.get_root()["key"], 10)
+        self.assertEqual(len(morphology.children_of(morphology.get_root())), 2)
@@ -0,0 +1,97 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology import binary_io
+import neuron_morphology.swc_io as swcio
+from tests.objects import test_morphology_large
+
+
+class TestBinaryIO(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "test.nmb")
+        self.morphology = test_morphology_large()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip(self):
+        binary_io.write_binary(self.morphology, self.path)
+        obtained = binary_io.morphology_from_binary(self.path)
+
+        self.assertIsInstance(obtained, ArrayMorphology)
+        self.assertEqual(obtained.nodes(), self.morphology.nodes())
+
+    def test_header(self):
+        transforms = [{"name": "scale", "factor": [1.0, 1.0, 3.0]}]
+        binary_io.write_binary(
+            self.morphology, self.path, units="nanometer",
+            transforms=transforms)
+        header = binary_io.read_binary_header(self.path)
+
+        self.assertEqual(header["schema_version"], binary_io.SCHEMA_VERSION)
+        self.assertEqual(header["units"], "nanometer")
+        self.assertEqual(header["transforms"], transforms)
+        self.assertEqual(header["num_nodes"], len(self.morphology))
+        for spec in header["columns"]:
+            self.assertEqual(spec["offset"] % binary_io.ALIGNMENT, 0)
+
+    def test_columns_are_memory_mapped(self):
+        binary_io.write_binary(self.morphology, self.path)
+        columns = binary_io.read_binary_columns(self.path)
+        self.assertIsInstance(columns["x"], np.memmap)
+
+    def test_copy_on_write(self):
+        binary_io.write_binary(self.morphology, self.path)
+        obtained = binary_io.morphology_from_binary(self.path)
+        obtained.node_by_id(1)["x"] = 1000.0
+
+        reloaded = binary_io.morphology_from_binary(self.path)
+        self.assertEqual(
+            reloaded.node_by_id(1)["x"], self.morphology.node_by_id(1)["x"])
+
+    def test_read_only(self):
+        binary_io.write_binary(self.morphology, self.path)
+        columns = binary_io.read_binary_columns(self.path, mode="r")
+        with self.assertRaises(ValueError):
+            columns["x"][0] = 1.0
+
+    def test_not_binary(self):
+        with open(self.path, "w") as bad_file:
+            bad_file.write("1 1 0 0 0 1 -1\n")
+        with self.assertRaises(ValueError):
+            binary_io.read_binary_header(self.path)
+
+    def test_ragged_column(self):
+        morphology = ArrayMorphology.from_morphology(self.morphology)
+        morphology.node_by_id(1)["layer"] = "2/3"
+        with self.assertRaises(ValueError):
+            binary_io.write_binary(morphology, self.path)
+
+    def test_swc_round_trip(self):
+        data_dir = os.path.join(os.path.dirname(__file__), "data")
+        swc_path = os.path.join(data_dir, "test_swc.swc")
+        out_swc_path = os.path.join(self.test_dir, "out.swc")
+
+        swcio.swc_to_binary(
+            swc_path, self.path, transforms=[{"name": "upright"}])
+        swcio.binary_to_swc(self.path, out_swc_path)
+
+        expected = swcio.read_swc_columns(swc_path)
+        obtained = swcio.read_swc_columns(out_swc_path)
+        for name in swcio.SWC_COLUMNS:
+            np.testing.assert_array_equal(obtained[name], expected[name])
+
+        with open(out_swc_path, "r") as out_swc:
+            self.assertEqual(out_swc.readline(), "# units: micrometer\n")
+            self.assertIn("upright", out_swc.readline())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+import numpy as np
+
+from neuron_morphology.constants import *
+from neuron_morphology.compartment_table import CompartmentTable
+from neuron_morphology.array_morphology import ArrayMorphology
+from tests.objects import (test_morphology_large,
+                           test_morphology_small_multiple_trees,
+                           )
+
+
+class TestCompartmentTable(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = test_morphology_large()
+        self.table = self.morphology.get_compartment_table()
+        self.compartments = {
+            compartment[1]["id"]: compartment
+            for compartment in self.morphology.get_compartments()
+        }
+
+    def child_ids(self, mask=None):
+        child = self.table.child if mask is None else self.table.child[mask]
+        nodes = self.morphology.nodes()
+        return sorted(nodes[index]["id"] for index in child)
+
+    def test_one_per_compartment(self):
+        self.assertEqual(len(self.table), len(self.compartments))
+        self.assertEqual(self.child_ids(), sorted(self.compartments))
+
+    def test_geometry(self):
+        nodes = self.morphology.nodes()
+        for ii, child in enumerate(self.table.child):
+            compartment = self.compartments[nodes[child]["id"]]
+            self.assertAlmostEqual(
+                self.table.length[ii],
+                self.morphology.get_compartment_length(compartment))
+            self.assertAlmostEqual(
+                self.table.surface_area[ii],
+                self.morphology.get_compartment_surface_area(compartment))
+            self.assertAlmostEqual(
+                self.table.volume[ii],
+                self.morphology.get_compartment_volume(compartment))
+            np.testing.assert_allclose(
+                self.table.midpoint[ii],
+                self.morphology.get_compartment_midpoint(compartment))
+
+    def test_type_mask(self):
+        node_types = [BASAL_DENDRITE, SOMA]
+        expected = sorted(
+            compartment[1]["id"]
+            for compartment in self.morphology.get_compartments(
+                self.morphology.get_node_by_types(node_types), node_types)
+        )
+        self.assertEqual(
+            self.child_ids(self.table.type_mask(node_types)), expected)
+
+    def test_type_mask_all(self):
+        self.assertTrue(np.all(self.table.type_mask(None)))
+
+    def test_soma_root_mask(self):
+        root = self.morphology.get_root()
+        self.assertEqual(
+            self.child_ids(self.table.soma_root_mask()),
+            sorted(child["id"] for child in self.morphology.children_of(root))
+        )
+
+    def test_multiple_trees(self):
+        morphology = test_morphology_small_multiple_trees()
+        table = morphology.get_compartment_table()
+        self.assertEqual(len(table), len(morphology.get_compartments()))
+
+    def test_cached(self):
+        self.assertIs(self.table, self.morphology.get_compartment_table())
+
+    def test_clear_cache(self):
+        self.morphology.clear_cache()
+        self.assertIsNot(self.table, self.morphology.get_compartment_table())
+
+    def test_array_morphology(self):
+        morphology = ArrayMorphology.from_morphology(self.morphology)
+        table = morphology.get_compartment_table()
+        np.testing.assert_allclose(table.length, self.table.length)
+        np.testing.assert_allclose(table.volume, self.table.volume)
+
+    def test_array_morphology_write_invalidates(self):
+        morphology = ArrayMorphology.from_morphology(self.morphology)
+        table = morphology.get_compartment_table()
+        morphology.nodes()[1]["x"] += 10.0
+        self.assertIsNot(table, morphology.get_compartment_table())
+
+
+if __name__ == "__main__":
+    unittest.main()
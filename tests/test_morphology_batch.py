@@ -0,0 +1,108 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from neuron_morphology.morphology_batch import MorphologyBatch
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.constants import AXON, BASAL_DENDRITE
+
+
+class TestMorphologyBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.first = (
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .axon(0, 1, 0)
+                        .axon(0, 2, 0).up()
+                        .axon(1, 1, 0)
+                .build()
+        )
+        self.second = (
+            MorphologyBuilder()
+                .root(5, 5, 5)
+                    .basal_dendrite(5, 6, 5)
+                .build()
+        )
+        self.batch = MorphologyBatch.from_morphologies(
+            [self.first, self.second], ["first", "second"])
+
+    def test_offsets(self):
+        np.testing.assert_array_equal(self.batch.offsets, [0, 4, 6])
+        np.testing.assert_array_equal(self.batch.cell, [0, 0, 0, 0, 1, 1])
+
+    def test_parent_index(self):
+        np.testing.assert_array_equal(
+            self.batch.parent_index, [-1, 0, 1, 1, -1, 4])
+
+    def test_has_type(self):
+        np.testing.assert_array_equal(
+            self.batch.has_type(AXON), [True, False])
+        np.testing.assert_array_equal(
+            self.batch.has_type(BASAL_DENDRITE), [False, True])
+
+    def test_count(self):
+        np.testing.assert_array_equal(
+            self.batch.count(self.batch.num_children == 0), [2, 1])
+
+    def test_sum(self):
+        np.testing.assert_allclose(self.batch.sum(self.batch.x), [1, 10])
+
+    def test_get_roots(self):
+        np.testing.assert_array_equal(self.batch.get_roots(), [0, 4])
+
+    def test_get_roots_multiple(self):
+        # the first cell has several roots and the second has no nodes
+        batch = MorphologyBatch(
+            ["a", "b", "c"], [0, 4, 4, 6], [1, -1, -1, 2, -1, 4],
+            [1, 2, 2, 2, 1, 3], np.zeros(6), np.zeros(6), np.zeros(6),
+            np.ones(6)
+        )
+        np.testing.assert_array_equal(batch.get_roots(), [1, -1, 4])
+
+    def test_compartment_table(self):
+        table = self.batch.get_compartment_table()
+        np.testing.assert_array_equal(
+            self.batch.cell[table.child], [0, 0, 0, 1])
+
+    def test_bad_offsets(self):
+        with self.assertRaises(ValueError):
+            MorphologyBatch(
+                ["a"], [0, 1, 2], [-1, 0], [1, 2],
+                [0, 0], [0, 0], [0, 0], [1, 1]
+            )
+
+    def test_parent_in_other_cell(self):
+        with self.assertRaises(ValueError):
+            MorphologyBatch(
+                ["a", "b"], [0, 1, 2], [-1, 0], [1, 2],
+                [0, 0], [0, 0], [0, 0], [1, 1]
+            )
+
+    def test_from_swc(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            paths = []
+            for name, morphology in (
+                ("first", self.first), ("second", self.second)
+            ):
+                path = os.path.join(tmpdir, f"{name}.swc")
+                write_swc(pd.DataFrame(morphology.nodes()), path)
+                paths.append(path)
+
+            batch = MorphologyBatch.from_swc(paths)
+            self.assertEqual(batch.identifiers, paths)
+            np.testing.assert_array_equal(
+                batch.parent_index, self.batch.parent_index)
+            np.testing.assert_allclose(batch.y, self.batch.y)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,10 @@ import os
 import shutil
 import tempfile
 
+import numpy as np
+
 from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.array_morphology import ArrayMorphology
 import neuron_morphology.swc_io as swcio
 
 
@@ -36,6 +39,69 @@ class TestSWCIO(unittest.TestCase):
         self.assertEqual(morph.get_root()['parent'], -1)
         self.assertEqual(morph.node_by_id(2)['parent'], 1)
 
+    def test_read_swc_columns(self):
+        columns = swcio.read_swc_columns(self.swc_file)
+        expected = swcio.read_swc(self.swc_file)
+
+        for name in swcio.SWC_COLUMNS:
+            np.testing.assert_allclose(columns[name], expected[name])
+        self.assertEqual(columns['id'].dtype, np.int64)
+        self.assertEqual(columns['parent'].dtype, np.int64)
+        self.assertEqual(columns['type'].dtype, np.int64)
+        self.assertEqual(columns['x'].dtype, np.float64)
+
+    def test_read_swc_columns_whitespace_and_comments(self):
+        test_swc_path = os.path.join(self.test_dir, 'messy.swc')
+        with open(test_swc_path, 'w') as test_swc:
+            test_swc.write(
+                '# a header\n'
+                '\n'
+                '1\t1  0.0 0.0 0.0\t5.0 -1 # the soma\n'
+                '  2 3 1.5\t2.5 3.5 1.0 1\r\n'
+                '#3 3 0 0 0 1 2\n'
+            )
+
+        columns = swcio.read_swc_columns(test_swc_path)
+        np.testing.assert_array_equal(columns['id'], [1, 2])
+        np.testing.assert_array_equal(columns['parent'], [-1, 1])
+        np.testing.assert_allclose(columns['y'], [0.0, 2.5])
+
+    def test_read_swc_columns_malformed(self):
+        test_swc_path = os.path.join(self.test_dir, 'bad.swc')
+        with open(test_swc_path, 'w') as test_swc:
+            test_swc.write('1 1 0 0 0 5 -1\n2 3 0 0 1 -1\n')
+
+        with self.assertRaisesRegex(ValueError, 'line 2'):
+            swcio.read_swc_columns(test_swc_path)
+
+    def test_read_swc_columns_offsetting_malformed(self):
+        # the total field count is a multiple of 7, but lines 2 and 3 are not
+        test_swc_path = os.path.join(self.test_dir, 'bad.swc')
+        with open(test_swc_path, 'w') as test_swc:
+            test_swc.write(
+                '# header\n1 1 0 0 0 1 -1\n2 3 0 1 0 1\n3 3 0 2 0 1 2 7\n')
+
+        with self.assertRaisesRegex(ValueError, 'line 3: expected 7 fields, found 6'):
+            swcio.read_swc_columns(test_swc_path)
+
+    def test_create_morphology_from_swc_native(self):
+        expected = swcio.morphology_from_swc(self.swc_file)
+        morph = swcio.morphology_from_swc(self.swc_file, engine='native')
+
+        self.assertIsInstance(morph, ArrayMorphology)
+        self.assertEqual(len(morph), len(expected))
+        self.assertEqual(morph.get_root()['parent'], -1)
+        self.assertEqual(morph.node_by_id(2)['parent'], 1)
+        self.assertEqual(
+            [node['id'] for node in morph.get_children(morph.node_by_id(1))],
+            [node['id'] for node in expected.get_children(
+                expected.node_by_id(1))]
+        )
+
+    def test_create_morphology_from_swc_bad_engine(self):
+        with self.assertRaises(ValueError):
+            swcio.morphology_from_swc(self.swc_file, engine='fortran')
+
     def test_save_morphology_to_swc(self):
         test_swc_path = os.path.join(self.test_dir, 'test.swc')
         swcio.morphology_to_swc(self.morphology, test_swc_path)
@@ -0,0 +1,116 @@
+import unittest
+
+import numpy as np
+
+from neuron_morphology.topology import TreeTopology
+from tests.objects import (test_morphology_large,
+                           test_morphology_small_multiple_trees,
+                           )
+
+
+class TestTreeTopology(unittest.TestCase):
+
+    def setUp(self):
+        #     0       5
+        #    / \      |
+        #   1   4     6
+        #  / \
+        # 2   3
+        self.parent = np.array([-1, 0, 1, 1, 0, -1, 5])
+        self.topology = TreeTopology.from_parent_index(
+            self.parent, node_ids=list("abcdefg"))
+
+    def test_preorder(self):
+        np.testing.assert_array_equal(
+            self.topology.preorder, [0, 1, 2, 3, 4, 5, 6])
+
+    def test_postorder(self):
+        np.testing.assert_array_equal(
+            self.topology.postorder, [2, 3, 1, 4, 0, 6, 5])
+
+    def test_depth(self):
+        np.testing.assert_array_equal(
+            self.topology.depth, [0, 1, 2, 2, 1, 0, 1])
+
+    def test_subtree(self):
+        np.testing.assert_array_equal(self.topology.subtree(1), [1, 2, 3])
+        np.testing.assert_array_equal(self.topology.subtree(4), [4])
+        np.testing.assert_array_equal(self.topology.subtree(5), [5, 6])
+
+    def test_index_of(self):
+        self.assertEqual(self.topology.index_of["e"], 4)
+
+    def test_roots(self):
+        np.testing.assert_array_equal(self.topology.roots, [0, 5])
+
+    def test_count_children(self):
+        np.testing.assert_array_equal(
+            self.topology.count_children(), [2, 2, 0, 0, 0, 1, 0])
+
+        edge_mask = np.array([1, 1, 0, 1, 0, 1, 1], dtype=bool)
+        np.testing.assert_array_equal(
+            self.topology.count_children(edge_mask), [1, 1, 0, 0, 0, 1, 0])
+
+    def test_reachable(self):
+        edge_mask = np.array([1, 1, 1, 1, 0, 1, 1], dtype=bool)
+        np.testing.assert_array_equal(
+            self.topology.reachable(0, edge_mask), [0, 1, 2, 3])
+
+        edge_mask = np.array([1, 0, 1, 1, 1, 1, 1], dtype=bool)
+        np.testing.assert_array_equal(
+            self.topology.reachable(0, edge_mask), [0, 4])
+        np.testing.assert_array_equal(
+            self.topology.reachable(1, edge_mask), [1, 2, 3])
+
+    def test_up_sweep(self):
+        np.testing.assert_array_equal(
+            self.topology.up_sweep(np.ones(7, dtype=int)),
+            self.topology.subtree_size
+        )
+        np.testing.assert_array_equal(
+            self.topology.up_sweep(np.arange(7), np.maximum),
+            [4, 3, 2, 3, 4, 6, 6]
+        )
+
+    def test_down_sweep(self):
+        np.testing.assert_array_equal(
+            self.topology.down_sweep(np.ones(7, dtype=int)),
+            self.topology.depth + 1
+        )
+        np.testing.assert_array_equal(
+            self.topology.down_sweep(np.arange(7), np.maximum),
+            [0, 1, 2, 3, 4, 5, 6]
+        )
+
+    def test_cycle(self):
+        with self.assertRaises(ValueError):
+            TreeTopology.from_parent_index(np.array([-1, 2, 1]))
+
+    def test_morphology(self):
+        for morphology in (
+            test_morphology_large(), test_morphology_small_multiple_trees()
+        ):
+            topology = morphology.get_topology()
+            nodes = morphology.nodes()
+
+            for node in nodes:
+                index = topology.index_of[node["id"]]
+                expected = []
+                morphology.depth_first_traversal(
+                    lambda visited: expected.append(visited["id"]),
+                    start_id=node["id"]
+                )
+                obtained = [nodes[ii]["id"] for ii in topology.subtree(index)]
+                self.assertEqual(sorted(obtained), sorted(expected))
+
+    def test_cached(self):
+        morphology = test_morphology_large()
+        topology = morphology.get_topology()
+        self.assertIs(morphology.get_topology(), topology)
+
+        morphology.clear_cache()
+        self.assertIsNot(morphology.get_topology(), topology)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,7 @@
 import unittest
+
+import numpy as np
+
 from neuron_morphology.constants import *
 from neuron_morphology.morphology import Morphology
 from tests.objects import (test_node,
@@ -223,6 +226,13 @@ class TestTree(unittest.TestCase):
         expected_compartment = [test_node(id=1, type=SOMA, x=800, y=610, z=30, radius=35, parent_node_id=-1), node]
         self.assertEqual(expected_compartment, compartment)
 
+    def test_get_compartment_for_node_root_or_missing(self):
+
+        morphology = test_morphology_small()
+        self.assertIsNone(morphology.get_compartment_for_node(morphology.get_root()))
+        self.assertIsNone(morphology.get_compartment_for_node(test_node(id=100)))
+        self.assertIsNone(morphology.get_compartment_for_node(None))
+
     def test_get_compartment_length(self):
 
         morphology = test_morphology_small()
@@ -287,6 +297,50 @@ class TestTree(unittest.TestCase):
                               for branching_node in branching_nodes]),
                          expected_branching_node_ids)
 
+    def test_get_type_counts(self):
+
+        morphology = test_morphology_small()
+        self.assertEqual(
+            morphology.get_type_counts(),
+            {SOMA: 1, AXON: 2, BASAL_DENDRITE: 2, APICAL_DENDRITE: 2})
+        self.assertTrue(morphology.has_type(AXON))
+        self.assertFalse(morphology.has_type(CUT_DENDRITE))
+
+    def test_nodes_have_key(self):
+
+        morphology = test_morphology_small()
+        self.assertTrue(morphology.nodes_have_key('radius'))
+        self.assertFalse(morphology.nodes_have_key('layer'))
+
+        morphology.node_by_id(3)['layer'] = '2/3'
+        morphology.clear_cache()
+        self.assertEqual(morphology.get_key_counts()['layer'], 1)
+        self.assertFalse(morphology.nodes_have_key('layer'))
+
+    def test_set_positions(self):
+
+        morphology = test_morphology_small()
+        positions = morphology.get_positions()
+        radii = [node['radius'] for node in morphology.nodes()]
+        compartments = morphology.get_compartment_table()
+
+        morphology.set_positions(positions + 1, radius_scale=2)
+        np.testing.assert_allclose(morphology.get_positions(), positions + 1)
+        self.assertEqual(
+            [node['radius'] for node in morphology.nodes()],
+            [2 * radius for radius in radii])
+        self.assertIsNot(compartments, morphology.get_compartment_table())
+
+        with self.assertRaises(ValueError):
+            morphology.set_positions(positions[1:])
+
+    def test_count_roots(self):
+
+        self.assertEqual(test_morphology_small().count_roots(), 1)
+        self.assertEqual(
+            test_morphology_small_multiple_trees().count_roots(),
+            len(test_morphology_small_multiple_trees().get_roots()))
+
 
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestTree)
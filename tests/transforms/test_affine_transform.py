@@ -3,6 +3,7 @@ import unittest
 import numpy as np
 
 from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.array_morphology import ArrayMorphology
 from neuron_morphology.transforms.affine_transform import (
     AffineTransform, rotation_from_angle, affine_from_translation,
     affine_from_transform, affine_from_transform_translation)
@@ -114,6 +115,31 @@ class TestAffine(unittest.TestCase):
             assert np.allclose([node['x'], node['y'], node['z']],
                                self.transformed_vector[node['id']])
 
+    def test_transform_morphology_clone(self):
+        affine_transform = AffineTransform(
+            affine_from_transform(2 * np.eye(3)))
+        radii = [node['radius'] for node in self.morphology.nodes()]
+        transformed = affine_transform.transform_morphology(
+            self.morphology, clone=True)
+
+        assert np.allclose(self.morphology.get_positions(), self.vector)
+        assert np.allclose(
+            [node['radius'] for node in transformed.nodes()],
+            2 * np.array(radii)
+        )
+        assert np.allclose(
+            transformed.get_positions(), 2 * np.array(self.vector))
+
+    def test_transform_array_morphology(self):
+        morphology = ArrayMorphology.from_morphology(self.morphology)
+        transformed = (AffineTransform(self.array)
+                       .transform_morphology(morphology))
+
+        assert transformed is morphology
+        for node in transformed.nodes():
+            assert np.allclose([node['x'], node['y'], node['z']],
+                               self.transformed_vector[node['id']])
+
 
 class TestAffineConstructors(unittest.TestCase):
 
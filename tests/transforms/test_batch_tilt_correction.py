@@ -0,0 +1,192 @@
+import os
+import subprocess as sp
+import unittest
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import h5py
+
+import allensdk.core.json_utilities as ju
+
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.constants import AXON
+from neuron_morphology.swc_io import morphology_to_swc
+from neuron_morphology.transforms.tilt_correction.compute_tilt_correction import (
+    run_tilt_correction, run_tilt_corrections, find_closest_path,
+    find_closest_paths, scan_closest_path_ids, CCF_SHAPE, CCF_RESOLUTION)
+from neuron_morphology.transforms.tilt_correction.batch_tilt_correction import (
+    run_batch_tilt_correction)
+from neuron_morphology.transforms.tilt_correction.path_index import PathIndex
+from neuron_morphology.transforms.affine_transform import AffineTransform
+
+
+class TestBatchTiltCorrection(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+        self.morphology = (
+            MorphologyBuilder()
+                .root(1, 2, 3)
+                    .axon(0, 2, 3)
+                        .build()
+        )
+        self.swc_path = os.path.join(self.test_dir, '123.swc')
+        morphology_to_swc(self.morphology, self.swc_path)
+
+        self.marker_path = os.path.join(self.test_dir, '123.marker')
+        with open(self.marker_path, 'w') as f:
+            f.write("##x,y,z,radius,shape,name,comment, color_r,color_g,color_b\n"
+                    "1.0,2.0,2.5,0.0,0,30,0,255, 255, 255\n"
+                    "0.0,2.0,3.0,0.0,0,20,0,255, 255, 255")
+        self.soma_marker = {'x': 1, 'y': 2, 'z': 0}
+
+        # streamlines in various directions, starting near the center of
+        # the volume
+        rng = np.random.default_rng(13)
+        directions = [[0, 0, 1], [0, 1, 1], [1, 0, 1], [1, 1, 0], [0, 1, 0]]
+        paths = np.zeros((15, 20), dtype='i')
+        for path_id in range(len(paths)):
+            start = rng.integers(400, 420, 3)
+            direction = np.array(directions[path_id % len(directions)])
+            coordinates = start + np.arange(20)[:, None] * direction
+            paths[path_id] = np.ravel_multi_index(coordinates.T, CCF_SHAPE)
+
+        self.ccf_path = os.path.join(self.test_dir, 'paths.h5')
+        with h5py.File(self.ccf_path, 'w') as f:
+            f.create_dataset("paths", data=paths)
+
+        self.soma_voxels = rng.integers(395, 425, (6, 3))
+        self.slice_transforms = [
+            AffineTransform.from_list([1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0]),
+            AffineTransform.from_list([0, 1, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0]),
+        ]
+        self.cells = [
+            {
+                'morphology': self.morphology,
+                'soma_marker': self.soma_marker,
+                'ccf_soma_location': dict(zip(
+                    ['x', 'y', 'z'], soma_voxel * CCF_RESOLUTION + 5)),
+                'slice_transform': self.slice_transforms[ii % 2],
+                'slice_image_flip': bool(ii % 3),
+            }
+            for ii, soma_voxel in enumerate(self.soma_voxels)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_scan_closest_path_ids(self):
+        with h5py.File(self.ccf_path, 'r') as ccf_data:
+            obtained = scan_closest_path_ids(
+                ccf_data, self.soma_voxels, paths_per_chunk=4)
+        expected = PathIndex.build(self.ccf_path, CCF_SHAPE) \
+            .closest_path_ids(self.soma_voxels)
+        np.testing.assert_array_equal(obtained, expected)
+
+    def test_scan_no_paths(self):
+        empty_path = os.path.join(self.test_dir, 'empty.h5')
+        with h5py.File(empty_path, 'w') as f:
+            f.create_dataset("paths", data=np.zeros((3, 4), dtype='i'))
+
+        with h5py.File(empty_path, 'r') as ccf_data:
+            with self.assertRaises(ValueError):
+                scan_closest_path_ids(ccf_data, self.soma_voxels)
+
+    def test_find_closest_paths(self):
+        for use_index in (True, False):
+            obtained = find_closest_paths(
+                self.soma_voxels, self.ccf_path, use_index=use_index)
+            for soma_voxel, path in zip(self.soma_voxels, obtained):
+                np.testing.assert_array_equal(
+                    path,
+                    find_closest_path(
+                        soma_voxel, self.ccf_path, use_index=False)
+                )
+
+    def test_run_tilt_corrections(self):
+        obtained = run_tilt_corrections(self.cells, self.ccf_path)
+        for cell, (tilt, transform) in zip(self.cells, obtained):
+            expected_tilt, expected_transform = run_tilt_correction(
+                ccf_path=self.ccf_path, **cell)
+            self.assertAlmostEqual(tilt, expected_tilt)
+            np.testing.assert_allclose(
+                transform.affine, expected_transform.affine)
+
+    def test_run_batch_tilt_correction(self):
+        cells = [
+            {
+                'identifier': 'good',
+                'swc_path': self.swc_path,
+                'marker_path': self.marker_path,
+                'ccf_soma_location': [4000, 4000, 4000],
+                'slice_transform_list': [1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
+                'slice_image_flip': True
+            },
+            {
+                'identifier': 'bad',
+                'swc_path': os.path.join(self.test_dir, 'missing.swc'),
+                'marker_path': self.marker_path,
+                'ccf_soma_location': [4000, 4000, 4000],
+                'slice_transform_list': [1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
+                'slice_image_flip': True
+            }
+        ]
+        # loads, but has no soma from which to calculate the tilt
+        no_soma_path = os.path.join(self.test_dir, 'no_soma.swc')
+        morphology_to_swc(
+            MorphologyBuilder().root(1, 2, 3, node_type=AXON)
+                .axon(0, 2, 3).build(),
+            no_soma_path
+        )
+        cells.append(dict(
+            cells[0], identifier='no_soma', swc_path=no_soma_path))
+        table_path = os.path.join(self.test_dir, 'tilts.csv')
+
+        results = run_batch_tilt_correction(
+            cells, self.ccf_path, output_table_path=table_path)
+
+        self.assertEqual([result['identifier'] for result in results],
+                         ['good', 'bad', 'no_soma'])
+        self.assertIn('tilt_correction', results[0])
+        self.assertIn('error', results[1])
+        self.assertIn('error', results[2])
+        self.assertNotIn('tilt_correction', results[2])
+
+        table = pd.read_csv(table_path)
+        self.assertAlmostEqual(
+            table.loc[0, 'tilt_correction'], results[0]['tilt_correction'])
+        self.assertTrue(np.isnan(table.loc[1, 'tilt_correction']))
+
+    def test_batch_end_to_end(self):
+        input_json_path = os.path.join(self.test_dir, 'input.json')
+        output_json_path = os.path.join(self.test_dir, 'output.json')
+        ju.write(input_json_path, {
+            'cells': [
+                {
+                    'swc_path': self.swc_path,
+                    'marker_path': self.marker_path,
+                    'ccf_soma_location': [4100, 4100, 4100],
+                    'slice_transform_list': [1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
+                    'slice_image_flip': True
+                }
+            ],
+            'ccf_path': self.ccf_path,
+            'output_json': output_json_path
+        })
+
+        sp.check_call([
+            'python', '-m',
+            'neuron_morphology.transforms.tilt_correction.batch_tilt_correction',
+            '--input_json', input_json_path
+        ])
+
+        outputs = ju.read(output_json_path)
+        self.assertEqual(outputs['results'][0]['identifier'], self.swc_path)
+        self.assertIn('tvr_00', outputs['results'][0]['tilt_transform_dict'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -58,3 +58,29 @@ class TestRunPiaWmStreamlines(unittest.TestCase):
             x = x / np.linalg.norm(x)
             assert np.allclose(x[1], 1, atol=1e-2)
             self.assertEqual(np.all(np.isnan(dg[0, 0])), True)
+
+    def test_mesh_interpolation(self):
+        cmd = ['python', '-m',
+               'neuron_morphology.transforms.pia_wm_streamlines.'
+               'calculate_pia_wm_streamlines',
+               '--interpolation_method', 'mesh',
+               '--grid_spacing', '2']
+        for key, value in self.input.items():
+            cmd.append(f'--{key}')
+            cmd.append(f'{value}')
+
+        sp.check_call(cmd)
+
+        depth_file = os.path.join(self.test_dir, 'depth_field.nc')
+        with xr.open_dataarray(depth_file) as da:
+            self.assertEqual(len(da.x), 62)
+            self.assertEqual(len(da.y), 52)
+            self.assertAlmostEqual(
+                float(da.sel(x=0, y=0)), 0.5, delta=0.05)
+            self.assertEqual(np.isnan(da[0, 0]), True)
+
+        gradient_file = os.path.join(self.test_dir, 'gradient_field.nc')
+        with xr.open_dataarray(gradient_file) as dg:
+            x = dg.sel(x=0, y=20).values
+            x = x / np.linalg.norm(x)
+            assert np.allclose(x[1], 1, atol=1e-2)
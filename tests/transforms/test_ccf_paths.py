@@ -0,0 +1,127 @@
+import os
+import shutil
+import subprocess as sp
+import tempfile
+import unittest
+
+import numpy as np
+import h5py
+
+import allensdk.core.json_utilities as ju
+
+from neuron_morphology.transforms.tilt_correction.ccf_paths import (
+    relayout_paths, is_ragged, count_paths, read_path, read_paths,
+    iter_path_voxels)
+from neuron_morphology.transforms.tilt_correction.path_index import PathIndex
+from neuron_morphology.transforms.tilt_correction.compute_tilt_correction \
+    import find_closest_path, CCF_SHAPE
+
+
+class TestCcfPaths(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+        rng = np.random.default_rng(11)
+        self.paths = np.zeros((30, 20), dtype="i")
+        for path_id in range(len(self.paths)):
+            length = rng.integers(0, 20)
+            start = rng.integers(300, 500, 3)
+            coordinates = start + np.arange(length)[:, None] * [0, 1, 1]
+            self.paths[path_id, :length] = np.ravel_multi_index(
+                coordinates.T, CCF_SHAPE)
+
+        self.padded_path = os.path.join(self.test_dir, "padded.h5")
+        with h5py.File(self.padded_path, "w") as ccf_data:
+            ccf_data.create_dataset("view lookup", data=np.arange(4))
+            ccf_data.create_dataset("paths", data=self.paths)
+
+        self.ragged_path = os.path.join(self.test_dir, "ragged.h5")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def expected_path(self, path_id):
+        row = self.paths[path_id]
+        return row[row > 0]
+
+    def test_relayout(self):
+        num_paths = relayout_paths(
+            self.padded_path, self.ragged_path,
+            paths_per_chunk=7, values_per_chunk=16
+        )
+        self.assertEqual(num_paths, len(self.paths))
+
+        with h5py.File(self.ragged_path, "r") as ccf_data:
+            self.assertTrue(is_ragged(ccf_data))
+            self.assertEqual(count_paths(ccf_data), len(self.paths))
+            np.testing.assert_array_equal(
+                ccf_data["view lookup"][:], np.arange(4))
+            self.assertEqual(ccf_data["path_values"].chunks, (16,))
+
+            for path_id in range(len(self.paths)):
+                np.testing.assert_array_equal(
+                    read_path(ccf_data, path_id), self.expected_path(path_id))
+
+    def test_read_paths(self):
+        relayout_paths(self.padded_path, self.ragged_path)
+
+        for path in (self.padded_path, self.ragged_path):
+            with h5py.File(path, "r") as ccf_data:
+                obtained = read_paths(ccf_data, 5, 12)
+            self.assertEqual(len(obtained), 7)
+            for path_id, voxels in zip(range(5, 12), obtained):
+                np.testing.assert_array_equal(
+                    voxels, self.expected_path(path_id))
+
+    def test_iter_path_voxels(self):
+        relayout_paths(self.padded_path, self.ragged_path)
+
+        with h5py.File(self.padded_path, "r") as padded, \
+                h5py.File(self.ragged_path, "r") as ragged:
+            for (padded_ids, padded_voxels), (ragged_ids, ragged_voxels) in \
+                    zip(iter_path_voxels(padded, 4), iter_path_voxels(ragged, 4)):
+                np.testing.assert_array_equal(padded_ids, ragged_ids)
+                np.testing.assert_array_equal(padded_voxels, ragged_voxels)
+
+    def test_find_closest_path(self):
+        relayout_paths(self.padded_path, self.ragged_path)
+        rng = np.random.default_rng(12)
+
+        for voxel in rng.integers(280, 520, (5, 3)):
+            expected = find_closest_path(
+                voxel, self.padded_path, use_index=False)
+            np.testing.assert_array_equal(
+                find_closest_path(voxel, self.ragged_path), expected)
+            np.testing.assert_array_equal(
+                find_closest_path(voxel, self.ragged_path, use_index=False),
+                expected
+            )
+
+    def test_index(self):
+        relayout_paths(self.padded_path, self.ragged_path)
+        padded = PathIndex.build(self.padded_path, CCF_SHAPE)
+        ragged = PathIndex.build(self.ragged_path, CCF_SHAPE)
+
+        np.testing.assert_array_equal(padded.voxels, ragged.voxels)
+        np.testing.assert_array_equal(padded.path_ids, ragged.path_ids)
+
+    def test_relayout_end_to_end(self):
+        output_json_path = os.path.join(self.test_dir, "output.json")
+        sp.check_call([
+            "python", "-m",
+            "neuron_morphology.transforms.tilt_correction.ccf_paths",
+            "--source_path", self.padded_path,
+            "--destination_path", self.ragged_path,
+            "--output_json", output_json_path
+        ])
+
+        outputs = ju.read(output_json_path)
+        self.assertEqual(outputs["num_paths"], len(self.paths))
+        with h5py.File(self.ragged_path, "r") as ccf_data:
+            np.testing.assert_array_equal(
+                read_path(ccf_data, 3), self.expected_path(3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+import numpy as np
+
+from neuron_morphology.transforms.pia_wm_streamlines.mesh_interpolation \
+    import MeshGridInterpolator
+
+
+class TestMeshGridInterpolator(unittest.TestCase):
+
+    def setUp(self):
+        # an L-shaped domain, so that some of the grid lies outside the mesh
+        # but inside its convex hull
+        self.vertices = np.array([
+            [0, 0], [2, 0], [4, 0],
+            [0, 2], [2, 2], [4, 2],
+            [0, 4], [2, 4]
+        ], dtype=float)
+        self.triangles = np.array([
+            [0, 1, 4], [0, 4, 3],
+            [1, 2, 5], [1, 5, 4],
+            [3, 4, 7], [3, 7, 6],
+        ])
+        self.xx = np.arange(-0.5, 4.6, 0.5)
+        self.yy = np.arange(-0.5, 4.6, 0.25)
+        self.grid_x, self.grid_y = np.meshgrid(
+            self.xx, self.yy, indexing="ij")
+
+        self.inside = (
+            (self.grid_x >= 0) & (self.grid_y >= 0)
+            & (
+                ((self.grid_x <= 4) & (self.grid_y <= 2))
+                | ((self.grid_x <= 2) & (self.grid_y <= 4))
+            )
+        )
+
+    def test_linear(self):
+        interpolator = MeshGridInterpolator(
+            self.vertices, self.triangles, self.xx, self.yy)
+        values = 3 + 2 * self.vertices[:, 0] - self.vertices[:, 1]
+
+        obtained = interpolator(values)
+        self.assertEqual(obtained.shape, (len(self.xx), len(self.yy)))
+
+        np.testing.assert_array_equal(np.isfinite(obtained), self.inside)
+        np.testing.assert_allclose(
+            obtained[self.inside],
+            (3 + 2 * self.grid_x - self.grid_y)[self.inside]
+        )
+
+    def test_columns(self):
+        interpolator = MeshGridInterpolator(
+            self.vertices, self.triangles, self.xx, self.yy)
+        rng = np.random.default_rng(0)
+        values = rng.uniform(size=(len(self.vertices), 3))
+
+        together = interpolator(values)
+        self.assertEqual(together.shape, (len(self.xx), len(self.yy), 3))
+        for column in range(3):
+            np.testing.assert_allclose(
+                together[:, :, column], interpolator(values[:, column]))
+
+    def test_piecewise(self):
+        values = np.zeros(len(self.vertices))
+        values[4] = 1.0
+        interpolator = MeshGridInterpolator(
+            self.vertices, self.triangles, self.xx, self.yy)
+        obtained = interpolator(values)
+
+        x_index = np.searchsorted(self.xx, 2)
+        y_index = np.searchsorted(self.yy, 2)
+        self.assertAlmostEqual(obtained[x_index, y_index], 1.0)
+        self.assertAlmostEqual(obtained[x_index + 1, y_index], 0.75)
+        self.assertAlmostEqual(obtained[x_index, y_index - 2], 0.75)
+
+    def test_chunking(self):
+        rng = np.random.default_rng(1)
+        values = rng.uniform(size=(len(self.vertices), 2))
+
+        whole = MeshGridInterpolator(
+            self.vertices, self.triangles, self.xx, self.yy)(values)
+        chunked = MeshGridInterpolator(
+            self.vertices, self.triangles, self.xx, self.yy,
+            nodes_per_chunk=7
+        )(values, nodes_per_chunk=11)
+
+        np.testing.assert_array_equal(whole, chunked)
+
+    def test_degenerate_triangle(self):
+        vertices = np.concatenate([self.vertices, [[1, 0]]])
+        triangles = np.concatenate([self.triangles, [[0, 8, 1]]])
+        values = vertices[:, 0] + vertices[:, 1]
+
+        obtained = MeshGridInterpolator(
+            vertices, triangles, self.xx, self.yy)(values)
+        np.testing.assert_allclose(
+            obtained[self.inside], (self.grid_x + self.grid_y)[self.inside])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import h5py
+
+from neuron_morphology.transforms.tilt_correction import path_index
+from neuron_morphology.transforms.tilt_correction.path_index import (
+    PathIndex, load_or_build_path_index, default_index_path)
+from neuron_morphology.transforms.tilt_correction.compute_tilt_correction \
+    import find_closest_path, CCF_SHAPE
+
+
+def brute_force_closest(paths, shape, voxel):
+    best = None
+    for path_id, row in enumerate(paths):
+        row = row[row > 0]
+        if len(row) == 0:
+            continue
+        coordinates = np.stack(np.unravel_index(row, shape), axis=1)
+        distance = np.sum((coordinates - voxel) ** 2, axis=1).min()
+        if best is None or distance < best[0]:
+            best = (distance, path_id)
+    return best[1]
+
+
+class TestPathIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.shape = (40, 30, 50)
+
+        rng = np.random.default_rng(7)
+        self.paths = np.zeros((60, 12), dtype="i")
+        for path_id in range(len(self.paths)):
+            length = rng.integers(0, 12)
+            start = rng.integers(0, self.shape)
+            coordinates = np.clip(
+                start + np.cumsum(rng.integers(-1, 2, (length, 3)), axis=0),
+                0, np.array(self.shape) - 1
+            )
+            self.paths[path_id, :length] = np.ravel_multi_index(
+                coordinates.T, self.shape)
+
+        self.ccf_path = os.path.join(self.test_dir, "paths.h5")
+        with h5py.File(self.ccf_path, "w") as ccf_data:
+            ccf_data.create_dataset("paths", data=self.paths)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_build(self):
+        index = PathIndex.build(self.ccf_path, self.shape, rows_per_chunk=7)
+
+        self.assertTrue(np.all(np.diff(index.voxels) > 0))
+        for voxel, path_id in zip(index.voxels, index.path_ids):
+            rows = np.flatnonzero(np.any(self.paths == voxel, axis=1))
+            self.assertEqual(path_id, rows.min())
+
+    def test_closest_path_id(self):
+        index = PathIndex.build(self.ccf_path, self.shape)
+        rng = np.random.default_rng(8)
+
+        for voxel in rng.integers(0, self.shape, (50, 3)):
+            self.assertEqual(
+                index.closest_path_id(voxel),
+                brute_force_closest(self.paths, self.shape, voxel)
+            )
+
+    def test_scan(self):
+        index = PathIndex.build(self.ccf_path, self.shape)
+        voxel = np.array([20, 15, 25])
+
+        self.assertEqual(
+            index._scan(voxel, block_size=5),
+            brute_force_closest(self.paths, self.shape, voxel)
+        )
+
+    def test_save_load(self):
+        index_path = default_index_path(self.ccf_path)
+        built = load_or_build_path_index(self.ccf_path, self.shape)
+        self.assertTrue(os.path.isdir(index_path))
+
+        loaded = PathIndex.load(index_path)
+        np.testing.assert_array_equal(built.voxels, loaded.voxels)
+        np.testing.assert_array_equal(built.path_ids, loaded.path_ids)
+        self.assertTrue(loaded.is_current(self.ccf_path, self.shape))
+        self.assertFalse(loaded.is_current(self.ccf_path, (1, 2, 3)))
+
+    def test_rebuild_stale(self):
+        index_path = default_index_path(self.ccf_path)
+        load_or_build_path_index(self.ccf_path, self.shape)
+
+        with h5py.File(self.ccf_path, "a") as ccf_data:
+            del ccf_data["paths"]
+            ccf_data.create_dataset("paths", data=self.paths[:1])
+
+        rebuilt = load_or_build_path_index(self.ccf_path, self.shape)
+        self.assertEqual(rebuilt.metadata["num_paths"], 1)
+        self.assertEqual(PathIndex.load(index_path).metadata["num_paths"], 1)
+
+
+class TestFindClosestPath(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+        rng = np.random.default_rng(9)
+        starts = rng.integers(300, 500, (20, 3))
+        paths = np.zeros((20, 15), dtype="i")
+        for path_id, start in enumerate(starts):
+            coordinates = start + np.arange(15)[:, None] * [0, 0, 1]
+            paths[path_id] = np.ravel_multi_index(coordinates.T, CCF_SHAPE)
+
+        self.ccf_path = os.path.join(self.test_dir, "paths.h5")
+        with h5py.File(self.ccf_path, "w") as ccf_data:
+            ccf_data.create_dataset("paths", data=paths)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_matches_scan(self):
+        rng = np.random.default_rng(10)
+        for voxel in rng.integers(250, 550, (10, 3)):
+            np.testing.assert_array_equal(
+                find_closest_path(voxel, self.ccf_path),
+                find_closest_path(voxel, self.ccf_path, use_index=False)
+            )
+
+    def test_far_query(self):
+        original = path_index.MAX_SEARCH_RADIUS
+        path_index.MAX_SEARCH_RADIUS = 2
+        try:
+            np.testing.assert_array_equal(
+                find_closest_path([10, 10, 10], self.ccf_path),
+                find_closest_path([10, 10, 10], self.ccf_path, use_index=False)
+            )
+        finally:
+            path_index.MAX_SEARCH_RADIUS = original
+
+    def test_index_path(self):
+        index_path = os.path.join(self.test_dir, "index")
+        find_closest_path([400, 400, 400], self.ccf_path, index_path=index_path)
+        self.assertTrue(os.path.isdir(index_path))
+        self.assertFalse(os.path.exists(default_index_path(self.ccf_path)))
+
+
+if __name__ == "__main__":
+    unittest.main()
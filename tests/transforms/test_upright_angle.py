@@ -11,7 +11,7 @@ import numpy as np
 from neuron_morphology.morphology_builder import MorphologyBuilder
 from neuron_morphology.swc_io import morphology_to_swc
 from neuron_morphology.transforms.upright_angle.compute_angle import (
-    get_upright_angle)
+    get_upright_angle, get_upright_angles, GradientSampler)
 from neuron_morphology.transforms.affine_transform import AffineTransform
 
 import allensdk.core.json_utilities as ju
@@ -55,6 +55,36 @@ class TestUprightAngle(unittest.TestCase):
         upright_angle = get_upright_angle(self.gradient, [0,0,0])
         self.assertAlmostEqual(upright_angle, -np.pi / 2, 3)
 
+    def test_sampler_bilinear(self):
+        x = np.array([0.0, 10.0, 30.0])
+        y = np.array([0.0, 10.0])
+        dx = np.array([[0.0, 1.0], [2.0, 3.0], [4.0, 5.0]])
+        sampler = GradientSampler(x, y, dx, -dx)
+
+        obtained = sampler([[5, 5, 0], [20, 0, 0], [30, 10, 0], [-5, 20, 0]])
+        np.testing.assert_allclose(obtained[:, 0], [1.5, 3.0, 5.0, 1.0])
+        np.testing.assert_allclose(obtained[:, 1], -obtained[:, 0])
+
+    def test_sampler_nan(self):
+        gradient = self.gradient.copy()
+        gradient[0, 0, :] = np.nan
+        gradient[3, 3, :] = np.nan
+        sampler = GradientSampler.from_dataarray(gradient)
+
+        # one of the surrounding nodes is nan
+        self.assertAlmostEqual(
+            sampler.upright_angles([[0, 0, 0]])[0], -np.pi / 2)
+        # exactly on a nan node
+        self.assertTrue(np.all(np.isnan(sampler([[-35, -35, 0]]))))
+
+    def test_upright_angles(self):
+        sampler = GradientSampler.from_dataarray(self.gradient)
+        points = [[0, 0, 0], [-30, 12, 0], [100, 100, 0]]
+        np.testing.assert_allclose(
+            get_upright_angles(self.gradient, points), -np.pi / 2)
+        self.assertAlmostEqual(
+            get_upright_angle(sampler, points[1]), -np.pi / 2)
+
     def test_upright_end_to_end(self):
         input = {'gradient_path': self.gradient_path,
                  'node': '[0, 0, 0]',